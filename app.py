@@ -1,16 +1,50 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import (Flask, render_template, request, jsonify, session, redirect, url_for, Response, stream_with_context,
+                   make_response)
 import os
-import requests
+import hashlib
 import json
-import re
 import uuid
+import io
+import hmac
+import multiprocessing
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-from database import init_db, get_db_connection
-import sqlite3
+from werkzeug.middleware.proxy_fix import ProxyFix
+from database import init_db, get_db_connection, open_connection
+import routing
+import ratelimit
+import prompts
+from scenario_pool import ScenarioPool
+from stream_parser import IncrementalJSONParser
+from evaluation import build_evaluation_messages, parse_evaluation, save_assessment, run_evaluation, EvaluationError, evaluation_cache_key
+import eval_cache
+import idempotency
+import metrics
+import assets
+from jobs import JobQueue
+from session_store import SQLiteSessionInterface
+from passwords import hash_password, verify_password, needs_rehash, LoginThrottle
+from batch import read_items, detect_format, run_batch, load_checkpoint, save_checkpoint
+from assessments import list_assessments, assessment_totals, get_assessment, history_version
+from stats import percentile_rank, role_summary, user_trend
+from search import search_assessments, SearchError
+import export
+from json_extract import parse_scenario_text, ExtractionError
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here-change-in-production'
+app.session_interface = SQLiteSessionInterface()
+metrics.init_app(app)
+assets.init_app(app)
+
+# Number of reverse proxies in front of the app, so remote_addr is the client
+TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", "0"))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+
+login_throttle = LoginThrottle()
+
+# Bearer token for warehouse exports of every user's history (unset: users export only their own)
+EXPORT_API_TOKEN = os.environ.get("EXPORT_API_TOKEN")
 
 
 # Initialize Database
@@ -19,31 +53,33 @@ try:
 except Exception as e:
     print(f"Database initialization error: {e}")
 
-# Groq API Configuration
-GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+def conditional(response, etag=None):
+    """Per-user response that browsers revalidate on every view; 304 when the ETag still matches"""
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    if etag:
+        response.set_etag(etag)
+    else:
+        response.add_etag()
+    return response.make_conditional(request)
 
-def call_groq_api(messages, temperature=0.7, max_tokens=2000):
-    """Make API call to Groq with Llama 3.3"""
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": messages,
-        "temperature": temperature,
-        "max_tokens": max_tokens
-    }
-    
-    try:
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        return response.json()['choices'][0]['message']['content']
-    except Exception as e:
-        print(f"API Error: {str(e)}")
-        return None
+@app.errorhandler(ratelimit.RateLimited)
+def rate_limited(e):
+    """The LLM account is saturated: ask the client to retry instead of holding the worker"""
+    response = jsonify({'error': 'Too many requests right now. Please try again shortly.'})
+    response.headers['Retry-After'] = str(max(1, int(e.retry_after + 0.5)))
+    return response, 429
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint for this worker"""
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+def _hashing_busy(template):
+    """503 for a login or registration the password hashing pool could not take in time"""
+    response = make_response(render_template(template, error="The server is busy. Please try again in a moment."), 503)
+    response.headers['Retry-After'] = '5'
+    return response
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -54,15 +90,39 @@ def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
+
+        # Refuse bursts before they reach the password hash
+        if not login_throttle.allow(username, request.remote_addr):
+            return render_template('login.html', error="Too many login attempts. Please try again later."), 429
         
         conn = get_db_connection()
         user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
         conn.close()
-        
-        if user and check_password_hash(user['password_hash'], password):
+
+        try:
+            verified = user and verify_password(user['password_hash'], password)
+        except TimeoutError:
+            return _hashing_busy('login.html')
+        if verified:
+            login_throttle.succeeded(username)
+            # Upgrade hashes made with older KDF settings while we have the password
+            try:
+                if needs_rehash(user['password_hash']):
+                    new_hash = hash_password(password)
+                    conn = get_db_connection()
+                    try:
+                        conn.execute('UPDATE users SET password_hash = ? WHERE id = ?', (new_hash, user['id']))
+                        conn.commit()
+                    finally:
+                        conn.close()
+            except TimeoutError:
+                pass  # the upgrade is retried at the next login
+            # New id for the signed-in session, so a planted pre-login id is useless
+            app.session_interface.regenerate(session)
             session['user'] = user['username']
             return redirect(url_for('index'))
         else:
+            login_throttle.failed(username)
             return render_template('login.html', error="Invalid username or password")
             
     return render_template('login.html')
@@ -80,6 +140,8 @@ def register():
         
         if password != confirm_password:
             return render_template('register.html', error="Passwords do not match")
+        if not login_throttle.allow(username, request.remote_addr):
+            return render_template('register.html', error="Too many attempts. Please try again later."), 429
             
         conn = get_db_connection()
         try:
@@ -89,7 +151,10 @@ def register():
                 return render_template('register.html', error="Username already exists")
                 
             # Create new user
-            hashed_password = generate_password_hash(password)
+            try:
+                hashed_password = hash_password(password)
+            except TimeoutError:
+                return _hashing_busy('register.html')
             conn.execute('INSERT INTO users (username, password_hash) VALUES (?, ?)',
                          (username, hashed_password))
             conn.commit()
@@ -105,6 +170,7 @@ def register():
 def logout():
     """Logout user"""
     session.clear()
+    app.session_interface.regenerate(session)
     return redirect(url_for('login'))
 
 @app.route('/')
@@ -154,28 +220,213 @@ def dashboard():
     try:
         user = conn.execute('SELECT id FROM users WHERE username = ?', (session['user'],)).fetchone()
         if user:
-            assessments = conn.execute('''
-                SELECT * FROM assessments WHERE user_id = ? ORDER BY created_at DESC
-            ''', (user['id'],)).fetchall()
-            
-            # Convert row objects to dicts and parse JSON for template
-            assessments_list = []
-            for row in assessments:
-                assessment = dict(row)
-                try:
-                    assessment['evaluation_data_json'] = json.loads(assessment['evaluation_data'])
-                except:
-                    assessment['evaluation_data_json'] = {}
-                assessments_list.append(assessment)
-                
-            return render_template('dashboard.html', assessments=assessments_list)
+            cursor = request.args.get('cursor')
+            # Validated before any page query or rendering, so a repeat view is a single indexed lookup
+            etag = hashlib.sha256(
+                f"{assets.RELEASE}:{user['id']}:{history_version(conn, user['id'])}:{cursor}".encode()).hexdigest()
+            if request.if_none_match.contains(etag):
+                return conditional(make_response(''), etag)
+            assessments_list, next_cursor = list_assessments(conn, user['id'], cursor)
+            total, average = assessment_totals(conn, user['id'])
+            trend = user_trend(conn, user['id'])
+            return conditional(make_response(render_template(
+                'dashboard.html', assessments=assessments_list, next_cursor=next_cursor,
+                total=total, average=average, trend=trend)), etag)
     except Exception as e:
         print(f"Dashboard Error: {e}")
-        return render_template('dashboard.html', assessments=[])
     finally:
         conn.close()
     
-    return render_template('dashboard.html', assessments=[])
+    return render_template('dashboard.html', assessments=[], next_cursor=None, total=0, average=0, trend=[])
+
+@app.route('/api/assessments/<int:assessment_id>')
+def assessment_detail(assessment_id):
+    """Load one stored assessment with its full evaluation"""
+    if 'user' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    conn = get_db_connection()
+    try:
+        user = conn.execute('SELECT id FROM users WHERE username = ?', (session['user'],)).fetchone()
+        assessment = get_assessment(conn, user['id'], assessment_id) if user else None
+        comparison = score_comparison(conn, assessment['job_role'], assessment['complexity'],
+                                      assessment['overall_score']) if assessment else None
+    finally:
+        conn.close()
+
+    if not assessment:
+        return jsonify({'error': 'Assessment not found'}), 404
+    return jsonify({
+        'success': True,
+        'job_role': assessment['job_role'],
+        'assessment': assessment,
+        'evaluation': assessment['evaluation'],
+        'comparison': comparison
+    })
+
+def score_comparison(conn, job_role, complexity, score):
+    """How a score ranks among all assessments for the same role and complexity"""
+    ranked = percentile_rank(conn, job_role, complexity, score)
+    if ranked is None:
+        return None
+    return {'percentile': ranked[0], 'count': ranked[1], 'complexity': complexity}
+
+@app.route('/api/search')
+def search():
+    """Ranked full-text search over the logged-in user's assessments"""
+    if 'user' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    conn = get_db_connection()
+    try:
+        user = conn.execute('SELECT id FROM users WHERE username = ?', (session['user'],)).fetchone()
+        if not user:
+            return jsonify({'error': 'Not logged in'}), 401
+        results, next_offset = search_assessments(
+            conn, user['id'], request.args.get('q', ''), job_role=request.args.get('job_role'),
+            complexity=request.args.get('complexity'), field=request.args.get('field'),
+            offset=request.args.get('offset', 0, type=int), limit=request.args.get('limit', 20, type=int))
+    except SearchError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        conn.close()
+
+    return jsonify({'success': True, 'results': results, 'next_offset': next_offset})
+
+@app.route('/api/export')
+def export_history():
+    """Stream assessment history as CSV, JSONL or gzipped JSONL
+
+    Query: format, since, until, after_id (high-water mark of the previous
+    export), fields (comma-separated evaluation fields to flatten) and, with
+    the export token, user. The high-water mark of this export is returned
+    in X-Export-High-Water-Mark.
+    """
+    auth = request.headers.get('Authorization', '')
+    service = bool(EXPORT_API_TOKEN) and auth.startswith('Bearer ') and hmac.compare_digest(
+        auth[len('Bearer '):].encode(), EXPORT_API_TOKEN.encode())
+    if not service and 'user' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    fmt = request.args.get('format', 'jsonl')
+    if fmt not in export.FORMATS:
+        return jsonify({'error': f'Unknown format: {fmt}'}), 400
+    try:
+        since = export.parse_date(request.args.get('since'), 'since')
+        until = export.parse_date(request.args.get('until'), 'until')
+    except export.ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    fields = export.parse_fields(request.args.get('fields'))
+    after_id = request.args.get('after_id', 0, type=int)
+
+    # A connection of its own: the cursor stays open for the whole response
+    conn = open_connection()
+    try:
+        username = request.args.get('user') if service else session['user']
+        user_id = None
+        if username:
+            user = conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
+            if not user:
+                conn.close_for_real()
+                return jsonify({'error': 'Unknown user'}), 404
+            user_id = user['id']
+        through_id = export.high_water_mark(conn)
+        records = export.iter_rows(conn, through_id, after_id, user_id, since, until, fields)
+    except Exception:
+        conn.close_for_real()
+        raise
+
+    def close():
+        records.close()
+        conn.close_for_real()
+
+    extension = 'ndjson' if fmt == 'ndjson' else fmt
+    response = Response(export.stream_export(records, fmt, fields), mimetype=export.FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="assessments-{after_id + 1}-{through_id}.{extension}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no',
+        'X-Export-High-Water-Mark': str(through_id)
+    })
+    # Runs whether or not the body was ever iterated
+    response.call_on_close(close)
+    return response
+
+@app.route('/api/stats/role')
+def role_stats():
+    """Score statistics and leaderboard for a role; ?score= adds its percentile rank"""
+    if 'user' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    job_role = request.args.get('job_role', '')
+    complexity = request.args.get('complexity', 'Medium')
+    if not job_role:
+        return jsonify({'error': 'Job role is required'}), 400
+
+    conn = get_db_connection()
+    try:
+        user = conn.execute('SELECT id FROM users WHERE username = ?', (session['user'],)).fetchone()
+        summary = role_summary(conn, job_role, complexity, user['id'] if user else None)
+        comparison = None
+        if summary and request.args.get('score') is not None:
+            comparison = score_comparison(conn, job_role, complexity, request.args.get('score'))
+    finally:
+        conn.close()
+
+    if not summary:
+        return jsonify({'error': 'No assessments for this role yet'}), 404
+    return jsonify({'success': True, 'stats': summary, 'comparison': comparison})
+
+@app.route('/api/stats/trend')
+def score_trend():
+    """Average score per active day for the logged-in user"""
+    if 'user' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    conn = get_db_connection()
+    try:
+        user = conn.execute('SELECT id FROM users WHERE username = ?', (session['user'],)).fetchone()
+        trend = user_trend(conn, user['id']) if user else []
+    finally:
+        conn.close()
+    return jsonify({'success': True, 'trend': trend})
+
+def build_scenario_messages(job_role, complexity):
+    """Build the chat messages for generating a scenario"""
+    return prompts.render('scenario', complexity, job_role=job_role).messages
+
+def parse_scenario(response, complexity):
+    """Extract and validate the scenario JSON from an LLM response"""
+    try:
+        scenario_data, repaired = parse_scenario_text(response, complexity)
+    except ExtractionError:
+        print(f"Response: {response}")
+        raise
+    if repaired:
+        print("Repaired malformed scenario JSON")
+    return scenario_data
+
+def create_scenario(job_role, complexity):
+    """Generate a scenario with the LLM; None if the API call fails"""
+    try:
+        scenario_data, _ = routing.complete('scenario', complexity, build_scenario_messages(job_role, complexity),
+                                            temperature=0.8,
+                                            parse=lambda response: parse_scenario(response, complexity))
+    except (ExtractionError, ratelimit.RateLimited):
+        raise
+    except Exception as e:
+        print(f"API Error: {str(e)}")
+        return None
+    return scenario_data
+
+# Warm pool of pre-generated scenarios for popular roles
+scenario_pool = ScenarioPool(generator=create_scenario)
+
+# Background workers for queued evaluations
+job_queue = JobQueue(handler='evaluation.run_evaluation_job')
+
+# Child processes of the job worker pool must not start their own workers
+if multiprocessing.parent_process() is None:
+    scenario_pool.start()
+    job_queue.start()
 
 @app.route('/api/generate-scenario', methods=['POST'])
 def generate_scenario():
@@ -186,85 +437,28 @@ def generate_scenario():
     
     if not job_role:
         return jsonify({'error': 'Job role is required'}), 400
-    
-    # Define complexity-specific instructions
-    complexity_instructions = ""
-    if complexity == "Low":
-        complexity_instructions = """
-        LEVEL: LOW (Foundational Knowledge)
-        - Focus on verifying core concepts, definitions, and terminology.
-        - Scenario should be simple, direct, and low ambiguity.
-        - Example: "What is [Concept] and why is it important?" or a very basic troubleshooting step.
-        - Goal: Filter out fake credentials."""
-    elif complexity == "Medium":
-        complexity_instructions = """
-        LEVEL: MEDIUM (Applied Thinking)
-        - Focus on problem-solving, process selection, and trade-offs.
-        - Scenario should be a realistic workplace situation with some ambiguity.
-        - Example: "A specific problem occurred. How do you investigate and fix it?"
-        - Goal: Measure real job readiness."""
-    else: # High
-        complexity_instructions = """
-        LEVEL: HIGH (Strategic & Executive Thinking)
-        - Focus on risk management, ethics, business impact, and multi-stakeholder decisions.
-        - Scenario should be high-stakes, ambiguous, with no single correct answer.
-        - Example: "A critical crisis with conflicting business/ethical goals. What is your strategy?"
-        - Goal: Identify leaders."""
-
-    # Create prompt for scenario generation
-    prompt = f"""You are an expert in professional skills assessment. Generate a realistic scenario for a {job_role} position.
-    
-    {complexity_instructions}
-
-Requirements:
-1. Adhere strictly to the defined Complexity Level.
-2. Include specific details relevant to the {job_role}.
-3. The scenario should be 100-200 words.
-
-Format your response as a JSON object with these fields:
-{{
-  "scenario_title": "Brief title of the scenario",
-  "scenario_description": "Detailed scenario description",
-  "complexity_level": "Medium/High",
-  "key_challenges": ["challenge1", "challenge2", "challenge3"]
-}}
-
-Respond ONLY with valid JSON, no additional text."""
-
-    messages = [
-        {"role": "system", "content": "You are an expert assessment designer who creates realistic professional scenarios."},
-        {"role": "user", "content": prompt}
-    ]
-    
-    response = call_groq_api(messages, temperature=0.8)
-    
-    if response:
+
+    # Serve a ready scenario from the pool when one is available
+    scenario_data = scenario_pool.take(job_role, complexity)
+    if scenario_data is None:
         try:
-            # Clean response and parse JSON
-            response = response.strip()
-            if response.startswith('```json'):
-                response = response[7:]
-            if response.endswith('```'):
-                response = response[:-3]
-            response = response.strip()
-            
-            scenario_data = json.loads(response)
-            
-            # Store in session
-            session['job_role'] = job_role
-            session['complexity'] = complexity
-            session['scenario'] = scenario_data
-            session['assessment_id'] = str(uuid.uuid4())
-            session.modified = True
-            
-            return jsonify({
-                'success': True,
-                'scenario': scenario_data
-            })
-        except json.JSONDecodeError as e:
+            scenario_data = create_scenario(job_role, complexity)
+        except ExtractionError as e:
             print(f"JSON Parse Error: {e}")
-            print(f"Response: {response}")
             return jsonify({'error': 'Failed to parse scenario'}), 500
+
+    if scenario_data:
+        # Store in session
+        session['job_role'] = job_role
+        session['complexity'] = complexity
+        session['scenario'] = scenario_data
+        session['assessment_id'] = str(uuid.uuid4())
+        session.modified = True
+        
+        return jsonify({
+            'success': True,
+            'scenario': scenario_data
+        })
     
     return jsonify({'error': 'Failed to generate scenario'}), 500
 
@@ -274,11 +468,12 @@ def get_scenario():
     if 'scenario' not in session or 'job_role' not in session:
         return jsonify({'error': 'No scenario found'}), 404
     
-    return jsonify({
+    return conditional(jsonify({
         'success': True,
         'job_role': session.get('job_role'),
-        'scenario': session.get('scenario')
-    })
+        'scenario': session.get('scenario'),
+        'assessment_id': session.get('assessment_id')
+    }))
 
 @app.route('/api/evaluate-response', methods=['POST'])
 def evaluate_response():
@@ -292,209 +487,230 @@ def evaluate_response():
     job_role = session.get('job_role', 'Professional')
     complexity = session.get('complexity', 'Medium')
     scenario = session.get('scenario', {})
+    # Retries and double submits of one attempt carry the same key
+    assessment_id = idempotency.clean_key(data.get('assessment_id')) or session.get('assessment_id')
     
-    # Define evaluation criteria based on complexity
-    evaluation_criteria = ""
-    if complexity == "Low":
-        evaluation_criteria = """
-        Evaluate based on LOW Complexity (Foundational):
-        1. Accuracy: Are the definitions/concepts correct?
-        2. Clarity: Can the user explain it clearly?
-        3. Basic Understanding: Do they grasp fundamentals?
-        """
-        dimensions_json = """
-        "dimensions": {
-            "accuracy": {"score": <0-100>, "feedback": "analysis of correctness"},
-            "clarity": {"score": <0-100>, "feedback": "analysis of explanation quality"},
-            "basic_understanding": {"score": <0-100>, "feedback": "grasp of core concepts"}
-        }"""
-    elif complexity == "Medium":
-        evaluation_criteria = """
-        Evaluate based on MEDIUM Complexity (Applied):
-        1. Reasoning: Does the user follow a logical process?
-        2. Technical Correctness: Are they choosing the right methods?
-        3. Practicality: Is the solution workable?
-        """
-        dimensions_json = """
-        "dimensions": {
-            "reasoning": {"score": <0-100>, "feedback": "logic analysis"},
-            "technical_correctness": {"score": <0-100>, "feedback": "method accuracy"},
-            "practicality": {"score": <0-100>, "feedback": "solution feasibility"}
-        }"""
-    else: # High
-        evaluation_criteria = """
-        Evaluate based on HIGH Complexity (Strategic):
-        1. Strategic Reasoning: Are long-term effects considered?
-        2. Ethical Judgment: Are risks and fairness addressed?
-        3. Decision Quality: Is the trade-off handled intelligently?
-        """
-        dimensions_json = """
-        "dimensions": {
-            "strategic_reasoning": {"score": <0-100>, "feedback": "long-term thinking analysis"},
-            "ethical_judgment": {"score": <0-100>, "feedback": "risk/ethics analysis"},
-            "decision_quality": {"score": <0-100>, "feedback": "trade-off handling"}
-        }"""
-
-    # Create evaluation prompt
-    # Create evaluation prompt
-    prompt = f"""You are an expert evaluator for professional capability assessment. 
-    
-    JOB ROLE: {job_role}
-    COMPLEXITY LEVEL: {complexity}
-    
-    SCENARIO:
-    {scenario.get('scenario_description', '')}
-    
-    CANDIDATE RESPONSE:
-    {user_response}
-    
-    {evaluation_criteria}
-    
-    Respond ONLY with valid JSON in this exact format. Do NOT include markdown formatting or comments.
-    
-    CRITICAL: The "dimensions" field must be a JSON Object {{ }}, NOT a list [ ]. 
-    Do NOT end the dimensions object with a square bracket ].
+    try:
+        evaluation_data = run_evaluation(session['user'], job_role, complexity, scenario, user_response,
+                                         assessment_id)
+    except EvaluationError as e:
+        return jsonify({'error': str(e)}), 500
+
+    # Store in session
+    session['evaluation'] = evaluation_data
+    session['user_response'] = user_response
+    session['timestamp'] = datetime.now().isoformat()
+    session.modified = True
     
-    {{
-      "overall_score": <number between 0-100>,
-      {dimensions_json},
-      "strengths": [
-        "Strength 1",
-        "Strength 2",
-        "Strength 3"
-      ],
-      "weaknesses": [
-        "Weakness 1",
-        "Weakness 2",
-        "Weakness 3"
-      ],
-      "skill_readiness": "Assessment of readiness for this level",
-      "recommendations": [
-        "Rec 1",
-        "Rec 2",
-      "recommendations": [
-        "Rec 1",
-        "Rec 2",
-        "Rec 3"
-      ],
-      "performace_level": "Entry/Mid/Senior/Expert",
-      "ideal_answer": "A concise, high-quality, model response (100-150 words) that effectively addresses the scenario at the chosen complexity level."
-    }}"""
-
-    messages = [
-        {"role": "system", "content": "You are an expert professional evaluator with deep knowledge across multiple domains."},
-        {"role": "user", "content": prompt}
-    ]
+    return jsonify({
+        'success': True,
+        'evaluation': evaluation_data
+    })
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue an evaluation and return its job id immediately"""
+    if 'user' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    data = request.json
+    user_response = data.get('response', '')
     
-    response = call_groq_api(messages, temperature=0.5, max_tokens=2500)
+    if not user_response or len(user_response) < 50:
+        return jsonify({'error': 'Response too short. Please provide a detailed answer.'}), 400
+
+    job_id = job_queue.submit(session['user'], {
+        'username': session['user'],
+        'job_role': session.get('job_role', 'Professional'),
+        'complexity': session.get('complexity', 'Medium'),
+        'scenario': session.get('scenario', {}),
+        'user_response': user_response,
+        'assessment_id': idempotency.clean_key(data.get('assessment_id')) or session.get('assessment_id')
+    })
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('job_status', job_id=job_id)
+    }), 202
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Report the status of a queued evaluation"""
+    job = job_queue.get(job_id)
+    if not job or job['owner'] != session.get('user'):
+        return jsonify({'error': 'Job not found'}), 404
+
+    if job['status'] == 'done':
+        # Make the finished evaluation available to the results page
+        session['evaluation'] = job['result']
+        session['user_response'] = job['payload']['user_response']
+        session['timestamp'] = datetime.now().isoformat()
+        session.modified = True
+        return jsonify({'success': True, 'status': 'done', 'evaluation': job['result']})
+    if job['status'] == 'failed':
+        return jsonify({'success': False, 'status': 'failed', 'error': job['error']})
+    return jsonify({'success': True, 'status': job['status']})
+
+@app.route('/api/submit-response', methods=['POST'])
+def submit_response():
+    """Store the candidate's response so the results page can stream its evaluation"""
+    data = request.json
+    user_response = data.get('response', '')
     
-    if response:
+    if not user_response or len(user_response) < 50:
+        return jsonify({'error': 'Response too short. Please provide a detailed answer.'}), 400
+    if 'scenario' not in session:
+        return jsonify({'error': 'No scenario found'}), 404
+
+    session['user_response'] = user_response
+    assessment_id = idempotency.clean_key(data.get('assessment_id'))
+    if assessment_id:
+        session['assessment_id'] = assessment_id
+    session.pop('evaluation', None)
+    session.modified = True
+    return jsonify({'success': True, 'stream_url': url_for('evaluate_stream')})
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/evaluate-stream')
+def evaluate_stream():
+    """Stream the evaluation of the submitted response as Server-Sent Events"""
+    if 'user' not in session or 'user_response' not in session:
+        return jsonify({'error': 'No response submitted'}), 404
+
+    username = session['user']
+    job_role = session.get('job_role', 'Professional')
+    complexity = session.get('complexity', 'Medium')
+    scenario = session.get('scenario', {})
+    user_response = session['user_response']
+    assessment_id = idempotency.attempt_key(session.get('assessment_id'), scenario, user_response)
+    messages = build_evaluation_messages(job_role, complexity, scenario, user_response)
+
+    def finish(evaluation_data):
+        save_assessment(username, job_role, complexity, evaluation_data, assessment_id, scenario)
+
+        # Headers are already sent, so write the session to the store directly
+        session['evaluation'] = evaluation_data
+        session['timestamp'] = datetime.now().isoformat()
+        app.session_interface.persist(session)
+
+        return sse_event('done', {'evaluation': evaluation_data})
+
+    def generate():
+        yield sse_event('meta', {'job_role': job_role, 'complexity': complexity})
+        if not assessment_id:
+            yield from evaluate()
+            return
+
+        # A duplicate request or an EventSource reconnect may already be evaluating this attempt
+        stored = idempotency.acquire(username, assessment_id)
+        if stored is not None:
+            yield finish(stored)
+            return
         try:
-            # Clean response and parse JSON
-            response = response.strip()
-            
-            # Try to find JSON block with regex
-            json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
-            if json_match:
-                response = json_match.group(1)
-            else:
-                # If no code block, try to find the JSON object directly
-                start = response.find('{')
-                end = response.rfind('}')
-                if start != -1 and end != -1:
-                    response = response[start:end+1]
-            
-            evaluation_data = json.loads(response)
-            
-            # Save to database
-            conn = get_db_connection()
-            try:
-                # Get user id
-                user = conn.execute('SELECT id FROM users WHERE username = ?', (session['user'],)).fetchone()
-                if user:
-                    conn.execute('''
-                        INSERT INTO assessments (user_id, job_role, complexity, overall_score, evaluation_data)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (user['id'], job_role, complexity, evaluation_data.get('overall_score', 0), json.dumps(evaluation_data)))
-                    conn.commit()
-            except Exception as db_err:
-                 print(f"Database Save Error: {db_err}")
-            finally:
-                 conn.close()
-
-            # Store in session
-            session['evaluation'] = evaluation_data
-            session['user_response'] = user_response
-            session['timestamp'] = datetime.now().isoformat()
-            session.modified = True
-            
-            return jsonify({
-                'success': True,
-                'evaluation': evaluation_data
-            })
-        except json.JSONDecodeError as e:
-            # Attempt to fix common JSON errors
-            try:
-                # Fix 1: Replace matching }] with } using regex to handle whitespace
-                fixed_response = re.sub(r'\]\s*\}\s*,', '}},', response)
-                if fixed_response == response:
-                     # Fallback for end of object
-                     fixed_response = re.sub(r'\]\s*\}\s*$', '}}', response)
-                
-                evaluation_data = json.loads(fixed_response)
-                
-                # If successful, save and return
-                conn = get_db_connection()
-                try:
-                    # Get user id
-                    user = conn.execute('SELECT id FROM users WHERE username = ?', (session['user'],)).fetchone()
-                    if user:
-                        conn.execute('''
-                            INSERT INTO assessments (user_id, job_role, complexity, overall_score, evaluation_data)
-                            VALUES (?, ?, ?, ?, ?)
-                        ''', (user['id'], job_role, complexity, evaluation_data.get('overall_score', 0), json.dumps(evaluation_data)))
-                        conn.commit()
-                except Exception as db_err:
-                    print(f"Database Save Error: {db_err}")
-                finally:
-                    conn.close()
-
-                session['evaluation'] = evaluation_data
-                session['user_response'] = user_response
-                session['timestamp'] = datetime.now().isoformat()
-                session.modified = True
-                return jsonify({'success': True, 'evaluation': evaluation_data})
-            except:
-                pass
-                
-            print(f"JSON Parse Error: {e}")
-            print(f"Response: {response}")
-            # Log failed response for debugging
-            try:
-                with open("debug_evaluation_error.txt", "w", encoding='utf-8') as f:
-                    f.write(f"Error: {str(e)}\n\nResponse:\n{response}")
-            except:
-                pass
-            return jsonify({'error': 'Failed to parse evaluation. Please try again.'}), 500
-        except json.JSONDecodeError as e:
-            print(f"JSON Parse Error: {e}")
-            print(f"Response: {response}")
-            return jsonify({'error': 'Failed to parse evaluation'}), 500
-    
-    return jsonify({'error': 'Failed to evaluate response'}), 500
+            yield from evaluate()
+        finally:
+            idempotency.release(username, assessment_id)
+
+    def evaluate():
+        cache_key = evaluation_cache_key(complexity, scenario, user_response)
+        cached = eval_cache.get(cache_key)
+        if cached is not None:
+            yield finish(cached)
+            return
+
+        parser = IncrementalJSONParser()
+        chunks = []
+        try:
+            for delta in routing.stream('evaluation', complexity, messages, temperature=0.5):
+                chunks.append(delta)
+                for path, value in parser.feed(delta):
+                    if len(path) == 1:
+                        yield sse_event('field', {'key': path[0], 'value': value})
+                    else:
+                        yield sse_event('item', {'key': path[0], 'name': path[1], 'value': value})
+        except ratelimit.RateLimited as e:
+            yield sse_event('error', {'error': 'Too many requests right now. Please try again shortly.',
+                                      'retry_after': round(e.retry_after, 1)})
+            return
+        except Exception as e:
+            print(f"API Error: {str(e)}")
+            yield sse_event('error', {'error': 'Failed to evaluate response'})
+            return
+
+        try:
+            evaluation_data = parse_evaluation(''.join(chunks), complexity)
+        except ExtractionError:
+            yield sse_event('error', {'error': 'Failed to parse evaluation. Please try again.'})
+            return
+
+        eval_cache.put(cache_key, evaluation_data)
+        yield finish(evaluation_data)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/batch/evaluate', methods=['POST'])
+def batch_evaluate():
+    """Evaluate an uploaded JSONL/CSV batch, streaming JSONL results as they finish"""
+    if 'user' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'error': 'A JSONL or CSV file is required'}), 400
+
+    fmt = request.form.get('format') or detect_format(upload.filename)
+    try:
+        items = list(read_items(io.TextIOWrapper(upload.stream, encoding='utf-8', newline=''), fmt))
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'error': f'Invalid batch file: {e}'}), 400
+
+    # Re-uploading with the same batch_id resumes from the stored checkpoint
+    owner = session['user']
+    batch_id = request.form.get('batch_id') or str(uuid.uuid4())
+    done = load_checkpoint(batch_id, owner)
+
+    def generate():
+        for result in done.values():
+            yield json.dumps(result) + '\n'
+        results = run_batch(items, done)
+        try:
+            for result in results:
+                save_checkpoint(batch_id, owner, result)
+                yield json.dumps(result) + '\n'
+        finally:
+            # On a client disconnect, stop submitting items
+            results.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Batch-Id': batch_id})
 
 @app.route('/api/get-results')
 def get_results():
     """Get stored results from session"""
     if 'evaluation' not in session:
         return jsonify({'error': 'No evaluation found'}), 404
-    
-    return jsonify({
+
+    conn = get_db_connection()
+    try:
+        comparison = score_comparison(conn, session.get('job_role', 'Professional'),
+                                      session.get('complexity', 'Medium'),
+                                      session['evaluation'].get('overall_score'))
+    finally:
+        conn.close()
+
+    return conditional(jsonify({
         'success': True,
         'job_role': session.get('job_role'),
         'scenario': session.get('scenario'),
-        'evaluation': session.get('evaluation')
-    })
+        'evaluation': session.get('evaluation'),
+        'comparison': comparison
+    }))
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
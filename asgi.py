@@ -0,0 +1,346 @@
+"""Asyncio serving mode.
+
+The LLM-bound API routes (generate-scenario, evaluate-response and
+evaluate-stream) are served natively on the event loop with a non-blocking
+Groq client, so one process can hold hundreds of in-flight evaluations.
+Database work for them runs on a small thread pool. Every other route,
+including all pages and templates, is the unchanged Flask app running
+behind a WSGI adapter.
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --proxy-headers --forwarded-allow-ips '*'
+
+Run a single process per instance: the warm scenario pool and job queue
+start only in the main process, and concurrency comes from the event loop.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+
+from a2wsgi import WSGIMiddleware
+from werkzeug.http import parse_cookie
+
+import eval_cache
+import idempotency
+import metrics
+import ratelimit
+from app import app as flask_app, scenario_pool, build_scenario_messages, parse_scenario, sse_event
+from evaluation import (build_evaluation_messages, parse_evaluation, save_assessment, evaluation_cache_key,
+                        EvaluationError)
+from json_extract import ExtractionError
+from llm_async import AsyncGroqClient
+import routing
+from stream_parser import IncrementalJSONParser
+
+# Tunables (override through the environment)
+ASGI_DB_WORKERS = int(os.environ.get("ASGI_DB_WORKERS", "4"))
+ASGI_WSGI_WORKERS = int(os.environ.get("ASGI_WSGI_WORKERS", "10"))
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.scope = scope
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.body = body
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        self.cookies = parse_cookie(headers.get("cookie", ""))
+
+    def json(self):
+        """Decoded JSON body, or None if it is missing or invalid"""
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError:
+            return None
+
+
+class AsyncApp:
+    """ASGI entry point: native async handlers for LLM-bound routes, Flask for the rest"""
+
+    def __init__(self, wsgi_app):
+        self.flask_app = wsgi_app
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=ASGI_WSGI_WORKERS)
+        self.db_executor = ThreadPoolExecutor(ASGI_DB_WORKERS, thread_name_prefix="asgi-db")
+        self.clients = {}
+        self.flights = idempotency.AsyncSingleFlight()
+        self.routes = {
+            ("POST", "/api/generate-scenario"): self.generate_scenario,
+            ("POST", "/api/evaluate-response"): self.evaluate_response,
+            ("GET", "/api/evaluate-stream"): self.evaluate_stream,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        handler = self.routes.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if handler is None:
+            return await self.wsgi(scope, receive, send)
+
+        started = time.perf_counter()
+        status = []
+
+        async def send_recording_status(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            await send(message)
+
+        try:
+            await handler(Request(scope, await read_body(receive)), send_recording_status)
+        finally:
+            metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=scope["method"],
+                                                 route=scope["path"], status=status[0] if status else 500)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for client in self.clients.values():
+                    await client.aclose()
+                self.db_executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def client_for(self, backend):
+        client = self.clients.get(backend.name)
+        if client is None:
+            client = AsyncGroqClient(api_key=os.environ.get(backend.api_key_env), url=backend.url)
+            self.clients[backend.name] = client
+        return client
+
+    async def run_db(self, func, *args):
+        """Run blocking (database) work on the small executor"""
+        return await asyncio.get_running_loop().run_in_executor(self.db_executor, partial(func, *args))
+
+    async def open_session(self, request):
+        interface = self.flask_app.session_interface
+        cookie = request.cookies.get(interface.get_cookie_name(self.flask_app))
+        return await self.run_db(interface.open_cookie, self.flask_app, cookie)
+
+    async def session_headers(self, session):
+        """Persist a modified session; returns the headers that carry its cookie"""
+        interface = self.flask_app.session_interface
+        if session.modified:
+            await self.run_db(interface.persist, session)
+        if session.new and session:
+            return [(b"set-cookie", interface.cookie_header(self.flask_app, session).encode("latin-1"))]
+        return []
+
+    async def respond_json(self, send, status, data, session=None):
+        headers = await self.session_headers(session) if session is not None else []
+        body = json.dumps(data).encode()
+        await send({"type": "http.response.start", "status": status, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *headers
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def respond_rate_limited(self, send, error):
+        """429 asking the client to retry once the LLM account has room"""
+        body = json.dumps({'error': 'Too many requests right now. Please try again shortly.'}).encode()
+        await send({"type": "http.response.start", "status": 429, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, int(error.retry_after + 0.5))).encode())
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def generate_scenario(self, request, send):
+        """Generate scenario based on job role"""
+        data = request.json() or {}
+        job_role = data.get('job_role', '')
+        complexity = data.get('complexity', 'Medium')
+
+        if not job_role:
+            return await self.respond_json(send, 400, {'error': 'Job role is required'})
+
+        session = await self.open_session(request)
+        scenario_data = await self.run_db(scenario_pool.take, job_role, complexity)
+        if scenario_data is None:
+            try:
+                scenario_data, _ = await routing.complete_async(
+                    'scenario', complexity, build_scenario_messages(job_role, complexity), self.client_for,
+                    temperature=0.8, parse=lambda response: parse_scenario(response, complexity))
+            except ExtractionError as e:
+                print(f"JSON Parse Error: {e}")
+                return await self.respond_json(send, 500, {'error': 'Failed to parse scenario'})
+            except ratelimit.RateLimited as e:
+                return await self.respond_rate_limited(send, e)
+            except Exception as e:
+                print(f"API Error: {str(e)}")
+
+        if not scenario_data:
+            return await self.respond_json(send, 500, {'error': 'Failed to generate scenario'})
+
+        session['job_role'] = job_role
+        session['complexity'] = complexity
+        session['scenario'] = scenario_data
+        session['assessment_id'] = str(uuid.uuid4())
+        return await self.respond_json(send, 200, {'success': True, 'scenario': scenario_data}, session)
+
+    async def evaluate(self, username, job_role, complexity, scenario, user_response, assessment_id=None):
+        """Async run_evaluation: cache, LLM call, parse, store (once per submitted answer)"""
+        assessment_id = idempotency.attempt_key(assessment_id, scenario, user_response)
+        if not assessment_id:
+            return await self.evaluate_once(username, job_role, complexity, scenario, user_response)
+
+        async def lead():
+            stored = await idempotency.acquire_async(username, assessment_id, self.run_db)
+            if stored is not None:
+                return stored
+            try:
+                return await self.evaluate_once(username, job_role, complexity, scenario, user_response,
+                                                assessment_id)
+            finally:
+                await self.run_db(idempotency.release, username, assessment_id)
+
+        return await self.flights.do((username, assessment_id), lead)
+
+    async def evaluate_once(self, username, job_role, complexity, scenario, user_response, assessment_id=None):
+        key = evaluation_cache_key(complexity, scenario, user_response)
+        evaluation_data = await self.run_db(eval_cache.get, key)
+        if evaluation_data is None:
+            messages = build_evaluation_messages(job_role, complexity, scenario, user_response)
+            try:
+                evaluation_data, _ = await routing.complete_async(
+                    'evaluation', complexity, messages, self.client_for, temperature=0.5,
+                    parse=lambda response: parse_evaluation(response, complexity))
+            except ExtractionError:
+                raise EvaluationError('Failed to parse evaluation. Please try again.')
+            except ratelimit.RateLimited:
+                raise
+            except Exception as e:
+                print(f"API Error: {str(e)}")
+                raise EvaluationError('Failed to evaluate response')
+            await self.run_db(eval_cache.put, key, evaluation_data)
+        await self.run_db(save_assessment, username, job_role, complexity, evaluation_data, assessment_id,
+                          scenario)
+        return evaluation_data
+
+    async def evaluate_response(self, request, send):
+        """Evaluate user's response to scenario"""
+        data = request.json() or {}
+        user_response = data.get('response', '')
+
+        if not user_response or len(user_response) < 50:
+            return await self.respond_json(send, 400, {'error': 'Response too short. Please provide a detailed answer.'})
+
+        session = await self.open_session(request)
+        if 'user' not in session:
+            return await self.respond_json(send, 401, {'error': 'Not logged in'})
+
+        # Retries and double submits of one attempt carry the same key
+        assessment_id = idempotency.clean_key(data.get('assessment_id')) or session.get('assessment_id')
+        try:
+            evaluation_data = await self.evaluate(session['user'], session.get('job_role', 'Professional'),
+                                                  session.get('complexity', 'Medium'),
+                                                  session.get('scenario', {}), user_response, assessment_id)
+        except EvaluationError as e:
+            return await self.respond_json(send, 500, {'error': str(e)})
+        except ratelimit.RateLimited as e:
+            return await self.respond_rate_limited(send, e)
+
+        session['evaluation'] = evaluation_data
+        session['user_response'] = user_response
+        session['timestamp'] = datetime.now().isoformat()
+        return await self.respond_json(send, 200, {'success': True, 'evaluation': evaluation_data}, session)
+
+    async def evaluate_stream(self, request, send):
+        """Stream the evaluation of the submitted response as Server-Sent Events"""
+        session = await self.open_session(request)
+        if 'user' not in session or 'user_response' not in session:
+            return await self.respond_json(send, 404, {'error': 'No response submitted'})
+
+        username = session['user']
+        job_role = session.get('job_role', 'Professional')
+        complexity = session.get('complexity', 'Medium')
+        scenario = session.get('scenario', {})
+        user_response = session['user_response']
+        assessment_id = idempotency.attempt_key(session.get('assessment_id'), scenario, user_response)
+
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no")
+        ]})
+
+        async def emit(event, data):
+            await send({"type": "http.response.body", "body": sse_event(event, data).encode(), "more_body": True})
+
+        async def finish(evaluation_data):
+            await self.run_db(save_assessment, username, job_role, complexity, evaluation_data, assessment_id,
+                              scenario)
+            session['evaluation'] = evaluation_data
+            session['timestamp'] = datetime.now().isoformat()
+            await self.run_db(self.flask_app.session_interface.persist, session)
+            await emit('done', {'evaluation': evaluation_data})
+
+        async def evaluate():
+            cache_key = evaluation_cache_key(complexity, scenario, user_response)
+            cached = await self.run_db(eval_cache.get, cache_key)
+            if cached is not None:
+                return await finish(cached)
+
+            messages = build_evaluation_messages(job_role, complexity, scenario, user_response)
+            parser = IncrementalJSONParser()
+            chunks = []
+            try:
+                async for delta in routing.stream_async('evaluation', complexity, messages, self.client_for,
+                                                        temperature=0.5):
+                    chunks.append(delta)
+                    for path, value in parser.feed(delta):
+                        if len(path) == 1:
+                            await emit('field', {'key': path[0], 'value': value})
+                        else:
+                            await emit('item', {'key': path[0], 'name': path[1], 'value': value})
+            except ratelimit.RateLimited as e:
+                return await emit('error', {'error': 'Too many requests right now. Please try again shortly.',
+                                            'retry_after': round(e.retry_after, 1)})
+            except Exception as e:
+                print(f"API Error: {str(e)}")
+                return await emit('error', {'error': 'Failed to evaluate response'})
+
+            try:
+                evaluation_data = parse_evaluation(''.join(chunks), complexity)
+            except ExtractionError:
+                return await emit('error', {'error': 'Failed to parse evaluation. Please try again.'})
+
+            await self.run_db(eval_cache.put, cache_key, evaluation_data)
+            await finish(evaluation_data)
+
+        try:
+            await emit('meta', {'job_role': job_role, 'complexity': complexity})
+            if not assessment_id:
+                return await evaluate()
+
+            # A duplicate request or an EventSource reconnect may already be evaluating this attempt
+            stored = await idempotency.acquire_async(username, assessment_id, self.run_db)
+            if stored is not None:
+                return await finish(stored)
+            try:
+                await evaluate()
+            finally:
+                await self.run_db(idempotency.release, username, assessment_id)
+        finally:
+            await send({"type": "http.response.body", "body": b""})
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+app = AsyncApp(flask_app)
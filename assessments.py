@@ -0,0 +1,119 @@
+import base64
+import json
+
+from stats import record_assessment
+from evaluation_store import encode_evaluation, load_evaluation
+from search import index_assessment
+
+PAGE_SIZE = 20
+
+# Columns the dashboard list needs; never includes evaluation_data
+SUMMARY_COLUMNS = 'id, job_role, complexity, overall_score, performance_level, dimension_scores, created_at'
+
+def summary_fields(evaluation_data):
+    """Denormalized columns stored next to the evaluation blob"""
+    dimensions = evaluation_data.get('dimensions') or {}
+    scores = {name: value.get('score') for name, value in dimensions.items() if isinstance(value, dict)}
+    level = evaluation_data.get('performance_level') or evaluation_data.get('performace_level')
+    return level, json.dumps(scores, separators=(',', ':'))
+
+def insert_assessment(conn, user_id, job_role, complexity, evaluation_data, assessment_key=None, scenario=None):
+    """Insert an assessment row, update the role statistics and index it for search (the caller commits)
+
+    Returns the new id, or None if an assessment with this key is already stored.
+    """
+    performance_level, dimension_scores = summary_fields(evaluation_data)
+    cursor = conn.execute('''
+        INSERT INTO assessments (user_id, job_role, complexity, overall_score, evaluation_data,
+                                 performance_level, dimension_scores, assessment_key)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, assessment_key) WHERE assessment_key IS NOT NULL DO NOTHING
+    ''', (user_id, job_role, complexity, evaluation_data.get('overall_score', 0),
+          encode_evaluation(evaluation_data), performance_level, dimension_scores, assessment_key))
+    if not cursor.rowcount:
+        return None
+    record_assessment(conn, user_id, cursor.lastrowid, job_role, complexity, evaluation_data.get('overall_score', 0),
+                      json.loads(dimension_scores))
+    index_assessment(conn, cursor.lastrowid, user_id, job_role, complexity, evaluation_data, scenario)
+    return cursor.lastrowid
+
+def encode_cursor(row):
+    raw = json.dumps([row['created_at'], row['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a page cursor, or None if it is invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, assessment_id = json.loads(raw)
+        return str(created_at), int(assessment_id)
+    except (ValueError, TypeError):
+        return None
+
+def list_assessments(conn, user_id, cursor=None, limit=PAGE_SIZE):
+    """One page of summaries, newest first; returns (rows, next_cursor)"""
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        rows = conn.execute(f'''
+            SELECT {SUMMARY_COLUMNS} FROM assessments
+            WHERE user_id = ? AND (created_at, id) < (?, ?)
+            ORDER BY created_at DESC, id DESC LIMIT ?
+        ''', (user_id, position[0], position[1], limit + 1)).fetchall()
+    else:
+        rows = conn.execute(f'''
+            SELECT {SUMMARY_COLUMNS} FROM assessments
+            WHERE user_id = ?
+            ORDER BY created_at DESC, id DESC LIMIT ?
+        ''', (user_id, limit + 1)).fetchall()
+
+    items = []
+    for row in rows[:limit]:
+        item = dict(row)
+        item['dimension_scores'] = json.loads(item['dimension_scores'] or '{}')
+        items.append(item)
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return items, next_cursor
+
+def assessment_totals(conn, user_id):
+    """Count and average score over the user's whole history"""
+    row = conn.execute('''
+        SELECT COUNT(*) AS total, AVG(overall_score) AS average
+        FROM assessments WHERE user_id = ?
+    ''', (user_id,)).fetchone()
+    return row['total'], row['average'] or 0
+
+def history_version(conn, user_id):
+    """Changes whenever the user's history does (rows are only ever appended)"""
+    row = conn.execute('''
+        SELECT COUNT(*) AS total, MAX(id) AS latest FROM assessments WHERE user_id = ?
+    ''', (user_id,)).fetchone()
+    return f"{row['total']}-{row['latest'] or 0}"
+
+def get_assessment(conn, user_id, assessment_id):
+    """Full assessment including the parsed evaluation, or None"""
+    row = conn.execute('''
+        SELECT * FROM assessments WHERE id = ? AND user_id = ?
+    ''', (assessment_id, user_id)).fetchone()
+    if not row:
+        return None
+    assessment = dict(row)
+    assessment['dimension_scores'] = json.loads(assessment['dimension_scores'] or '{}')
+    assessment['evaluation'] = load_evaluation(conn, assessment['id'], assessment.pop('evaluation_data'))
+    return assessment
+
+def backfill_summary_columns(conn, after_id, through_id, batch_size=500):
+    """Backfill step: populate the denormalized columns of one batch; returns its last id, or None when done"""
+    rows = conn.execute('''
+        SELECT id, evaluation_data FROM assessments WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+    ''', (after_id, through_id, batch_size)).fetchall()
+    if not rows:
+        return None
+    for row in rows:
+        try:
+            evaluation_data = load_evaluation(conn, row['id'], row['evaluation_data'])
+        except (ValueError, LookupError):
+            evaluation_data = {}
+        conn.execute('''
+            UPDATE assessments SET performance_level = ?, dimension_scores = ? WHERE id = ?
+        ''', (*summary_fields(evaluation_data if isinstance(evaluation_data, dict) else {}), row['id']))
+    return rows[-1]['id']
@@ -0,0 +1,166 @@
+"""Static asset build and fingerprinted serving.
+
+`python assets.py` minifies the stylesheets and scripts under static/, writes
+content-hashed copies (style.3f9a1c2b07.css) with .gz and .br siblings to
+static/dist, and records the mapping in static/dist/manifest.json. Templates
+link assets through asset_url(), which emits the fingerprinted /assets/ URL
+when a build exists and the plain /static/ URL otherwise, so a fresh checkout
+works without a build. A fingerprinted file never changes, so it is served
+with an immutable one-year Cache-Control. Re-run the build after editing
+anything under static/.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # gzip variants only
+    brotli = None
+
+# Tunables (override through the environment)
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT_DIR, "static")
+BUILD_DIR = os.environ.get("ASSET_BUILD_DIR", os.path.join(STATIC_DIR, "dist"))
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+HASH_LENGTH = 10
+
+# Preferred first; a variant is only served if the client accepts it
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+# Comments and string literals; strings are copied through untouched
+_CSS_TOKENS = re.compile(r'(/\*.*?\*/|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\')', re.S)
+
+
+def minify_css(text):
+    """Drop comments and collapse whitespace outside string literals"""
+    out = []
+    for index, part in enumerate(_CSS_TOKENS.split(text)):
+        if index % 2:
+            if not part.startswith("/*"):
+                out.append(part)
+            continue
+        part = re.sub(r"\s+", " ", part)
+        part = re.sub(r"\s*([{};,>])\s*", r"\1", part)
+        part = re.sub(r":\s+", ":", part)
+        out.append(part.replace(";}", "}"))
+    return "".join(out).strip() + "\n"
+
+
+def minify_js(text):
+    """Whitespace-only: drop indentation, blank lines and whole-line comments
+
+    Line breaks are kept, so automatic semicolon insertion is unaffected and
+    no JavaScript parser is needed.
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//")) + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+def _sources(static_dir, build_dir):
+    for directory, subdirs, files in os.walk(static_dir):
+        if os.path.abspath(directory) == os.path.abspath(build_dir):
+            subdirs[:] = []
+            continue
+        for filename in sorted(files):
+            if os.path.splitext(filename)[1] in MINIFIERS:
+                path = os.path.join(directory, filename)
+                yield os.path.relpath(path, static_dir).replace(os.sep, "/"), path
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def build(static_dir=STATIC_DIR, build_dir=BUILD_DIR):
+    """Minify, fingerprint and precompress every asset; returns the manifest"""
+    manifest = {}
+    for name, path in _sources(static_dir, build_dir):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        root, ext = os.path.splitext(name)
+        data = MINIFIERS[ext](text).encode("utf-8")
+        hashed = f"{root}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+        target = os.path.join(build_dir, hashed)
+        _write(target, data)
+        _write(target + ".gz", gzip.compress(data, 9, mtime=0))
+        if brotli is not None:
+            _write(target + ".br", brotli.compress(data, quality=11))
+        manifest[name] = hashed
+        print(f"{name} -> {hashed} ({len(text.encode('utf-8'))} -> {len(data)} bytes)")
+    _write(os.path.join(build_dir, "manifest.json"), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+def load_manifest(build_dir=BUILD_DIR):
+    try:
+        with open(os.path.join(build_dir, "manifest.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+_manifest = {}
+
+# Identifies the deployed assets and templates; pages whose ETag embeds it
+# revalidate after a deploy instead of pointing at superseded assets
+RELEASE = ""
+
+
+def _release_id(app):
+    digest = hashlib.sha256(json.dumps(_manifest, sort_keys=True).encode())
+    template_dir = os.path.join(app.root_path, app.template_folder or "templates")
+    for directory, _, files in sorted(os.walk(template_dir)):
+        for filename in sorted(files):
+            with open(os.path.join(directory, filename), "rb") as f:
+                digest.update(filename.encode() + b"\0" + f.read())
+    return digest.hexdigest()[:16]
+
+
+def asset_url(filename):
+    """URL of a static asset; the fingerprinted build when one exists"""
+    hashed = _manifest.get(filename)
+    if hashed is None:
+        return url_for("static", filename=filename)
+    return url_for("asset", filename=hashed)
+
+
+def serve_asset(filename):
+    """Serve a fingerprinted asset, precompressed when the client accepts it"""
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in PRECOMPRESSED:
+        path = safe_join(BUILD_DIR, filename + suffix)
+        if request.accept_encodings[encoding] and path and os.path.isfile(path):
+            response = send_from_directory(BUILD_DIR, filename + suffix, mimetype=mimetype,
+                                           max_age=IMMUTABLE_MAX_AGE)
+            response.content_encoding = encoding
+            break
+    else:
+        response = send_from_directory(BUILD_DIR, filename, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.immutable = True
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_app(app):
+    """Register the /assets route and the asset_url template helper"""
+    global _manifest, RELEASE
+    _manifest = load_manifest()
+    RELEASE = _release_id(app)
+    app.add_url_rule("/assets/<path:filename>", "asset", serve_asset)
+    app.add_template_global(asset_url)
+
+
+if __name__ == "__main__":
+    build()
@@ -0,0 +1,210 @@
+"""Bulk evaluation of candidate responses from JSONL or CSV files.
+
+Each input record needs a response and may carry an id, job_role,
+complexity and scenario; common aliases such as request_id/body/title are
+accepted so files like requests.jsonl work as-is. Results are written as
+JSONL in completion order. Re-running with the same output file skips
+items that already succeeded.
+
+    python batch.py input.jsonl -o results.jsonl [--concurrency 8] [--rpm 30] [--tpm 12000]
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from database import init_db, get_db_connection
+from evaluation import build_evaluation_messages, evaluation_cache_key
+from json_extract import parse_evaluation_text, ExtractionError
+import routing
+import eval_cache
+import ratelimit
+from ratelimit import GROQ_RPM, GROQ_TPM
+
+# Tunables (override through the environment)
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+
+ID_FIELDS = ("id", "item_id", "request_id", "candidate_id")
+RESPONSE_FIELDS = ("response", "user_response", "answer", "body")
+SCENARIO_FIELDS = ("scenario", "scenario_description", "title")
+
+
+def _first(record, fields, default=None):
+    for field in fields:
+        value = record.get(field)
+        if value not in (None, ""):
+            return value
+    return default
+
+
+def normalize_item(record, line_number):
+    """Map an input record onto the fields the evaluator needs"""
+    if not isinstance(record, dict):
+        raise ValueError(f"line {line_number}: expected a JSON object, got {type(record).__name__}")
+    scenario = _first(record, SCENARIO_FIELDS, "")
+    if isinstance(scenario, dict):
+        scenario = scenario.get("scenario_description", "")
+    return {
+        "id": str(_first(record, ID_FIELDS, line_number)),
+        "job_role": record.get("job_role") or "Professional",
+        "complexity": record.get("complexity") or "Medium",
+        "scenario": str(scenario),
+        "response": str(_first(record, RESPONSE_FIELDS, ""))
+    }
+
+
+def read_items(stream, fmt):
+    """Yield normalized items from a JSONL or CSV text stream"""
+    if fmt == "csv":
+        for line_number, record in enumerate(csv.DictReader(stream), start=1):
+            yield normalize_item(record, line_number)
+        return
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if line:
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"line {line_number}: {e}")
+            yield normalize_item(record, line_number)
+
+
+def detect_format(filename):
+    return "csv" if filename and filename.lower().endswith(".csv") else "jsonl"
+
+
+def evaluate_item(item):
+    """Evaluate one item; returns a result record, never raises
+
+    routing.complete holds each call to the process-wide account rate limits
+    it shares with interactive evaluations, waiting as long as they require.
+    """
+    result = {"id": item["id"], "job_role": item["job_role"], "complexity": item["complexity"]}
+    if len(item["response"]) < 50:
+        return dict(result, status="error", error="Response too short")
+
+    scenario = {"scenario_description": item["scenario"]}
+    key = evaluation_cache_key(item["complexity"], scenario, item["response"])
+    cached = eval_cache.get(key)
+    if cached is not None:
+        return dict(result, status="ok", evaluation=cached, cached=True)
+
+    messages = build_evaluation_messages(item["job_role"], item["complexity"], scenario, item["response"])
+    try:
+        evaluation_data, _ = routing.complete(
+            "evaluation", item["complexity"], messages, temperature=0.5,
+            parse=lambda text: parse_evaluation_text(text, item["complexity"])[0], max_wait=None)
+    except ExtractionError as e:
+        return dict(result, status="error", error=f"Parse error: {e}")
+    except Exception as e:
+        return dict(result, status="error", error=f"API error: {e}")
+    eval_cache.put(key, evaluation_data)
+    return dict(result, status="ok", evaluation=evaluation_data, cached=False)
+
+
+def run_batch(items, skip_ids=(), concurrency=BATCH_CONCURRENCY):
+    """Evaluate items concurrently, yielding result records in completion order
+
+    At most `concurrency` items are in flight. Closing the generator (the
+    client of a streamed upload disconnecting) submits nothing more and
+    returns without waiting for the calls still running.
+    """
+    skip_ids = set(skip_ids)
+    pending = (item for item in items if item["id"] not in skip_ids)
+    pool = ThreadPoolExecutor(concurrency, thread_name_prefix="batch")
+    try:
+        running = {pool.submit(evaluate_item, item) for item in itertools.islice(pending, concurrency)}
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = next(pending, None)
+                if item is not None:
+                    running.add(pool.submit(evaluate_item, item))
+                yield future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def load_checkpoint(batch_id, owner):
+    """Successful results already stored for an uploaded batch"""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute('''
+            SELECT item_id, result FROM batch_results WHERE batch_id = ? AND owner = ?
+        ''', (batch_id, owner)).fetchall()
+    finally:
+        conn.close()
+    return {row['item_id']: json.loads(row['result']) for row in rows}
+
+
+def save_checkpoint(batch_id, owner, result):
+    """Record a successful result so a resumed upload does not redo it"""
+    if result["status"] != "ok":
+        return
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            INSERT OR REPLACE INTO batch_results (batch_id, owner, item_id, result, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (batch_id, owner, result["id"], json.dumps(result), time.time()))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def completed_ids(path):
+    """Ids already evaluated successfully in an existing output file (the checkpoint)"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # partial line from an interrupted run
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a JSONL/CSV batch of candidate responses")
+    parser.add_argument("input", help="JSONL or CSV file ('-' for JSONL on stdin)")
+    parser.add_argument("-o", "--output", required=True, help="JSONL results file, also the resume checkpoint")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="input format (default: from extension)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--rpm", type=float, default=GROQ_RPM, help="Groq requests per minute")
+    parser.add_argument("--tpm", type=float, default=GROQ_TPM, help="Groq tokens per minute")
+    args = parser.parse_args()
+
+    init_db()
+    ratelimit.configure(args.rpm, args.tpm)
+    fmt = args.format or detect_format(args.input)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", newline="")
+    with source:
+        items = list(read_items(source, fmt))
+
+    done = completed_ids(args.output)
+    if done:
+        print(f"Resuming: {len(done)} item(s) already done", file=sys.stderr)
+
+    ok = failed = 0
+    with open(args.output, "a", encoding="utf-8") as out:
+        for result in run_batch(items, done, args.concurrency):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            if result["status"] == "ok":
+                ok += 1
+            else:
+                failed += 1
+            print(f"[{ok + failed}] {result['id']}: {result['status']}", file=sys.stderr)
+    print(f"Done: {ok} ok, {failed} failed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Regression check and micro-benchmark for LLM JSON extraction.
+
+Runs every response in benchmarks/corpus through the legacy regex/slice
+parse path and through json_extract, reports how many each recovers and
+the mean parse time, and exits non-zero if a corpus expectation fails.
+
+    python benchmarks/bench_json_extract.py [--iterations 2000]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_extract import parse_evaluation_text, parse_scenario_text
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+
+def legacy_parse(response):
+    """The parse path evaluate_response used before json_extract"""
+    response = response.strip()
+    json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
+    if json_match:
+        response = json_match.group(1)
+    else:
+        start = response.find('{')
+        end = response.rfind('}')
+        if start != -1 and end != -1:
+            response = response[start:end+1]
+    try:
+        return json.loads(response)
+    except json.JSONDecodeError:
+        fixed_response = re.sub(r'\]\s*\}\s*,', '}},', response)
+        if fixed_response == response:
+            fixed_response = re.sub(r'\]\s*\}\s*$', '}}', response)
+        return json.loads(fixed_response)
+
+
+def new_parse(text, meta):
+    if meta["kind"] == "scenario":
+        return parse_scenario_text(text)[0]
+    return parse_evaluation_text(text, meta["complexity"])[0]
+
+
+def timed(func, iterations):
+    """Mean seconds per call, or None if the call raises"""
+    try:
+        func()
+    except ValueError:
+        return None
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(os.path.join(CORPUS_DIR, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    failures = 0
+    legacy_ok = new_ok = 0
+    legacy_total = new_total = 0.0
+    print(f"{'sample':45} {'legacy':>12} {'extract':>12}")
+    for name, meta in manifest.items():
+        with open(os.path.join(CORPUS_DIR, name), encoding="utf-8") as f:
+            text = f.read()
+
+        legacy = timed(lambda: legacy_parse(text), args.iterations)
+        new = timed(lambda: new_parse(text, meta), args.iterations)
+        legacy_ok += legacy is not None
+        new_ok += new is not None
+        if legacy is not None and new is not None:
+            legacy_total += legacy
+            new_total += new
+
+        fmt = lambda t: "fail" if t is None else f"{t * 1e6:9.1f} us"
+        flag = ""
+        if (new is not None) != meta["recoverable"]:
+            failures += 1
+            flag = "  <-- unexpected"
+        print(f"{name:45} {fmt(legacy):>12} {fmt(new):>12}{flag}")
+
+    print()
+    print(f"recovered: legacy {legacy_ok}/{len(manifest)}, extract {new_ok}/{len(manifest)}")
+    print(f"total parse time on samples both recover: legacy {legacy_total * 1e6:.1f} us, "
+          f"extract {new_total * 1e6:.1f} us")
+    if failures:
+        print(f"{failures} corpus expectation(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""OpenAI-compatible stand-in for the Groq chat-completions API.
+
+Returns scenario or evaluation JSON shaped like the real model's output,
+with a log-normal latency distribution, a fixed token rate, streaming, and
+optional 429/5xx and malformed-JSON injection. Point the app at it with
+
+    python benchmarks/fake_groq.py --port 8100 [--latency 0.4] [--rate-429 0.05]
+    GROQ_API_URL=http://127.0.0.1:8100/openai/v1/chat/completions GROQ_API_KEY=fake python app.py
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_extract import EVALUATION_DIMENSIONS
+
+COMPLEXITY_RE = re.compile(r"COMPLEXITY LEVEL:\s*(Low|Medium|High)")
+WORDS = ("the team must balance delivery risk against budget while stakeholders disagree on "
+         "priorities and a critical system shows intermittent failures under peak load").split()
+
+DEFAULTS = {
+    "latency": 0.3,          # median seconds before the first token
+    "latency_sigma": 0.5,    # log-normal shape; 0 gives a constant latency
+    "tokens_per_second": 400.0,
+    "rate_429": 0.0,
+    "rate_5xx": 0.0,
+    "retry_after": 1.0,
+    "malformed_rate": 0.0,
+}
+
+
+def _sentence(words):
+    return " ".join(random.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def scenario_content():
+    return json.dumps({
+        "scenario_title": _sentence(5).rstrip("."),
+        "scenario_description": " ".join(_sentence(15) for _ in range(8)),
+        "complexity_level": "Medium",
+        "key_challenges": [_sentence(8) for _ in range(3)]
+    }, indent=2)
+
+
+def evaluation_content(complexity):
+    return json.dumps({
+        "overall_score": random.randint(40, 95),
+        "dimensions": {name: {"score": random.randint(30, 100), "feedback": _sentence(20)}
+                       for name in EVALUATION_DIMENSIONS[complexity]},
+        "strengths": [_sentence(10) for _ in range(3)],
+        "weaknesses": [_sentence(10) for _ in range(3)],
+        "skill_readiness": _sentence(25),
+        "recommendations": [_sentence(12) for _ in range(3)],
+        "performance_level": random.choice(("Entry", "Mid", "Senior", "Expert")),
+        "ideal_answer": " ".join(_sentence(15) for _ in range(8))
+    }, indent=2)
+
+
+def malform(content):
+    """Damage the JSON the way the real model has been seen to"""
+    damage = random.choice((
+        lambda text: f"```json\n{text}\n```",
+        lambda text: text.replace("}\n  },", "}\n  ],", 1),
+        lambda text: text.replace('",\n', '"\n', 1),
+        lambda text: text[:int(len(text) * random.uniform(0.3, 0.9))],
+    ))
+    return damage(content)
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    options = dict(DEFAULTS)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": "Not found"}})
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        options = self.options
+
+        roll = random.random()
+        if roll < options["rate_429"]:
+            return self._send_json(429, {"error": {"message": "Rate limit reached"}},
+                                   {"Retry-After": str(options["retry_after"])})
+        if roll < options["rate_429"] + options["rate_5xx"]:
+            return self._send_json(random.choice((500, 502, 503)), {"error": {"message": "Upstream error"}})
+
+        prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+        match = COMPLEXITY_RE.search(prompt)
+        content = evaluation_content(match.group(1)) if match else scenario_content()
+        if random.random() < options["malformed_rate"]:
+            content = malform(content)
+
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        latency = options["latency"] * math.exp(random.gauss(0, options["latency_sigma"]))
+        time.sleep(latency)
+
+        if body.get("stream"):
+            return self._stream(body.get("model"), content, usage)
+        time.sleep(usage["completion_tokens"] / options["tokens_per_second"])
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": usage
+        })
+
+    def _stream(self, model, content, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        piece = 16  # characters per chunk, about four tokens
+        delay = piece / 4 / self.options["tokens_per_second"]
+        for start in range(0, len(content), piece):
+            self._chunk({"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": content[start:start + piece]}}]})
+            time.sleep(delay)
+        self._chunk({"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                     "x_groq": {"usage": usage}})
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _chunk(self, data):
+        self._write_chunk(f"data: {json.dumps(data)}\n\n".encode())
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, data, headers=None):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_server(host="127.0.0.1", port=0, **options):
+    """Run the fake API on a daemon thread; returns (server, chat completions URL)"""
+    handler = type("ConfiguredFakeGroqHandler", (FakeGroqHandler,), {"options": dict(DEFAULTS, **options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="fake-groq").start()
+    return server, f"http://{host}:{server.server_address[1]}/openai/v1/chat/completions"
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=DEFAULTS["latency"],
+                        help="median seconds before the first token")
+    parser.add_argument("--latency-sigma", type=float, default=DEFAULTS["latency_sigma"],
+                        help="log-normal spread of the latency (0 = constant)")
+    parser.add_argument("--tokens-per-second", type=float, default=DEFAULTS["tokens_per_second"])
+    parser.add_argument("--rate-429", type=float, default=DEFAULTS["rate_429"], help="fraction answered with 429")
+    parser.add_argument("--rate-5xx", type=float, default=DEFAULTS["rate_5xx"], help="fraction answered with 5xx")
+    parser.add_argument("--retry-after", type=float, default=DEFAULTS["retry_after"])
+    parser.add_argument("--malformed-rate", type=float, default=DEFAULTS["malformed_rate"],
+                        help="fraction of completions with damaged JSON")
+
+
+def options_from_args(args):
+    return {name: getattr(args, name) for name in DEFAULTS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server, url = start_server(args.host, args.port, **options_from_args(args))
+    print(f"Fake Groq API listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
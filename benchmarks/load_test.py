@@ -0,0 +1,212 @@
+"""End-to-end load test against the fake Groq API.
+
+Runs N concurrent virtual users through register -> login -> generate
+scenario -> evaluate response -> dashboard and reports throughput and
+p50/p95/p99 latency per step. By default the app and benchmarks/fake_groq.py
+are started in-process on a throwaway database, so no Groq tokens are spent:
+
+    python benchmarks/load_test.py --users 20 --iterations 3 --save-baseline baseline.json
+    python benchmarks/load_test.py --users 20 --iterations 3 --baseline baseline.json
+
+Pass --base-url to drive an already running deployment instead (start it
+with GROQ_API_URL pointing at fake_groq.py and high
+LOGIN_MAX_ATTEMPTS_PER_IP, GROQ_RPM and GROQ_TPM). With --baseline the run exits
+non-zero when p95 latency, throughput or error rate regress beyond
+--tolerance.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_groq
+
+STEPS = ("register", "login", "generate-scenario", "evaluate-response", "dashboard")
+JOB_ROLES = ("Data Analyst", "Software Engineer", "Product Manager", "Nurse", "Accountant")
+COMPLEXITIES = ("Low", "Medium", "High")
+
+
+def start_app(fake_url, pool):
+    """Serve the app on a local thread against the fake API; returns its base URL"""
+    os.environ["GROQ_API_URL"] = fake_url
+    os.environ.setdefault("GROQ_API_KEY", "fake")
+    os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="load-test-"), "users.db")
+    os.environ["SCENARIO_POOL_ENABLED"] = "1" if pool else "0"
+    # Every virtual user logs in from 127.0.0.1
+    os.environ.setdefault("LOGIN_MAX_ATTEMPTS_PER_IP", "1000000")
+    # The fake API has no quota; the production Groq limits would dominate the latencies
+    os.environ.setdefault("GROQ_RPM", "1000000")
+    os.environ.setdefault("GROQ_TPM", "1000000000")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True, name="load-test-app").start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def step(self, name, func, expected=(200,)):
+        started = time.perf_counter()
+        try:
+            response = func()
+            ok = response.status_code in expected
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies[name].append(elapsed)
+            if not ok:
+                self.errors[name] += 1
+        return ok
+
+
+def virtual_user(base_url, index, iterations, recorder, run_id):
+    http = requests.Session()
+    username = f"load-{run_id}-{index}"
+    credentials = {"username": username, "password": "load-test-password", "confirm_password": "load-test-password"}
+
+    recorder.step("register", lambda: http.post(f"{base_url}/register", data=credentials, allow_redirects=False),
+                  expected=(302,))
+    if not recorder.step("login", lambda: http.post(f"{base_url}/login", data=credentials, allow_redirects=False),
+                         expected=(302,)):
+        return
+
+    for iteration in range(iterations):
+        job_role = JOB_ROLES[(index + iteration) % len(JOB_ROLES)]
+        complexity = COMPLEXITIES[(index + iteration) % len(COMPLEXITIES)]
+        if not recorder.step("generate-scenario", lambda: http.post(
+                f"{base_url}/api/generate-scenario", json={"job_role": job_role, "complexity": complexity})):
+            continue
+        # Unique text so the evaluation cache never short-circuits the upstream call
+        answer = (f"Virtual user {index} answer {iteration} ({run_id}): I would first clarify the goals, "
+                  "gather data from the affected teams, weigh the risks and agree on a plan with owners.")
+        recorder.step("evaluate-response", lambda: http.post(
+            f"{base_url}/api/evaluate-response", json={"response": answer}))
+        recorder.step("dashboard", lambda: http.get(f"{base_url}/dashboard"))
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(recorder, wall_seconds):
+    steps = {}
+    for name in STEPS:
+        values = sorted(recorder.latencies.get(name, []))
+        steps[name] = {
+            "count": len(values),
+            "errors": recorder.errors.get(name, 0),
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99)
+        }
+    requests_done = sum(step["count"] for step in steps.values())
+    flows = steps["evaluate-response"]["count"] - steps["evaluate-response"]["errors"]
+    return {
+        "wall_seconds": wall_seconds,
+        "requests_per_second": requests_done / wall_seconds if wall_seconds else 0.0,
+        "evaluations_per_second": flows / wall_seconds if wall_seconds else 0.0,
+        "steps": steps
+    }
+
+
+def print_report(summary):
+    print(f"{'step':20} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, step in summary["steps"].items():
+        print(f"{name:20} {step['count']:>6} {step['errors']:>6} "
+              f"{step['p50'] * 1000:>9.1f} {step['p95'] * 1000:>9.1f} {step['p99'] * 1000:>9.1f}")
+    print()
+    print(f"wall time {summary['wall_seconds']:.2f}s, {summary['requests_per_second']:.1f} req/s, "
+          f"{summary['evaluations_per_second']:.2f} evaluations/s")
+
+
+def compare(summary, baseline, tolerance):
+    """Regressions of this run against a saved baseline"""
+    problems = []
+    if summary["evaluations_per_second"] < baseline["evaluations_per_second"] * (1 - tolerance):
+        problems.append(f"throughput {summary['evaluations_per_second']:.2f}/s "
+                        f"< baseline {baseline['evaluations_per_second']:.2f}/s")
+    for name, step in summary["steps"].items():
+        base = baseline["steps"].get(name)
+        if not base or not step["count"]:
+            continue
+        if step["p95"] > base["p95"] * (1 + tolerance):
+            problems.append(f"{name} p95 {step['p95'] * 1000:.1f} ms > baseline {base['p95'] * 1000:.1f} ms")
+        if step["errors"] / step["count"] > base["errors"] / max(base["count"], 1) + 0.01:
+            problems.append(f"{name} error rate {step['errors']}/{step['count']} "
+                            f"> baseline {base['errors']}/{base['count']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=3, help="scenario/evaluate/dashboard rounds per user")
+    parser.add_argument("--base-url", help="target a running app instead of starting one in-process")
+    parser.add_argument("--pool", action="store_true", help="enable the warm scenario pool in-process")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write this run's summary as a baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="fail if this run regresses against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    fake_groq.add_arguments(parser)
+    args = parser.parse_args()
+
+    options = fake_groq.options_from_args(args)
+    base_url = args.base_url
+    if not base_url:
+        _, fake_url = fake_groq.start_server(**options)
+        base_url = start_app(fake_url, args.pool)
+
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+    started = time.perf_counter()
+    users = [threading.Thread(target=virtual_user, args=(base_url, index, args.iterations, recorder, run_id))
+             for index in range(args.users)]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    summary = summarize(recorder, time.perf_counter() - started)
+    summary["config"] = {"users": args.users, "iterations": args.iterations, "fake_groq": options,
+                         "in_process": not args.base_url}
+    print_report(summary)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(summary, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
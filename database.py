@@ -1,31 +1,104 @@
 import sqlite3
 import os
+import threading
+import time
 
-DB_NAME = "users.db"
+import metrics
+from assessments import backfill_summary_columns
+from stats import backfill as backfill_stats
+from evaluation_store import attach_archive, compact_batch
+from search import backfill_index, RANK_WEIGHTS
 
-def get_db_connection():
-    """Create a database connection"""
-    conn = sqlite3.connect(DB_NAME)
+DB_NAME = os.environ.get("DATABASE_PATH", "users.db")
+
+# Connection tuning (override through the environment)
+BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", "10"))
+CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", "16384"))
+MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024)))
+SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+# Rows per committed batch of a data backfill
+BACKFILL_BATCH = int(os.environ.get("BACKFILL_BATCH", "500"))
+
+class PooledConnection(sqlite3.Connection):
+    """Connection owned by one thread and reused across requests
+
+    close() only ends any open transaction so callers can keep the
+    open/commit/close pattern; the connection itself stays in the pool.
+    """
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.observe_query(sql, time.perf_counter() - started)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            metrics.SQLITE_QUERY_SECONDS.observe(time.perf_counter() - started, statement="COMMIT")
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def close_for_real(self):
+        super().close()
+
+_local = threading.local()
+
+def _connect():
+    conn = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT, factory=PooledConnection)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    attach_archive(conn)
     return conn
 
-def init_db():
-    """Initialize the database with users table"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Create users table
-    cursor.execute('''
+def open_connection():
+    """A connection outside the pool for long reads such as exports; close it with close_for_real()"""
+    return _connect()
+
+def get_db_connection():
+    """Return this thread's pooled database connection"""
+    conn = getattr(_local, 'conn', None)
+    # Never share a connection across a fork
+    if conn is None or _local.pid != os.getpid():
+        conn = _connect()
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+def _schedule(name):
+    """Migration step: queue a backfill over the assessments that exist right now
+
+    Rows inserted after the migration commits are written complete, so the
+    backfill stops at the current highest id.
+    """
+    return f'''
+        INSERT OR IGNORE INTO backfills (name, after_id, through_id)
+        SELECT '{name}', 0, COALESCE(MAX(id), 0) FROM assessments
+    '''
+
+# Schema migrations, applied in order and recorded in PRAGMA user_version.
+# Append new entries; never edit one that has shipped.
+MIGRATIONS = [
+    # 1: users and assessments
+    [
+        '''
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT UNIQUE NOT NULL,
             password_hash TEXT NOT NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-    ''')
-
-    # Create assessments table
-    cursor.execute('''
+        )
+        ''',
+        '''
         CREATE TABLE IF NOT EXISTS assessments (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER NOT NULL,
@@ -35,9 +108,297 @@ def init_db():
             evaluation_data TEXT NOT NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users (id)
-        );
-    ''')
-    
-    conn.commit()
-    conn.close()
-    print(f"Database {DB_NAME} initialized successfully.")
+        )
+        ''',
+    ],
+    # 2: pre-generated scenarios and the decayed demand that sizes their pools
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS scenario_pool (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            role_key TEXT NOT NULL,
+            complexity TEXT NOT NULL,
+            scenario_data TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_scenario_pool_key
+        ON scenario_pool (role_key, complexity, created_at)
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS scenario_demand (
+            role_key TEXT NOT NULL,
+            complexity TEXT NOT NULL,
+            role_label TEXT NOT NULL,
+            demand REAL NOT NULL DEFAULT 0,
+            last_requested_at REAL NOT NULL,
+            PRIMARY KEY (role_key, complexity)
+        )
+        ''',
+    ],
+    # 3: durable queue of evaluations for the background worker pool
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS evaluation_jobs (
+            id TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            status TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            locked_at REAL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_evaluation_jobs_status
+        ON evaluation_jobs (status, created_at)
+        ''',
+    ],
+    # 4: per-user history lookups for the dashboard
+    [
+        '''
+        CREATE INDEX IF NOT EXISTS idx_assessments_user_created
+        ON assessments (user_id, created_at DESC)
+        ''',
+    ],
+    # 5: summary columns so the dashboard list never reads evaluation_data,
+    #    an index matching the (created_at, id) keyset order, and the queue
+    #    of data backfills that run after the schema changes commit
+    [
+        'ALTER TABLE assessments ADD COLUMN performance_level TEXT',
+        'ALTER TABLE assessments ADD COLUMN dimension_scores TEXT',
+        '''
+        CREATE TABLE IF NOT EXISTS backfills (
+            name TEXT PRIMARY KEY,
+            after_id INTEGER NOT NULL,
+            through_id INTEGER NOT NULL,
+            done INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        _schedule('summary_columns'),
+        'DROP INDEX IF EXISTS idx_assessments_user_created',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_assessments_user_created_id
+        ON assessments (user_id, created_at DESC, id DESC)
+        ''',
+    ],
+    # 6: server-side session store
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_sessions_expires
+        ON sessions (expires_at)
+        ''',
+    ],
+    # 7: content-addressed cache of evaluations
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS evaluation_cache (
+            key TEXT PRIMARY KEY,
+            evaluation TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_hit_at REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_evaluation_cache_last_hit
+        ON evaluation_cache (last_hit_at)
+        ''',
+    ],
+    # 8: checkpoints of uploaded evaluation batches
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS batch_results (
+            batch_id TEXT NOT NULL,
+            owner TEXT NOT NULL,
+            item_id TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (batch_id, item_id)
+        )
+        ''',
+    ],
+    # 9: materialized per-role score statistics and per-user daily trends
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS role_stats (
+            role_key TEXT NOT NULL,
+            complexity TEXT NOT NULL,
+            job_role TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            mean REAL NOT NULL,
+            m2 REAL NOT NULL,
+            min_score REAL,
+            max_score REAL,
+            histogram TEXT NOT NULL,
+            dimensions TEXT NOT NULL,
+            leaderboard TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (role_key, complexity)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS user_daily_scores (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            score_sum REAL NOT NULL,
+            PRIMARY KEY (user_id, day)
+        )
+        ''',
+        _schedule('role_stats'),
+    ],
+    # 10: idempotency key of each assessment attempt, and in-flight claims on it
+    [
+        'ALTER TABLE assessments ADD COLUMN assessment_key TEXT',
+        '''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_assessments_user_key
+        ON assessments (user_id, assessment_key) WHERE assessment_key IS NOT NULL
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS evaluation_claims (
+            owner TEXT NOT NULL,
+            assessment_key TEXT NOT NULL,
+            claimed_at REAL NOT NULL,
+            PRIMARY KEY (owner, assessment_key)
+        )
+        ''',
+    ],
+    # 11: compressed evaluation_data, and the table old evaluations are archived to
+    #     (unless ARCHIVE_DATABASE_PATH puts it in an attached database)
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS assessment_archive (
+            assessment_id INTEGER PRIMARY KEY,
+            evaluation_data BLOB NOT NULL,
+            archived_at REAL NOT NULL
+        )
+        ''',
+        _schedule('compact_evaluations'),
+    ],
+    # 12: full-text search index over assessments (filled by insert_assessment)
+    [
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS assessment_search USING fts5(
+            owner UNINDEXED, complexity UNINDEXED, job_role, scenario_title, scenario_description,
+            strengths, weaknesses, recommendations,
+            tokenize = 'porter unicode61 remove_diacritics 2'
+        )
+        ''',
+        f"INSERT INTO assessment_search (assessment_search, rank) VALUES ('rank', '{RANK_WEIGHTS}')",
+        '''
+        CREATE TRIGGER IF NOT EXISTS assessments_search_delete AFTER DELETE ON assessments
+        BEGIN
+            DELETE FROM assessment_search WHERE rowid = old.id;
+        END
+        ''',
+        _schedule('search_index'),
+    ],
+    # 13: leases on scenario pool deficits, so each missing scenario is generated by one worker
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS scenario_claims (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            role_key TEXT NOT NULL,
+            complexity TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_scenario_claims_key
+        ON scenario_claims (role_key, complexity, expires_at)
+        ''',
+    ],
+]
+
+def migrate(conn):
+    """Apply pending schema migrations in one transaction; returns the number applied
+
+    Data backfills only get queued here (see run_backfills), so the write
+    lock is held for the schema changes alone.
+    """
+    if conn.execute('PRAGMA user_version').fetchone()[0] >= len(MIGRATIONS):
+        return 0
+
+    # The write lock serializes workers that start at the same time
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for migration in MIGRATIONS[version:]:
+            for step in migration:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+        conn.execute(f'PRAGMA user_version = {len(MIGRATIONS)}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(MIGRATIONS) - version
+
+# Data backfills queued by the migrations, in the order they must run.
+# Each step takes (conn, after_id, through_id, batch_size), updates one
+# batch of rows and returns its last id, or None when nothing is left.
+BACKFILLS = [
+    ('summary_columns', backfill_summary_columns),
+    ('role_stats', backfill_stats),
+    ('compact_evaluations', compact_batch),
+    ('search_index', backfill_index),
+]
+
+def run_backfills(conn, batch_size=BACKFILL_BATCH):
+    """Run queued backfills, committing each batch with its position; returns the number of batches
+
+    The write lock is held for one batch at a time, so other workers keep
+    writing meanwhile, and an interrupted backfill resumes after its last
+    committed batch.
+    """
+    batches = 0
+    for name, step in BACKFILLS:
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Read under the lock: workers starting together take turns, never the same batch
+                row = conn.execute('''
+                    SELECT after_id, through_id FROM backfills WHERE name = ? AND done = 0
+                ''', (name,)).fetchone()
+                if not row:
+                    conn.rollback()
+                    break
+                last_id = step(conn, row['after_id'], row['through_id'], batch_size)
+                if last_id is None:
+                    conn.execute('UPDATE backfills SET done = 1 WHERE name = ?', (name,))
+                else:
+                    conn.execute('UPDATE backfills SET after_id = ? WHERE name = ?', (last_id, name))
+                    batches += 1
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    return batches
+
+def init_db():
+    """Bring the database schema up to date, then finish any queued backfills"""
+    conn = get_db_connection()
+    try:
+        applied = migrate(conn)
+        batches = run_backfills(conn)
+    finally:
+        conn.close()
+    if applied:
+        print(f"Database {DB_NAME} migrated to version {len(MIGRATIONS)} ({applied} migration(s) applied).")
+    if batches:
+        print(f"Database {DB_NAME}: backfilled {batches} batch(es).")
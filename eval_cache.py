@@ -0,0 +1,89 @@
+import hashlib
+import itertools
+import json
+import os
+import time
+import unicodedata
+
+import metrics
+from database import get_db_connection
+
+# Tunables (override through the environment)
+CACHE_ENABLED = os.environ.get("EVAL_CACHE_ENABLED", "1") == "1"
+CACHE_MAX_ENTRIES = int(os.environ.get("EVAL_CACHE_MAX_ENTRIES", "5000"))
+CACHE_MAX_AGE = float(os.environ.get("EVAL_CACHE_MAX_AGE", str(30 * 24 * 3600)))
+EVICT_EVERY = int(os.environ.get("EVAL_CACHE_EVICT_EVERY", "50"))
+
+_writes = itertools.count(1)  # next() is atomic under the GIL
+
+
+def normalize_text(text):
+    """Canonical form used for hashing: NFKC, collapsed whitespace"""
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+def cache_key(scenario_description, complexity, user_response, prompt_version, model):
+    """Content address of an evaluation request"""
+    material = json.dumps([
+        normalize_text(scenario_description),
+        complexity,
+        normalize_text(user_response),
+        prompt_version,
+        model
+    ])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def get(key):
+    """Return the cached evaluation for `key`, or None"""
+    if not CACHE_ENABLED:
+        return None
+    now = time.time()
+    conn = get_db_connection()
+    try:
+        row = conn.execute('''
+            SELECT evaluation FROM evaluation_cache WHERE key = ? AND created_at > ?
+        ''', (key, now - CACHE_MAX_AGE)).fetchone()
+        if row:
+            conn.execute('''
+                UPDATE evaluation_cache SET hits = hits + 1, last_hit_at = ? WHERE key = ?
+            ''', (now, key))
+            conn.commit()
+    finally:
+        conn.close()
+
+    if not row:
+        metrics.EVAL_CACHE.inc(event="miss")
+        return None
+    metrics.EVAL_CACHE.inc(event="hit")
+    return json.loads(row['evaluation'])
+
+
+def put(key, evaluation_data):
+    """Store an evaluation, evicting old entries every EVICT_EVERY writes"""
+    if not CACHE_ENABLED:
+        return
+    now = time.time()
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            INSERT OR REPLACE INTO evaluation_cache (key, evaluation, created_at, last_hit_at, hits)
+            VALUES (?, ?, ?, ?, 0)
+        ''', (key, json.dumps(evaluation_data), now, now))
+        metrics.EVAL_CACHE.inc(event="store")
+        if next(_writes) % EVICT_EVERY == 0:
+            evict(conn, now)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def evict(conn, now=None):
+    """Drop entries past the age limit, then the least recently used beyond the size limit"""
+    now = now or time.time()
+    conn.execute('DELETE FROM evaluation_cache WHERE created_at <= ?', (now - CACHE_MAX_AGE,))
+    conn.execute('''
+        DELETE FROM evaluation_cache WHERE key IN (
+            SELECT key FROM evaluation_cache ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?
+        )
+    ''', (CACHE_MAX_ENTRIES,))
@@ -0,0 +1,104 @@
+from database import get_db_connection
+from assessments import insert_assessment
+from json_extract import parse_evaluation_text, ExtractionError
+import ratelimit
+import routing
+import eval_cache
+import idempotency
+import prompts
+
+# Changes with the evaluation prompt (see prompts.py) so cached results are not reused
+EVALUATION_PROMPT_VERSION = prompts.version('evaluation')
+
+
+class EvaluationError(Exception):
+    """Raised when a response cannot be evaluated"""
+
+
+def build_evaluation_messages(job_role, complexity, scenario, user_response):
+    """Build the chat messages for evaluating a candidate response (shortened to the prompt budget)"""
+    return prompts.render('evaluation', complexity, job_role=job_role,
+                          scenario_description=scenario.get('scenario_description', ''),
+                          user_response=user_response).messages
+
+def parse_evaluation(response, complexity):
+    """Extract and validate the evaluation JSON from an LLM response"""
+    try:
+        evaluation_data, repaired = parse_evaluation_text(response, complexity)
+    except ExtractionError as e:
+        print(f"JSON Parse Error: {e}")
+        print(f"Response: {response}")
+        # Log failed response for debugging
+        try:
+            with open("debug_evaluation_error.txt", "w", encoding='utf-8') as f:
+                f.write(f"Error: {str(e)}\n\nResponse:\n{response}")
+        except:
+            pass
+        raise
+    if repaired:
+        print("Repaired malformed evaluation JSON")
+    return evaluation_data
+
+def save_assessment(username, job_role, complexity, evaluation_data, assessment_id=None, scenario=None):
+    """Store a completed evaluation for the user (once per assessment_id)"""
+    conn = get_db_connection()
+    try:
+        # Get user id
+        user = conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
+        if user:
+            insert_assessment(conn, user['id'], job_role, complexity, evaluation_data, assessment_id, scenario)
+            conn.commit()
+    except Exception as db_err:
+         print(f"Database Save Error: {db_err}")
+    finally:
+         conn.close()
+
+def evaluation_cache_key(complexity, scenario, user_response):
+    """Cache key for an evaluation request"""
+    return eval_cache.cache_key(scenario.get('scenario_description', ''), complexity, user_response,
+                                EVALUATION_PROMPT_VERSION, routing.route_models('evaluation', complexity))
+
+def run_evaluation(username, job_role, complexity, scenario, user_response, assessment_id=None,
+                   max_wait=ratelimit.MAX_WAIT):
+    """Evaluate a response with the LLM and store the assessment
+
+    With an assessment_id, duplicate submissions of the same answer to the
+    attempt share one evaluation and one stored assessment. Raises
+    ratelimit.RateLimited if the account limits would hold the call longer
+    than max_wait seconds.
+    """
+    assessment_id = idempotency.attempt_key(assessment_id, scenario, user_response)
+    if assessment_id:
+        return idempotency.run_once(username, assessment_id, lambda: _evaluate(
+            username, job_role, complexity, scenario, user_response, assessment_id, max_wait))
+    return _evaluate(username, job_role, complexity, scenario, user_response, max_wait=max_wait)
+
+def _evaluate(username, job_role, complexity, scenario, user_response, assessment_id=None,
+              max_wait=ratelimit.MAX_WAIT):
+    # Identical submissions reuse the stored evaluation but still get their own assessment row
+    key = evaluation_cache_key(complexity, scenario, user_response)
+    evaluation_data = eval_cache.get(key)
+    if evaluation_data is not None:
+        save_assessment(username, job_role, complexity, evaluation_data, assessment_id, scenario)
+        return evaluation_data
+
+    messages = build_evaluation_messages(job_role, complexity, scenario, user_response)
+    try:
+        evaluation_data, _ = routing.complete('evaluation', complexity, messages, temperature=0.5,
+                                              parse=lambda response: parse_evaluation(response, complexity),
+                                              max_wait=max_wait)
+    except ExtractionError:
+        raise EvaluationError('Failed to parse evaluation. Please try again.')
+    except ratelimit.RateLimited:
+        raise
+    except Exception as e:
+        print(f"API Error: {str(e)}")
+        raise EvaluationError('Failed to evaluate response')
+
+    eval_cache.put(key, evaluation_data)
+    save_assessment(username, job_role, complexity, evaluation_data, assessment_id, scenario)
+    return evaluation_data
+
+def run_evaluation_job(payload):
+    """Job queue entry point (background work waits for the account limits as long as needed)"""
+    return run_evaluation(**payload, max_wait=None)
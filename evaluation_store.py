@@ -0,0 +1,205 @@
+"""Compact storage and archival of assessments.evaluation_data.
+
+Evaluations are stored as canonical JSON (sorted keys, no whitespace)
+deflated against a preset dictionary of the keys and phrases every
+evaluation repeats, behind a one-byte format version. Rows written before
+this format are plain JSON TEXT and still decode. The archive job moves the
+evaluation of assessments older than ARCHIVE_AFTER_DAYS into
+assessment_archive, leaving an empty blob in assessments so the hot table
+(and the page cache) holds summary columns only. With ARCHIVE_DATABASE_PATH
+set, the archive lives in that attached database instead of users.db; keep
+it set once anything has been archived there. load_evaluation() reads all
+three forms.
+
+    python evaluation_store.py archive [--older-than-days 180]
+    python evaluation_store.py compact     # re-encode rows still in an older format
+"""
+import argparse
+import json
+import os
+import time
+import zlib
+
+# Tunables (override through the environment)
+ARCHIVE_AFTER_DAYS = float(os.environ.get("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_DATABASE_PATH = os.environ.get("ARCHIVE_DATABASE_PATH")
+ARCHIVE_SCHEMA = "archive" if ARCHIVE_DATABASE_PATH else "main"
+BATCH_SIZE = 500
+
+# An archived row keeps this in assessments.evaluation_data
+ARCHIVED = b""
+
+# Format 1: raw deflate of canonical JSON with DICTIONARY_V1 as preset dictionary.
+# Never edit a shipped dictionary; add a new format byte instead.
+FORMAT_DEFLATE_V1 = 1
+DICTIONARY_V1 = (
+    b'Entry/Mid/Senior/Expert LevelEntryMidSeniorExpert'
+    b'The candidate demonstrates a strong understanding of the key concepts and provides a clear, '
+    b'well-structured response that addresses the scenario. However, the response could be improved by '
+    b'considering the long-term impact, stakeholders, potential risks, trade-offs, ethical implications, '
+    b'data, communication, and specific examples. The candidate should consider, Consider, Develop, Improve, '
+    b'Practice, Focus on, Provide more specific examples, lacks depth in, does not fully address, '
+    b'In this scenario, I would first, Additionally, Finally, ensure that the team, '
+    b'"accuracy":{"feedback":"'
+    b'"basic_understanding":{"feedback":"'
+    b'"clarity":{"feedback":"'
+    b'"practicality":{"feedback":"'
+    b'"reasoning":{"feedback":"'
+    b'"technical_correctness":{"feedback":"'
+    b'"decision_quality":{"feedback":"'
+    b'"ethical_judgment":{"feedback":"'
+    b'"strategic_reasoning":{"feedback":"'
+    b'","score":'
+    b'{"dimensions":{'
+    b'"ideal_answer":"'
+    b'"overall_score":'
+    b'"performace_level":"'
+    b'"performance_level":"'
+    b'"recommendations":["'
+    b'"skill_readiness":"'
+    b'"strengths":["'
+    b'"weaknesses":["'
+    b'","'
+)
+
+
+def canonical_json(evaluation_data):
+    return json.dumps(evaluation_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def encode_evaluation(evaluation_data):
+    """Evaluation dict -> compact blob for assessments.evaluation_data"""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, DICTIONARY_V1)
+    return bytes([FORMAT_DEFLATE_V1]) + compressor.compress(canonical_json(evaluation_data)) + compressor.flush()
+
+
+def decode_evaluation(value):
+    """Stored value -> evaluation dict; accepts legacy JSON text and every blob format"""
+    if isinstance(value, str):
+        return json.loads(value)
+    value = bytes(value)
+    if not value:
+        raise ValueError("evaluation is archived")
+    if value[0] == FORMAT_DEFLATE_V1:
+        decompressor = zlib.decompressobj(-15, DICTIONARY_V1)
+        return json.loads(decompressor.decompress(value[1:]) + decompressor.flush())
+    raise ValueError(f"unknown evaluation storage format {value[0]}")
+
+
+def load_evaluation(conn, assessment_id, value):
+    """The evaluation of an assessment row, following it into the archive if needed"""
+    if isinstance(value, (bytes, memoryview)) and not value:
+        row = conn.execute(f'''
+            SELECT evaluation_data FROM {ARCHIVE_SCHEMA}.assessment_archive WHERE assessment_id = ?
+        ''', (assessment_id,)).fetchone()
+        if not row:
+            raise LookupError(f"archived evaluation of assessment {assessment_id} is missing")
+        value = row['evaluation_data']
+    return decode_evaluation(value)
+
+
+def attach_archive(conn):
+    """Connection setup: attach the archive database when one is configured"""
+    if not ARCHIVE_DATABASE_PATH:
+        return
+    conn.execute('ATTACH DATABASE ? AS archive', (ARCHIVE_DATABASE_PATH,))
+    conn.execute('PRAGMA archive.journal_mode = WAL')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS archive.assessment_archive (
+            assessment_id INTEGER PRIMARY KEY,
+            evaluation_data BLOB NOT NULL,
+            archived_at REAL NOT NULL
+        )
+    ''')
+
+
+def compact_batch(conn, after_id, through_id, batch_size=BATCH_SIZE):
+    """Backfill step: re-encode one batch of rows still stored as JSON text; returns its last id, or None when done"""
+    rows = conn.execute('''
+        SELECT id, evaluation_data FROM assessments
+        WHERE id > ? AND id <= ? AND typeof(evaluation_data) = 'text' ORDER BY id LIMIT ?
+    ''', (after_id, through_id, batch_size)).fetchall()
+    if not rows:
+        return None
+    for row in rows:
+        try:
+            evaluation_data = json.loads(row['evaluation_data'])
+        except ValueError:
+            continue  # leave unreadable legacy rows untouched
+        conn.execute('UPDATE assessments SET evaluation_data = ? WHERE id = ?',
+                     (encode_evaluation(evaluation_data), row['id']))
+    return rows[-1]['id']
+
+
+def compact_rows(conn, batch_size=BATCH_SIZE):
+    """Re-encode rows still stored as JSON text, one committed batch at a time; returns the number converted"""
+    changes = conn.total_changes
+    through_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM assessments').fetchone()[0]
+    last_id = 0
+    while True:
+        last_id = compact_batch(conn, last_id, through_id, batch_size)
+        conn.commit()
+        if last_id is None:
+            return conn.total_changes - changes
+
+
+def archive_old(conn, older_than_days=ARCHIVE_AFTER_DAYS, batch_size=BATCH_SIZE):
+    """Move evaluations older than the cutoff into the archive, one committed batch at a time
+
+    Each batch is copied to the archive and committed before the hot rows are
+    cleared, so an interruption leaves rows readable from one place or the
+    other (a copy that was never cleared is simply copied again).
+    """
+    moved = 0
+    last_id = 0
+    while True:
+        # Keyset over id, so each batch resumes where the previous one stopped
+        rows = conn.execute('''
+            SELECT id, evaluation_data FROM assessments
+            WHERE id > ? AND created_at < datetime('now', ?)
+            ORDER BY id LIMIT ?
+        ''', (last_id, f'-{older_than_days} days', batch_size)).fetchall()
+        if not rows:
+            return moved
+        last_id = rows[-1]['id']
+        now = time.time()
+        blobs = []
+        for row in rows:
+            value = row['evaluation_data']
+            # Skips rows already archived and legacy text that compact_rows could not parse
+            if isinstance(value, bytes) and value:
+                blobs.append((row['id'], value, now))
+        if not blobs:
+            continue
+        conn.executemany(f'''
+            INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.assessment_archive (assessment_id, evaluation_data, archived_at)
+            VALUES (?, ?, ?)
+        ''', blobs)
+        conn.commit()
+        conn.executemany('UPDATE assessments SET evaluation_data = ? WHERE id = ?',
+                         [(ARCHIVED, assessment_id) for assessment_id, _, _ in blobs])
+        conn.commit()
+        moved += len(blobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive or re-encode stored evaluations")
+    parser.add_argument("command", choices=("archive", "compact"))
+    parser.add_argument("--older-than-days", type=float, default=ARCHIVE_AFTER_DAYS)
+    args = parser.parse_args()
+    from database import init_db, get_db_connection
+
+    init_db()
+    conn = get_db_connection()
+    try:
+        if args.command == "archive":
+            print(f"Archived {archive_old(conn, args.older_than_days)} evaluation(s)")
+        else:
+            converted = compact_rows(conn)
+            print(f"Re-encoded {converted} evaluation(s)")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
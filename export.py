@@ -0,0 +1,228 @@
+"""Streaming export of assessment history as CSV, JSONL or gzip-compressed JSONL.
+
+Rows are read through one SQLite cursor with fetchmany() and written out
+in chunks as they arrive, so memory stays flat however many rows match.
+Each export is bounded by the highest assessment id at its start (the
+high-water mark); pass it as after_id next time to export only newer rows.
+Selected evaluation fields can be flattened into columns named
+evaluation.<path>, e.g. --fields ideal_answer,dimensions.reasoning.score
+adds evaluation.ideal_answer and evaluation.dimensions.reasoning.score.
+
+    python export.py -o history.jsonl.gz [--format jsonl.gz] [--user alice]
+                     [--since 2024-01-01] [--until 2024-02-01] [--fields ...]
+                     [--after-id N | --state export.state]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import zlib
+from datetime import datetime
+
+from evaluation_store import load_evaluation
+
+# Tunables (override through the environment)
+EXPORT_BATCH = int(os.environ.get("EXPORT_BATCH", "500"))
+EXPORT_CHUNK_BYTES = int(os.environ.get("EXPORT_CHUNK_BYTES", str(64 * 1024)))
+
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "ndjson": "application/x-ndjson",
+    "jsonl.gz": "application/gzip",
+}
+
+COLUMNS = ("id", "user_id", "username", "job_role", "complexity", "overall_score", "performance_level",
+           "dimension_scores", "created_at", "assessment_key")
+
+
+class ExportError(ValueError):
+    """Raised for invalid export parameters"""
+
+
+def parse_date(value, name):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise ExportError(f"{name} must be an ISO date, got {value!r}")
+
+
+def parse_fields(value):
+    """'a,b.c' -> [('a',), ('b', 'c')]"""
+    if not value:
+        return []
+    fields = [tuple(part for part in field.strip().split(".") if part) for field in value.split(",")]
+    return [field for field in fields if field]
+
+
+def field_column(field):
+    """Column name of a flattened evaluation field; the prefix keeps it clear of COLUMNS"""
+    return "evaluation." + ".".join(field)
+
+
+def high_water_mark(conn):
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM assessments").fetchone()[0]
+
+
+def iter_rows(conn, through_id, after_id=0, user_id=None, since=None, until=None, fields=()):
+    """Matching assessments in id order, one dict at a time"""
+    clauses = ["a.id > ?", "a.id <= ?"]
+    params = [after_id, through_id]
+    if user_id is not None:
+        clauses.append("a.user_id = ?")
+        params.append(user_id)
+    if since:
+        clauses.append("a.created_at >= ?")
+        params.append(since)
+    if until:
+        clauses.append("a.created_at < ?")
+        params.append(until)
+    blob = ", a.evaluation_data" if fields else ""
+    cursor = conn.execute(f'''
+        SELECT a.id, a.user_id, u.username, a.job_role, a.complexity, a.overall_score, a.performance_level,
+               a.dimension_scores, a.created_at, a.assessment_key{blob}
+        FROM assessments a JOIN users u ON u.id = a.user_id
+        WHERE {" AND ".join(clauses)}
+        ORDER BY a.id
+    ''', params)
+    try:
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH)
+            if not rows:
+                return
+            for row in rows:
+                record = {column: row[column] for column in COLUMNS}
+                record["dimension_scores"] = json.loads(record["dimension_scores"] or "{}")
+                if fields:
+                    try:
+                        evaluation_data = load_evaluation(conn, row["id"], row["evaluation_data"])
+                    except (ValueError, LookupError):
+                        evaluation_data = {}
+                    for field in fields:
+                        record[field_column(field)] = _lookup(evaluation_data, field)
+                yield record
+    finally:
+        cursor.close()
+
+
+def _lookup(data, path):
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return "; ".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+def _chunked(pieces):
+    """Join small strings into chunks of about EXPORT_CHUNK_BYTES"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def _csv_lines(records, fields):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS + tuple(field_column(field) for field in fields))
+    for record in records:
+        writer.writerow([_csv_value(value) for value in record.values()])
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+    yield out.getvalue()
+
+
+def _jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(records, fmt, fields=()):
+    """Encode records as byte chunks in the given format"""
+    if fmt == "csv":
+        return _chunked(_csv_lines(records, fields))
+    chunks = _chunked(_jsonl_lines(records))
+    return _gzip(chunks) if fmt == "jsonl.gz" else chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export assessment history")
+    parser.add_argument("-o", "--output", default="-", help="output file ('-' for stdout)")
+    parser.add_argument("--format", choices=sorted(FORMATS), help="default: from the output file name, else jsonl")
+    parser.add_argument("--user", help="only this username")
+    parser.add_argument("--since", help="created at or after this ISO date")
+    parser.add_argument("--until", help="created before this ISO date")
+    parser.add_argument("--fields", help="comma-separated evaluation fields to flatten, e.g. dimensions.reasoning.score")
+    parser.add_argument("--after-id", type=int, default=0, help="export only assessments with a greater id")
+    parser.add_argument("--state", help="file holding the high-water mark; read before and updated after the export")
+    args = parser.parse_args()
+
+    fmt = args.format or next((name for name in ("jsonl.gz", "csv", "jsonl", "ndjson")
+                               if args.output.endswith("." + name)), "jsonl")
+    fields = parse_fields(args.fields)
+    after_id = args.after_id
+    if args.state and os.path.exists(args.state):
+        with open(args.state, encoding="utf-8") as f:
+            after_id = int(f.read().strip() or 0)
+
+    from database import init_db, open_connection
+
+    init_db()
+    conn = open_connection()
+    try:
+        user_id = None
+        if args.user:
+            user = conn.execute("SELECT id FROM users WHERE username = ?", (args.user,)).fetchone()
+            if not user:
+                sys.exit(f"Unknown user {args.user!r}")
+            user_id = user["id"]
+        through_id = high_water_mark(conn)
+        records = iter_rows(conn, through_id, after_id, user_id, parse_date(args.since, "--since"),
+                            parse_date(args.until, "--until"), fields)
+        out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+        try:
+            for chunk in stream_export(records, fmt, fields):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+    finally:
+        conn.close_for_real()
+
+    if args.state:
+        with open(args.state, "w", encoding="utf-8") as f:
+            f.write(f"{through_id}\n")
+    print(f"Exported assessments with {after_id} < id <= {through_id} as {fmt}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
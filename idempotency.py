@@ -0,0 +1,186 @@
+"""At-most-once evaluation per assessment attempt.
+
+generate-scenario mints an assessment_id for each attempt; the client
+sends it back with the response, and the stored assessment carries it
+together with a hash of the scenario and response (attempt_key), so a
+repeated submission of the same answer returns the stored result instead
+of evaluating again, while a revised answer is evaluated afresh.
+Concurrent duplicates coalesce onto one upstream call: inside a process
+they wait on the leader (SingleFlight), and across processes the leader
+holds a row in evaluation_claims while the others poll for the stored
+assessment. A claim is released when the leader fails, so a waiting
+duplicate takes over, and it expires after EVAL_CLAIM_TTL seconds if the
+leader's process died.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+
+from database import get_db_connection
+from evaluation_store import load_evaluation
+
+# Tunables (override through the environment)
+CLAIM_TTL = float(os.environ.get("EVAL_CLAIM_TTL", "300"))
+CLAIM_POLL_INTERVAL = float(os.environ.get("EVAL_CLAIM_POLL_INTERVAL", "0.25"))
+
+_KEY_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def clean_key(value):
+    """The idempotency key if it is well-formed, else None"""
+    if isinstance(value, str) and _KEY_PATTERN.fullmatch(value):
+        return value
+    return None
+
+
+def attempt_key(assessment_id, scenario, user_response):
+    """Idempotency key of one submission: the attempt id plus a hash of what is evaluated"""
+    if not assessment_id:
+        return None
+    digest = hashlib.sha256()
+    for part in ((scenario or {}).get('scenario_description', ''), user_response or ''):
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return f"{assessment_id}.{digest.hexdigest()[:16]}"
+
+
+def check(owner, key):
+    """One attempt at taking the lead; returns (stored evaluation, claimed)
+
+    Exactly one of three outcomes: the attempt is already stored, the caller
+    now holds the claim and must evaluate then release(), or another caller
+    holds it (None, False) and the caller should poll again.
+    """
+    conn = get_db_connection()
+    try:
+        row = conn.execute('''
+            SELECT a.id, a.evaluation_data FROM assessments a JOIN users u ON u.id = a.user_id
+            WHERE u.username = ? AND a.assessment_key = ?
+        ''', (owner, key)).fetchone()
+        if row:
+            return load_evaluation(conn, row['id'], row['evaluation_data']), False
+        now = time.time()
+        conn.execute('''
+            DELETE FROM evaluation_claims WHERE owner = ? AND assessment_key = ? AND claimed_at < ?
+        ''', (owner, key, now - CLAIM_TTL))
+        cursor = conn.execute('''
+            INSERT OR IGNORE INTO evaluation_claims (owner, assessment_key, claimed_at) VALUES (?, ?, ?)
+        ''', (owner, key, now))
+        conn.commit()
+        return None, cursor.rowcount == 1
+    finally:
+        conn.close()
+
+
+def release(owner, key):
+    conn = get_db_connection()
+    try:
+        conn.execute('DELETE FROM evaluation_claims WHERE owner = ? AND assessment_key = ?', (owner, key))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def acquire(owner, key):
+    """Block until the attempt is stored (returns it) or the caller holds the claim (returns None)"""
+    while True:
+        stored, claimed = check(owner, key)
+        if stored is not None or claimed:
+            return stored
+        time.sleep(CLAIM_POLL_INTERVAL)
+
+
+async def acquire_async(owner, key, run_db):
+    """acquire() for the asyncio serving mode; run_db runs blocking calls off the loop"""
+    while True:
+        stored, claimed = await run_db(check, owner, key)
+        if stored is not None or claimed:
+            return stored
+        await asyncio.sleep(CLAIM_POLL_INTERVAL)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Concurrent do() calls with the same key share the first caller's result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop"""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, func):
+        future = self._calls.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; nobody else needs to retrieve it
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._calls[key]
+        return result
+
+
+_flights = SingleFlight()
+
+
+def run_once(owner, key, evaluate):
+    """Run evaluate() at most once per (owner, key); evaluate must store the assessment with the key"""
+
+    def lead():
+        stored = acquire(owner, key)
+        if stored is not None:
+            return stored
+        try:
+            return evaluate()
+        finally:
+            release(owner, key)
+
+    return _flights.do((owner, key), lead)
@@ -0,0 +1,162 @@
+import importlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from database import get_db_connection
+
+# Tunables (override through the environment)
+JOB_WORKERS = int(os.environ.get("EVAL_WORKERS", "4"))
+JOB_WORKER_MODE = os.environ.get("EVAL_WORKER_MODE", "thread")  # thread | process
+JOB_LEASE = float(os.environ.get("EVAL_JOB_LEASE", "600"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("EVAL_JOB_MAX_ATTEMPTS", "3"))
+POLL_INTERVAL = float(os.environ.get("EVAL_JOB_POLL_INTERVAL", "1"))
+
+
+def run_handler(handler, payload):
+    """Resolve a 'module.function' handler and run it (picklable for process pools)"""
+    module_name, func_name = handler.rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), func_name)(payload)
+
+
+class JobQueue:
+    """Durable job queue in the evaluation_jobs table, drained by a worker pool
+
+    Jobs are claimed with a lease. A job whose lease expires while 'running'
+    (its worker died or the process restarted) is queued again, up to
+    JOB_MAX_ATTEMPTS times.
+    """
+
+    def __init__(self, handler, workers=JOB_WORKERS, mode=JOB_WORKER_MODE):
+        self.handler = handler
+        self.workers = workers
+        self.mode = mode
+        self._wakeup = threading.Event()
+        self._slots = threading.Semaphore(workers)
+        self._thread = None
+        self._executor = None
+
+    def start(self):
+        """Start the dispatcher thread and worker pool (once per process)"""
+        if self._thread is not None or self.workers <= 0:
+            return
+        if self.mode == "process":
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="eval-worker")
+        self._thread = threading.Thread(target=self._run, name="job-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, owner, payload):
+        """Persist a new job and return its id"""
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        conn = get_db_connection()
+        try:
+            conn.execute('''
+                INSERT INTO evaluation_jobs (id, owner, status, payload, created_at, updated_at)
+                VALUES (?, ?, 'queued', ?, ?, ?)
+            ''', (job_id, owner, json.dumps(payload), now, now))
+            conn.commit()
+        finally:
+            conn.close()
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """Return a job as a dict with decoded payload/result, or None"""
+        conn = get_db_connection()
+        try:
+            row = conn.execute('SELECT * FROM evaluation_jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def _run(self):
+        while True:
+            try:
+                self._requeue_expired()
+                while self._slots.acquire(timeout=POLL_INTERVAL):
+                    job = self._claim()
+                    if job is None:
+                        self._slots.release()
+                        break
+                    future = self._executor.submit(run_handler, self.handler, json.loads(job['payload']))
+                    future.add_done_callback(lambda f, job_id=job['id']: self._finish(job_id, f))
+            except Exception as e:
+                print(f"Job Dispatcher Error: {e}")
+            self._wakeup.wait(POLL_INTERVAL)
+            self._wakeup.clear()
+
+    @staticmethod
+    def _claim():
+        """Atomically move the oldest queued job to 'running'"""
+        now = time.time()
+        conn = get_db_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute('''
+                SELECT id, payload FROM evaluation_jobs
+                WHERE status = 'queued' ORDER BY created_at LIMIT 1
+            ''').fetchone()
+            if row:
+                conn.execute('''
+                    UPDATE evaluation_jobs
+                    SET status = 'running', attempts = attempts + 1, locked_at = ?, updated_at = ?
+                    WHERE id = ?
+                ''', (now, now, row['id']))
+            conn.commit()
+            return row
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _finish(self, job_id, future):
+        self._slots.release()
+        error = future.exception()
+        conn = get_db_connection()
+        try:
+            if error is None:
+                conn.execute('''
+                    UPDATE evaluation_jobs SET status = 'done', result = ?, error = NULL, updated_at = ?
+                    WHERE id = ?
+                ''', (json.dumps(future.result()), time.time(), job_id))
+            else:
+                print(f"Evaluation Job Error: {error}")
+                conn.execute('''
+                    UPDATE evaluation_jobs SET status = 'failed', error = ?, updated_at = ?
+                    WHERE id = ?
+                ''', (str(error), time.time(), job_id))
+            conn.commit()
+        finally:
+            conn.close()
+        self._wakeup.set()
+
+    @staticmethod
+    def _requeue_expired():
+        """Recover jobs abandoned by a dead worker"""
+        now = time.time()
+        conn = get_db_connection()
+        try:
+            conn.execute('''
+                UPDATE evaluation_jobs SET status = 'failed', error = 'Too many attempts', updated_at = ?
+                WHERE status = 'running' AND locked_at < ? AND attempts >= ?
+            ''', (now, now - JOB_LEASE, JOB_MAX_ATTEMPTS))
+            conn.execute('''
+                UPDATE evaluation_jobs SET status = 'queued', locked_at = NULL, updated_at = ?
+                WHERE status = 'running' AND locked_at < ?
+            ''', (now, now - JOB_LEASE))
+            conn.commit()
+        finally:
+            conn.close()
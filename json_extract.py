@@ -0,0 +1,338 @@
+import json
+import re
+
+import metrics
+
+NUMBER_RE = re.compile(r"-?\d+(\.\d+)?([eE][+-]?\d+)?$")
+LITERALS = {"true": "true", "false": "false", "null": "null",
+            "True": "true", "False": "false", "None": "null"}
+CLOSERS = {"{": "}", "[": "]"}
+STRING_RUN = re.compile(r'[^"\\\n\r\t]+')
+WHITESPACE_RUN = re.compile(r"[ \t\r\n]+")
+VALID_ESCAPE = re.compile(r'["\\/bfnrt]|u[0-9a-fA-F]{4}')
+
+# Per-complexity evaluation dimensions requested by the prompts
+EVALUATION_DIMENSIONS = {
+    "Low": ("accuracy", "clarity", "basic_understanding"),
+    "Medium": ("reasoning", "technical_correctness", "practicality"),
+    "High": ("strategic_reasoning", "ethical_judgment", "decision_quality"),
+}
+
+EVALUATION_KEYS = ("overall_score", "dimensions", "strengths", "weaknesses", "skill_readiness",
+                   "recommendations", "performance_level", "ideal_answer")
+SCENARIO_KEYS = ("scenario_title", "scenario_description", "complexity_level", "key_challenges")
+
+# Misspellings the model has been seen to produce (some copied from our own prompt)
+KEY_ALIASES = {"performace_level": "performance_level"}
+
+
+class ExtractionError(ValueError):
+    """Raised when no valid JSON document can be recovered from LLM output"""
+
+
+def extract_json(text, top_level_keys=()):
+    """Recover the first JSON object in `text` with one linear repair scan
+
+    Handles markdown fences and surrounding prose, mismatched closers
+    (``}]``), missing commas, trailing commas, raw newlines and stray
+    backslashes inside strings, Python literals and output truncated
+    mid-document. When a key from `top_level_keys` appears inside a nested
+    object, the nested containers are closed first, which recovers a
+    missing ``}`` before it.
+
+    Returns (data, repaired) where `repaired` tells whether any fix was needed.
+    """
+    start = text.find("{")
+    if start == -1:
+        raise ExtractionError("No JSON object found")
+
+    # Fast path: well-formed output, possibly wrapped in a fence or prose
+    end = text.rfind("}")
+    if end > start:
+        try:
+            return json.loads(text[start:end + 1]), False
+        except json.JSONDecodeError:
+            pass
+
+    out = []
+    stack = []          # frames: [opener, state]; state is key/colon/value/after
+    repaired = False
+    pending_comma = False
+    token = []          # current string or bare token
+    stray_key = None    # (out index, literal) of a top-level key seen as an array item
+    in_string = escape = False
+    top_level_keys = set(top_level_keys)
+
+    def begin_value():
+        nonlocal pending_comma, repaired
+        frame = stack[-1]
+        if frame[1] == "colon":
+            # Key followed directly by its value
+            out.append(":")
+            repaired = True
+        elif frame[1] == "after":
+            # Two values in a row: the model dropped a comma
+            pending_comma = True
+            repaired = True
+            frame[1] = "key" if frame[0] == "{" else "value"
+        if pending_comma:
+            out.append(",")
+            pending_comma = False
+
+    def end_value():
+        if stack:
+            stack[-1][1] = "after"
+
+    def flush_bare():
+        nonlocal repaired
+        if not token:
+            return
+        word = "".join(token)
+        token.clear()
+        if NUMBER_RE.match(word):
+            out.append(word)
+        elif word in LITERALS:
+            repaired = repaired or LITERALS[word] != word
+            out.append(LITERALS[word])
+        else:
+            repaired = True
+            out.append(json.dumps(word))
+        end_value()
+
+    def close_to_root():
+        while len(stack) > 1:
+            out.append(CLOSERS[stack.pop()[0]])
+        stack[-1][1] = "after"
+
+    def close_string():
+        nonlocal repaired, stray_key
+        frame = stack[-1]
+        literal = '"' + "".join(token) + '"'
+        token.clear()
+        if frame[0] == "{" and frame[1] in ("key", "after"):
+            key = json.loads(literal)
+            if key in top_level_keys and len(stack) > 1:
+                # A top-level key inside a nested object: close it first
+                close_to_root()
+                repaired = True
+            begin_value()
+            out.append(literal)
+            stack[-1][1] = "colon"
+        else:
+            mark = len(out)
+            begin_value()
+            out.append(literal)
+            end_value()
+            if frame[0] == "[" and json.loads(literal) in top_level_keys:
+                stray_key = (mark, literal)
+
+    i, n = start, len(text)
+    while i < n:
+        ch = text[i]
+        i += 1
+
+        if in_string:
+            if not escape:
+                run = STRING_RUN.match(text, i - 1)
+                if run:
+                    token.append(run.group())
+                    i = run.end()
+                    continue
+            if escape:
+                token.append(ch)
+                escape = False
+            elif ch == "\\":
+                if i == n or VALID_ESCAPE.match(text, i):
+                    token.append(ch)
+                    escape = True
+                else:
+                    # A stray backslash (e.g. a Windows path): keep it literally
+                    token.append("\\\\")
+                    repaired = True
+            elif ch == '"':
+                in_string = False
+                close_string()
+            elif ch == "\n" or ch == "\r" or ch == "\t":
+                token.append({"\n": "\\n", "\r": "\\r", "\t": "\\t"}[ch])
+                repaired = True
+            else:
+                token.append(ch)
+            continue
+
+        if token and (ch in " \t\r\n,:}]" or ch in "{[\""):
+            flush_bare()
+
+        if ch in " \t\r\n":
+            i = WHITESPACE_RUN.match(text, i - 1).end()
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            if stack:
+                begin_value()
+            out.append(ch)
+            stack.append([ch, "key" if ch == "{" else "value"])
+        elif ch in "}]":
+            if pending_comma:
+                pending_comma = False
+                repaired = True
+            opener = stack[-1][0]
+            if CLOSERS[opener] != ch:
+                repaired = True
+                if len(stack) > 1 and CLOSERS[stack[-2][0]] == ch:
+                    # The inner container was never closed
+                    out.append(CLOSERS[stack.pop()[0]])
+                    end_value()
+            if stack[-1][0] == "{" and stack[-1][1] in ("colon", "value"):
+                # Key without a value
+                out.append(":null" if stack[-1][1] == "colon" else "null")
+                repaired = True
+            out.append(CLOSERS[stack.pop()[0]])
+            if not stack:
+                break
+            end_value()
+        elif ch == ":":
+            if stack[-1][1] == "colon":
+                out.append(":")
+                stack[-1][1] = "value"
+            elif stray_key and stack[-1][0] == "[" and out[-1] == stray_key[1]:
+                # A list that was never closed runs into the next top-level key
+                del out[stray_key[0]:]
+                close_to_root()
+                begin_value()
+                out.append(stray_key[1] + ":")
+                stack[-1][1] = "value"
+                repaired = True
+            else:
+                repaired = True
+        elif ch == ",":
+            if stack[-1][1] == "after":
+                pending_comma = True
+                stack[-1][1] = "key" if stack[-1][0] == "{" else "value"
+            else:
+                repaired = True
+        else:
+            if not token:
+                begin_value()
+            token.append(ch)
+    else:
+        # Truncated output: close whatever is still open
+        repaired = True
+        if in_string:
+            frame = stack[-1]
+            if frame[0] == "{" and frame[1] in ("key", "after"):
+                token.clear()
+                pending_comma = False
+            else:
+                if escape:
+                    token.pop()
+                close_string()
+        flush_bare()
+        while stack:
+            frame = stack.pop()
+            if frame[0] == "{" and frame[1] == "colon":
+                out.append(":null")
+            elif frame[0] == "{" and frame[1] == "value":
+                out.append("null")
+            out.append(CLOSERS[frame[0]])
+            if stack:
+                stack[-1][1] = "after"
+
+    try:
+        return json.loads("".join(out)), repaired
+    except json.JSONDecodeError as e:
+        raise ExtractionError(f"Unrecoverable JSON: {e}") from e
+
+
+def _score(value):
+    """Coerce a score to an int in 0-100"""
+    if isinstance(value, str):
+        match = re.search(r"-?\d+(\.\d+)?", value)
+        if not match:
+            raise ExtractionError(f"Invalid score: {value!r}")
+        value = float(match.group())
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ExtractionError(f"Invalid score: {value!r}")
+    return max(0, min(100, int(round(value))))
+
+
+def _string_list(data, key):
+    value = data.get(key)
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not value:
+        raise ExtractionError(f"'{key}' must be a non-empty list")
+    return [str(item) for item in value]
+
+
+def validate_evaluation(data, complexity):
+    """Check an evaluation against the schema for its complexity and normalize it"""
+    if not isinstance(data, dict):
+        raise ExtractionError("Evaluation must be a JSON object")
+    data = {KEY_ALIASES.get(key, key): value for key, value in data.items()}
+
+    if "overall_score" not in data:
+        raise ExtractionError("Missing 'overall_score'")
+    data["overall_score"] = _score(data["overall_score"])
+
+    dimensions = data.get("dimensions")
+    if isinstance(dimensions, list):
+        # [{"name": ..., "score": ...}] instead of an object
+        dimensions = {str(d.get("name", "")): d for d in dimensions if isinstance(d, dict)}
+    if not isinstance(dimensions, dict):
+        raise ExtractionError("'dimensions' must be an object")
+    normalized = {}
+    for name, value in dimensions.items():
+        key = re.sub(r"\W+", "_", str(name).strip().lower()).strip("_")
+        if not isinstance(value, dict) or "score" not in value:
+            raise ExtractionError(f"Dimension '{name}' has no score")
+        normalized[key] = {"score": _score(value["score"]), "feedback": str(value.get("feedback", ""))}
+    expected = EVALUATION_DIMENSIONS.get(complexity, EVALUATION_DIMENSIONS["Medium"])
+    missing = [name for name in expected if name not in normalized]
+    if missing:
+        raise ExtractionError(f"Missing dimensions: {', '.join(missing)}")
+    data["dimensions"] = normalized
+
+    for key in ("strengths", "weaknesses", "recommendations"):
+        data[key] = _string_list(data, key)
+    for key in ("skill_readiness", "performance_level"):
+        if not isinstance(data.get(key), str) or not data[key].strip():
+            raise ExtractionError(f"Missing '{key}'")
+    if "ideal_answer" in data and not isinstance(data["ideal_answer"], str):
+        data["ideal_answer"] = str(data["ideal_answer"])
+    return data
+
+
+def validate_scenario(data):
+    """Check a generated scenario against the schema and normalize it"""
+    if not isinstance(data, dict):
+        raise ExtractionError("Scenario must be a JSON object")
+    for key in ("scenario_title", "scenario_description"):
+        if not isinstance(data.get(key), str) or not data[key].strip():
+            raise ExtractionError(f"Missing '{key}'")
+    data["key_challenges"] = _string_list(data, "key_challenges")
+    return data
+
+
+def parse_evaluation_text(text, complexity):
+    """Extract and validate an evaluation; returns (evaluation, repaired)"""
+    try:
+        data, repaired = extract_json(text, EVALUATION_KEYS)
+        evaluation = validate_evaluation(data, complexity)
+    except ExtractionError:
+        metrics.record_parse("evaluation", complexity, "failed")
+        raise
+    metrics.record_parse("evaluation", complexity, "repaired" if repaired else "ok")
+    return evaluation, repaired
+
+
+def parse_scenario_text(text, complexity=None):
+    """Extract and validate a scenario; returns (scenario, repaired)"""
+    try:
+        data, repaired = extract_json(text, SCENARIO_KEYS)
+        scenario = validate_scenario(data)
+    except ExtractionError:
+        metrics.record_parse("scenario", complexity, "failed")
+        raise
+    metrics.record_parse("scenario", complexity, "repaired" if repaired else "ok")
+    return scenario, repaired
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import time
+
+import httpx
+
+import metrics
+from llm_client import (GROQ_API_URL, DEFAULT_MODEL, CONNECT_TIMEOUT, READ_TIMEOUT, MAX_RETRIES, QUEUE_TIMEOUT,
+                        RETRY_STATUSES, LLMClientError, StreamDecoder, before_retry, chat_payload)
+
+# Tunables (override through the environment)
+ASYNC_MAX_CONCURRENCY = int(os.environ.get("GROQ_ASYNC_MAX_CONCURRENCY", "256"))
+ASYNC_MAX_CONNECTIONS = int(os.environ.get("GROQ_ASYNC_MAX_CONNECTIONS", "100"))
+
+
+class AsyncGroqClient:
+    """Non-blocking counterpart of GroqClient for the asyncio serving mode
+
+    Same payloads, stream decoding and retry policy (shared with llm_client);
+    in-flight requests are capped by an asyncio semaphore instead of a
+    thread semaphore, so waiting costs no OS thread.
+    """
+
+    def __init__(self, api_key=None, url=GROQ_API_URL, max_connections=ASYNC_MAX_CONNECTIONS,
+                 max_concurrency=ASYNC_MAX_CONCURRENCY, max_retries=MAX_RETRIES):
+        self.api_key = api_key if api_key is not None else os.environ.get("GROQ_API_KEY")
+        self.url = url
+        self.max_retries = max_retries
+        self._client = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def chat(self, messages, model=DEFAULT_MODEL, temperature=0.7, max_tokens=2000):
+        """Run a chat completion and return the decoded response body"""
+        payload = chat_payload(messages, model, temperature, max_tokens)
+        started = time.perf_counter()
+        try:
+            response = await self._post(payload)
+            metrics.LLM_FIRST_BYTE_SECONDS.observe(response.elapsed.total_seconds(), mode="chat")
+            data = response.json()
+        except BaseException:
+            metrics.LLM_FAILURES.inc(mode="chat")
+            raise
+        metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, mode="chat")
+        metrics.record_usage(data.get("usage"))
+        return data
+
+    async def stream_chat(self, messages, model=DEFAULT_MODEL, temperature=0.7, max_tokens=2000, on_finish=None):
+        """Run a streaming chat completion, yielding content deltas as they arrive
+
+        on_finish(finish_reason, usage) is called once the stream ends, with
+        whatever the final chunks reported (None when absent).
+        """
+        payload = chat_payload(messages, model, temperature, max_tokens, stream=True)
+        started = time.perf_counter()
+        try:
+            response = await self._post(payload, stream=True)
+        except BaseException:
+            metrics.LLM_FAILURES.inc(mode="stream")
+            raise
+        decoder = StreamDecoder(started)
+        try:
+            async for line in response.aiter_lines():
+                delta = decoder.feed(line)
+                if decoder.done:
+                    break
+                if delta:
+                    yield delta
+            decoder.finish(on_finish)
+        except Exception:
+            metrics.LLM_FAILURES.inc(mode="stream")
+            raise
+        finally:
+            await response.aclose()
+            self._slots.release()
+
+    async def _post(self, payload, stream=False):
+        """POST with capped exponential backoff on 429/5xx and connection errors
+
+        A successful streaming response keeps its concurrency slot; the caller
+        must release it once the body has been consumed.
+        """
+        attempt = 0
+        while True:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), QUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise LLMClientError("Timed out waiting for a free upstream slot")
+            response, error = None, None
+            try:
+                request = self._client.build_request("POST", self.url, json=payload)
+                response = await self._client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                self._slots.release()
+                raise
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                if stream and response.is_success:
+                    return response
+                self._slots.release()
+                if stream:
+                    await response.aread()
+                    await response.aclose()
+                response.raise_for_status()
+                return response
+
+            self._slots.release()
+            if response is not None and stream:
+                await response.aclose()
+
+            if attempt >= self.max_retries:
+                if response is None:
+                    raise LLMClientError(f"Connection failed: {error}")
+                response.raise_for_status()
+
+            await asyncio.sleep(before_retry(attempt, self.max_retries, response))
+            attempt += 1
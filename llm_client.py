@@ -0,0 +1,245 @@
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+GROQ_API_URL = os.environ.get("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+# Tunables (override through the environment)
+CONNECT_TIMEOUT = float(os.environ.get("GROQ_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("GROQ_READ_TIMEOUT", "60"))
+MAX_RETRIES = int(os.environ.get("GROQ_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.environ.get("GROQ_BACKOFF_BASE", "0.5"))
+BACKOFF_CAP = float(os.environ.get("GROQ_BACKOFF_CAP", "8"))
+RETRY_AFTER_CAP = float(os.environ.get("GROQ_RETRY_AFTER_CAP", "30"))
+MAX_CONCURRENCY = int(os.environ.get("GROQ_MAX_CONCURRENCY", "8"))
+QUEUE_TIMEOUT = float(os.environ.get("GROQ_QUEUE_TIMEOUT", "30"))
+POOL_SIZE = int(os.environ.get("GROQ_POOL_SIZE", "16"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMClientError(Exception):
+    """Raised when the upstream API cannot produce a completion"""
+
+
+def chat_payload(messages, model, temperature, max_tokens, stream=False):
+    """Request body for a chat completion"""
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+class StreamDecoder:
+    """Turns the SSE lines of a streaming completion into content deltas
+
+    Tracks the finish_reason and usage of the final chunks and records the
+    streaming metrics, so GroqClient and AsyncGroqClient only differ in how
+    they read lines.
+    """
+
+    def __init__(self, started):
+        self.started = started
+        self.finish_reason = None
+        self.usage = None
+        self.done = False
+        self._first_delta = True
+
+    def feed(self, line):
+        """Decode one line; returns its content delta or None"""
+        if not line or not line.startswith("data:"):
+            return None
+        data = line[5:].strip()
+        if data == "[DONE]":
+            self.done = True
+            return None
+        chunk = json.loads(data)
+        # Groq reports usage on the final chunk under x_groq
+        chunk_usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage")
+        metrics.record_usage(chunk_usage)
+        self.usage = chunk_usage or self.usage
+        choices = chunk.get("choices") or [{}]
+        self.finish_reason = choices[0].get("finish_reason") or self.finish_reason
+        delta = choices[0].get("delta", {}).get("content")
+        if delta and self._first_delta:
+            metrics.LLM_FIRST_BYTE_SECONDS.observe(time.perf_counter() - self.started, mode="stream")
+            self._first_delta = False
+        return delta or None
+
+    def finish(self, on_finish=None):
+        metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - self.started, mode="stream")
+        if on_finish:
+            on_finish(self.finish_reason, self.usage)
+
+
+def retry_delay(attempt, response):
+    """Honour Retry-After when present, otherwise full-jitter exponential backoff"""
+    if response is not None:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            return min(retry_after, RETRY_AFTER_CAP)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def before_retry(attempt, max_retries, response):
+    """Record a retry of a failed POST (response is None after a connection error); returns the delay"""
+    delay = retry_delay(attempt, response)
+    status = response.status_code if response is not None else "connection error"
+    metrics.LLM_RETRIES.inc(reason=status)
+    print(f"Groq API retry {attempt + 1}/{max_retries} after {status}, sleeping {delay:.2f}s")
+    return delay
+
+
+class GroqClient:
+    """Keep-alive, rate-limited client for the Groq chat-completions API"""
+
+    def __init__(self, api_key=None, url=GROQ_API_URL, pool_size=POOL_SIZE,
+                 max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES):
+        self.api_key = api_key if api_key is not None else os.environ.get("GROQ_API_KEY")
+        self.url = url
+        self.max_retries = max_retries
+        self.timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
+
+        # Process-wide cap on in-flight upstream requests
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def chat(self, messages, model=DEFAULT_MODEL, temperature=0.7, max_tokens=2000):
+        """Run a chat completion and return the decoded response body"""
+        payload = chat_payload(messages, model, temperature, max_tokens)
+        started = time.perf_counter()
+        try:
+            response = self._post(payload)
+            metrics.LLM_FIRST_BYTE_SECONDS.observe(response.elapsed.total_seconds(), mode="chat")
+            data = response.json()
+        except BaseException:
+            metrics.LLM_FAILURES.inc(mode="chat")
+            raise
+        metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, mode="chat")
+        metrics.record_usage(data.get("usage"))
+        return data
+
+    def stream_chat(self, messages, model=DEFAULT_MODEL, temperature=0.7, max_tokens=2000, on_finish=None):
+        """Run a streaming chat completion, yielding content deltas as they arrive
+
+        on_finish(finish_reason, usage) is called once the stream ends, with
+        whatever the final chunks reported (None when absent).
+        """
+        payload = chat_payload(messages, model, temperature, max_tokens, stream=True)
+        started = time.perf_counter()
+        try:
+            response = self._post(payload, stream=True)
+        except BaseException:
+            metrics.LLM_FAILURES.inc(mode="stream")
+            raise
+        decoder = StreamDecoder(started)
+        try:
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                delta = decoder.feed(line)
+                if decoder.done:
+                    break
+                if delta:
+                    yield delta
+            decoder.finish(on_finish)
+        except Exception:
+            metrics.LLM_FAILURES.inc(mode="stream")
+            raise
+        finally:
+            response.close()
+            self._slots.release()
+
+    def _post(self, payload, stream=False):
+        """POST with capped exponential backoff on 429/5xx and connection errors
+
+        A successful streaming response keeps its concurrency slot; the caller
+        must release it once the body has been consumed.
+        """
+        attempt = 0
+        while True:
+            if not self._slots.acquire(timeout=QUEUE_TIMEOUT):
+                raise LLMClientError("Timed out waiting for a free upstream slot")
+            response, error = None, None
+            try:
+                response = self._session.post(self.url, json=payload, timeout=self.timeout, stream=stream)
+            except requests.ConnectionError as e:
+                error = e
+            except BaseException:
+                self._slots.release()
+                raise
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                if stream and response.ok:
+                    return response
+                self._slots.release()
+                response.raise_for_status()
+                return response
+
+            self._slots.release()
+            if response is not None and stream:
+                response.close()
+
+            if attempt >= self.max_retries:
+                if response is None:
+                    raise LLMClientError(f"Connection failed: {error}")
+                response.raise_for_status()
+
+            time.sleep(before_retry(attempt, self.max_retries, response))
+            attempt += 1
+
+
+def parse_retry_after(value):
+    """Convert a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the shared client, rebuilding it after a fork"""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = GroqClient()
+                _client_pid = pid
+    return _client
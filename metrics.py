@@ -0,0 +1,267 @@
+"""In-process metrics exposed in the Prometheus text format at /metrics.
+
+Every worker process keeps its own registry, so scrape each worker (or run
+a single one) to see the whole picture. An opt-in sampling profiler writes
+cProfile dumps for requests slower than PROFILE_SLOW_REQUESTS seconds.
+"""
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+from flask import g, request
+
+# Tunables (override through the environment)
+PROFILE_SLOW_REQUESTS = float(os.environ.get("PROFILE_SLOW_REQUESTS", "0"))  # seconds; 0 disables profiling
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0.1"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+SUMMARY_WINDOW = int(os.environ.get("METRICS_SUMMARY_WINDOW", "1024"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+QUANTILES = (0.5, 0.9, 0.99)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _copy(self, value):
+        return value
+
+    def _samples(self, value):
+        yield "", (), value
+
+    def render(self):
+        with self._lock:
+            snapshot = sorted((key, self._copy(value)) for key, value in self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in snapshot:
+            base = list(zip(self.labels, key))
+            for suffix, extra, sample in self._samples(value):
+                lines.append(f"{self.name}{suffix}{_format_labels(base + list(extra))} {_format_value(sample)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _copy(self, value):
+        return [list(value[0]), value[1], value[2]]
+
+    def _samples(self, value):
+        counts, total, count = value
+        running = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            yield "_bucket", (("le", bound),), running
+        yield "_bucket", (("le", "+Inf"),), count
+        yield "_sum", (), total
+        yield "_count", (), count
+
+
+class Summary(_Metric):
+    """Quantiles over the most recent SUMMARY_WINDOW observations"""
+
+    kind = "summary"
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [deque(maxlen=SUMMARY_WINDOW), 0.0, 0]
+            state[0].append(value)
+            state[1] += value
+            state[2] += 1
+
+    def _copy(self, value):
+        return [sorted(value[0]), value[1], value[2]]
+
+    def _samples(self, value):
+        window, total, count = value
+        for quantile in QUANTILES:
+            if window:
+                yield "", (("quantile", quantile),), window[min(len(window) - 1, int(quantile * len(window)))]
+        yield "_sum", (), total
+        yield "_count", (), count
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency including streamed bodies", ("method", "route", "status"))
+LLM_FIRST_BYTE_SECONDS = Histogram(
+    "llm_time_to_first_byte_seconds", "Time until response headers (chat) or the first content delta (stream)",
+    ("mode",))
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds", "Total LLM call time including retries", ("mode",))
+LLM_FAILURES = Counter("llm_failures_total", "LLM calls that raised", ("mode",))
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported in the Groq usage field", ("kind",))
+LLM_RETRIES = Counter("llm_retries_total", "Upstream retries by cause", ("reason",))
+LLM_ROUTED = Counter(
+    "llm_routed_total", "Routed LLM attempts by backend and outcome (won, failed)",
+    ("task", "complexity", "backend", "outcome"))
+LLM_HEDGES = Counter(
+    "llm_hedges_total", "Duplicate requests sent to a secondary backend (slow or failover)",
+    ("task", "backend", "reason"))
+LLM_RATE_LIMITED = Counter(
+    "llm_rate_limited_total", "Attempts not sent because the account limiter would make them wait too long",
+    ("task", "reason"))
+LLM_BREAKER_OPENED = Counter("llm_breaker_opened_total", "Circuit breaker trips by backend", ("backend",))
+JSON_PARSE = Counter(
+    "llm_json_parse_total", "Structured LLM outputs by parse outcome (ok, repaired, failed)",
+    ("kind", "complexity", "outcome"))
+PROMPT_TOKENS = Summary("llm_prompt_tokens", "Approximate tokens of rendered prompts", ("task", "complexity"))
+PROMPT_TRUNCATIONS = Counter(
+    "llm_prompt_truncations_total", "Prompts whose candidate response was shortened to fit the budget", ("task",))
+COMPLETION_TOKENS = Summary(
+    "llm_completion_tokens", "Completion lengths used to size max_tokens (cut-off completions count as the ceiling)",
+    ("task", "complexity"))
+SQLITE_QUERY_SECONDS = Histogram(
+    "sqlite_query_duration_seconds", "SQLite statement execution time", ("statement",), buckets=QUERY_BUCKETS)
+EVAL_CACHE = Counter("evaluation_cache_events_total", "Evaluation cache lookups and writes (hit, miss, store)",
+                     ("event",))
+SESSION_SIZE_BYTES = Summary("session_size_bytes", "Serialized size of sessions written to the store")
+PROFILES_WRITTEN = Counter("slow_request_profiles_total", "cProfile dumps written for slow requests", ("route",))
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+def record_usage(usage):
+    """Count prompt/completion tokens from an API usage object"""
+    if not usage:
+        return
+    LLM_TOKENS.inc(usage.get("prompt_tokens") or 0, kind="prompt")
+    LLM_TOKENS.inc(usage.get("completion_tokens") or 0, kind="completion")
+
+
+def record_parse(kind, complexity, outcome):
+    JSON_PARSE.inc(kind=kind, complexity=complexity or "unknown", outcome=outcome)
+
+
+def observe_query(sql, seconds):
+    statement = sql.split(None, 1)[0].upper() if sql.strip() else "EMPTY"
+    SQLITE_QUERY_SECONDS.observe(seconds, statement=statement)
+
+
+# Only one cProfile profiler can be active per interpreter
+_profile_lock = threading.Lock()
+
+
+def _start_profile():
+    if PROFILE_SLOW_REQUESTS <= 0 or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        _profile_lock.release()
+        return None
+    return profiler
+
+
+def _finish_profile(profiler, seconds, method, route):
+    try:
+        profiler.disable()
+    finally:
+        _profile_lock.release()
+    if seconds < PROFILE_SLOW_REQUESTS:
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = re.sub(r"[^A-Za-z0-9.-]+", "_", f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{method}{route}")
+    profiler.dump_stats(os.path.join(PROFILE_DIR, f"{name}-{int(seconds * 1000)}ms.prof"))
+    PROFILES_WRITTEN.inc(route=route)
+
+
+def init_app(app):
+    """Time every request (and profile a sample of them when enabled)"""
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_profiler = _start_profile()
+
+    @app.after_request
+    def record_request(response):
+        started = g.get("metrics_started")
+        if started is None:
+            return response
+        method = request.method
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        status = response.status_code
+
+        # Streamed bodies are produced after this hook, so stop the clock on close
+        def finish():
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=method, route=route, status=status)
+
+        response.call_on_close(finish)
+        return response
+
+    # Teardown runs even when the view raised, so the profiler lock is always given back
+    @app.teardown_request
+    def stop_profile(exc):
+        profiler = g.pop("metrics_profiler", None)
+        if profiler is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            _finish_profile(profiler, time.perf_counter() - g.metrics_started, request.method, route)
@@ -0,0 +1,130 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Tunables (override through the environment)
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")  # e.g. pbkdf2:sha256:600000
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))  # 0 hashes inline
+PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", "10"))
+LOGIN_WINDOW = float(os.environ.get("LOGIN_THROTTLE_WINDOW", "300"))
+LOGIN_MAX_FAILURES = int(os.environ.get("LOGIN_MAX_FAILURES", "5"))  # per username per window
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.environ.get("LOGIN_MAX_ATTEMPTS_PER_IP", "30"))  # per window
+THROTTLE_MAX_KEYS = 10000
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_current_method = None
+
+
+def _get_pool():
+    """Shared hashing pool, rebuilt after a fork"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ProcessPoolExecutor(PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+                _pool_pid = pid
+    return _pool
+
+
+def _run(func, *args, **kwargs):
+    """Run a KDF call in the hashing pool
+
+    The calling request worker still blocks until the result arrives; only
+    the GIL is freed for other threads while the hash runs elsewhere.
+    Raises TimeoutError when the pool is too backed up to answer within
+    PASSWORD_HASH_TIMEOUT (callers should tell the client to retry).
+    """
+    if PASSWORD_HASH_WORKERS <= 0:
+        return func(*args, **kwargs)
+    future = _get_pool().submit(func, *args, **kwargs)
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except TimeoutError:
+        future.cancel()  # drop it from the queue if it has not started
+        raise
+
+
+def hash_password(password):
+    """Hash a password with the configured KDF off the request worker"""
+    return _run(generate_password_hash, password, method=PASSWORD_HASH_METHOD)
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+def current_method():
+    """Full parameter string of the configured method, e.g. 'scrypt:32768:8:1'"""
+    global _current_method
+    if _current_method is None:
+        _current_method = hash_password("").split("$", 1)[0]
+    return _current_method
+
+
+def needs_rehash(password_hash):
+    """True if a stored hash was made with different KDF parameters"""
+    return password_hash.split("$", 1)[0] != current_method()
+
+
+class LoginThrottle:
+    """Sliding-window limits on failed logins per username and attempts per client IP
+
+    Counters are per process, so with several workers the effective limit is
+    that many times higher; it is there to keep bursts from reaching the KDF.
+    """
+
+    def __init__(self, window=LOGIN_WINDOW, max_failures=LOGIN_MAX_FAILURES,
+                 max_attempts_per_ip=LOGIN_MAX_ATTEMPTS_PER_IP):
+        self.window = window
+        self.max_failures = max_failures
+        self.max_attempts_per_ip = max_attempts_per_ip
+        self._failures = {}
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def _recent(self, events, key, now):
+        times = events.get(key)
+        if times is None:
+            return 0
+        while times and times[0] <= now - self.window:
+            times.popleft()
+        if not times:
+            del events[key]
+            return 0
+        return len(times)
+
+    def _prune(self, events, now):
+        """Drop idle keys once the table grows large"""
+        if len(events) > THROTTLE_MAX_KEYS:
+            for key in list(events):
+                self._recent(events, key, now)
+
+    def allow(self, username, ip):
+        """Record an attempt from `ip`; False if it must be rejected without hashing"""
+        now = time.monotonic()
+        with self._lock:
+            if self._recent(self._failures, username, now) >= self.max_failures:
+                return False
+            if self._recent(self._attempts, ip, now) >= self.max_attempts_per_ip:
+                return False
+            self._attempts.setdefault(ip, deque()).append(now)
+            self._prune(self._attempts, now)
+            return True
+
+    def failed(self, username):
+        now = time.monotonic()
+        with self._lock:
+            self._failures.setdefault(username, deque()).append(now)
+            self._prune(self._failures, now)
+
+    def succeeded(self, username):
+        with self._lock:
+            self._failures.pop(username, None)
@@ -0,0 +1,403 @@
+"""Versioned prompt templates with token budgeting and adaptive max_tokens.
+
+Every (task, complexity) prompt is compiled once at import: the complexity
+specific criteria are substituted and the indentation the old f-strings
+sent upstream is stripped, leaving a string.Template with only the
+per-request fields. render() fills them in, counts the prompt's tokens and,
+when the prompt would exceed PROMPT_INPUT_BUDGET, shortens the scenario and
+then the candidate response to their opening and closing sentences; the
+response always keeps a minimum share of the budget. max_tokens() sizes the
+completion from the lengths observed for the same route (a high percentile
+plus headroom) instead of a fixed 2500; routes that have not seen enough
+completions yet, and the ceiling, use the task default.
+
+Token counts come from count_tokens(), a local approximation of the Llama 3
+tokenizer (the same pre-tokenization split, with long words costed as
+several tokens). It needs no download and tracks the usage Groq reports
+closely enough for budgeting.
+"""
+import math
+import os
+import re
+import string
+import textwrap
+import threading
+from collections import deque
+
+import metrics
+
+# Tunables (override through the environment)
+PROMPT_INPUT_BUDGET = int(os.environ.get("PROMPT_INPUT_BUDGET", "3000"))  # prompt tokens; 0 disables truncation
+MAX_TOKENS_PERCENTILE = float(os.environ.get("MAX_TOKENS_PERCENTILE", "99"))
+MAX_TOKENS_HEADROOM = float(os.environ.get("MAX_TOKENS_HEADROOM", "1.3"))
+MAX_TOKENS_MIN_SAMPLES = int(os.environ.get("MAX_TOKENS_MIN_SAMPLES", "20"))
+# The candidate response always keeps this many tokens (or this share of the budget, if more)
+PROMPT_RESPONSE_MIN_TOKENS = int(os.environ.get("PROMPT_RESPONSE_MIN_TOKENS", "500"))
+PROMPT_RESPONSE_MIN_SHARE = float(os.environ.get("PROMPT_RESPONSE_MIN_SHARE", "0.5"))
+COMPLETION_WINDOW = 500
+
+# Per task: (default and ceiling, floor) for max_tokens
+MAX_TOKENS = {
+    "scenario": (2000, 400),
+    "evaluation": (2500, 800),
+}
+DEFAULT_TASK_MAX_TOKENS = (2000, 400)
+
+# Chat formatting tokens added around each message, and to prime the reply
+MESSAGE_OVERHEAD = 4
+REPLY_OVERHEAD = 3
+
+_PIECES = re.compile(
+    r"'(?:[sdmt]|ll|ve|re)|[^\r\n\w]?[^\W\d_]+|\d{1,3}| ?[^\s\w]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+",
+    re.IGNORECASE)
+_SENTENCES = re.compile(r"[^.!?\n]*(?:[.!?]+|\n+|$)\s*")
+
+
+def _piece_tokens(piece):
+    word = piece.strip()
+    if not word:
+        return 1
+    if not word.isascii():
+        return len(word)
+    if word[-1].isalpha():
+        return max(1, (len(word) + 5) // 8)
+    return max(1, (len(word) + 1) // 2)
+
+
+def count_tokens(text):
+    """Approximate Llama 3 token count of a string"""
+    return sum(_piece_tokens(piece) for piece in _PIECES.findall(text or ""))
+
+
+def count_message_tokens(messages):
+    """Approximate prompt tokens of a chat request"""
+    return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD for m in messages) + REPLY_OVERHEAD
+
+
+def _head(text, max_tokens):
+    """Longest prefix of text within max_tokens"""
+    used = 0
+    end = 0
+    for match in _PIECES.finditer(text):
+        cost = _piece_tokens(match.group())
+        if used + cost > max_tokens:
+            # Keep the share of an overlong piece (a URL, a run of symbols) that fits
+            end += (max_tokens - used) * len(match.group()) // cost
+            break
+        used += cost
+        end = match.end()
+    return text[:end]
+
+
+def truncate(text, max_tokens):
+    """Shorten text to about max_tokens, keeping whole opening and closing sentences
+
+    Candidates state their approach first and their conclusion last, so two
+    thirds of the budget go to the start and the rest to the end, with a
+    marker saying how much was left out. Returns (text, truncated).
+    """
+    if count_tokens(text) <= max_tokens:
+        return text, False
+    budget = max(0, max_tokens - 12)  # room for the marker
+    sentences = [s for s in _SENTENCES.findall(text) if s]
+    costs = [count_tokens(s) for s in sentences]
+
+    head_budget = budget * 2 // 3
+    head, used = 0, 0
+    while head < len(sentences) and used + costs[head] <= head_budget:
+        used += costs[head]
+        head += 1
+    tail, tail_used = len(sentences), 0
+    while tail > head and used + tail_used + costs[tail - 1] <= budget:
+        tail -= 1
+        tail_used += costs[tail]
+
+    start = "".join(sentences[:head])
+    if not start:
+        # The opening sentence alone is over budget: cut it at a token boundary
+        start = _head(text, budget - tail_used)
+    end = "".join(sentences[tail:])
+    omitted = len(text.split()) - len(start.split()) - len(end.split())
+    return f"{start.rstrip()}\n[... {max(omitted, 1)} words omitted ...]\n{end.lstrip()}".rstrip(), True
+
+
+class Rendered:
+    """A rendered prompt: the chat messages and their approximate token count"""
+
+    def __init__(self, messages, prompt_tokens, truncated):
+        self.messages = messages
+        self.prompt_tokens = prompt_tokens
+        self.truncated = truncated
+
+
+class PromptTemplate:
+    """One compiled (task, complexity) prompt"""
+
+    def __init__(self, task, complexity, version, system, user, truncate_field=None, shrink_fields=(),
+                 **constants):
+        self.task = task
+        self.complexity = complexity
+        self.version = version
+        self.system = system
+        # Complexity-specific parts are substituted now; $fields left over are filled per request
+        self.template = string.Template(string.Template(textwrap.dedent(user).strip()).safe_substitute(
+            complexity=complexity, **constants))
+        self.fields = self.template.get_identifiers()
+        self.truncate_field = truncate_field
+        # Fields shortened before truncate_field, which keeps its minimum share
+        self.shrink_fields = tuple(shrink_fields)
+
+    def messages(self, **values):
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.template.substitute(values)}
+        ]
+
+    def _fit(self, values, budget):
+        """Shorten fields to fit the budget; returns the names of the fields shortened
+
+        The shrink_fields give way first, down to whatever leaves the
+        truncate_field its minimum share; the truncate_field is never cut below
+        that share, even if the prompt then stays over budget.
+        """
+        costs = {name: count_tokens(values[name]) for name in self.fields}
+        fixed = count_message_tokens(self.messages(**{name: "" for name in self.fields}))
+        available = budget - fixed
+        if sum(costs.values()) <= available:
+            return []
+        target = self.truncate_field
+        reserved = min(costs[target], max(PROMPT_RESPONSE_MIN_TOKENS, int(budget * PROMPT_RESPONSE_MIN_SHARE)))
+        shortened = []
+        for name in self.shrink_fields:
+            others = sum(cost for other, cost in costs.items() if other not in (name, target))
+            room = max(0, available - others - reserved)
+            if costs[name] > room:
+                values[name], _ = truncate(values[name], room)
+                costs[name] = count_tokens(values[name])
+                shortened.append(name)
+        room = max(reserved, available - sum(cost for name, cost in costs.items() if name != target))
+        values[target], truncated = truncate(values[target], room)
+        if truncated:
+            shortened.append(target)
+        return shortened
+
+    def render(self, budget=None, **values):
+        """Messages for these field values, shortening long fields to fit the budget"""
+        values = {name: str(values.get(name) or "") for name in self.fields}
+        shortened = self._fit(values, budget) if budget and self.truncate_field else []
+        messages = self.messages(**values)
+        prompt_tokens = count_message_tokens(messages)
+        metrics.PROMPT_TOKENS.observe(prompt_tokens, task=self.task, complexity=self.complexity)
+        if shortened:
+            metrics.PROMPT_TRUNCATIONS.inc(task=self.task)
+            print(f"Shortened {', '.join(shortened)} to fit the {self.task} prompt budget of {budget} tokens")
+        if budget and prompt_tokens > budget:
+            print(f"{self.task} prompt is {prompt_tokens} tokens, over the budget of {budget}")
+        return Rendered(messages, prompt_tokens, bool(shortened))
+
+
+_templates = {}
+
+
+def register(template):
+    _templates[(template.task, template.complexity)] = template
+
+
+def get(task, complexity):
+    """The compiled template for a task; unknown complexities use the High one, as before"""
+    return _templates.get((task, complexity)) or _templates[(task, "High")]
+
+
+def version(task):
+    """Version string for cache keys: changes with any template of the task or the input budget"""
+    versions = sorted({t.version for (name, _), t in _templates.items() if name == task})
+    return f"{'+'.join(versions)}/{PROMPT_INPUT_BUDGET}"
+
+
+def render(task, complexity, **values):
+    return get(task, complexity).render(budget=PROMPT_INPUT_BUDGET, **values)
+
+
+class CompletionLengths:
+    """Recent completion lengths per (task, complexity), for sizing max_tokens"""
+
+    def __init__(self, window=COMPLETION_WINDOW):
+        self._lock = threading.Lock()
+        self._window = window
+        self._lengths = {}
+
+    def observe(self, task, complexity, tokens, max_tokens=None, truncated=False):
+        ceiling, _ = MAX_TOKENS.get(task, DEFAULT_TASK_MAX_TOKENS)
+        # A completion cut off at the limit says nothing about its real length; assume the worst
+        if truncated or (max_tokens and tokens >= max_tokens):
+            tokens = ceiling
+        metrics.COMPLETION_TOKENS.observe(tokens, task=task, complexity=complexity)
+        with self._lock:
+            lengths = self._lengths.get((task, complexity))
+            if lengths is None:
+                lengths = self._lengths[(task, complexity)] = deque(maxlen=self._window)
+            lengths.append(tokens)
+
+    def max_tokens(self, task, complexity):
+        ceiling, floor = MAX_TOKENS.get(task, DEFAULT_TASK_MAX_TOKENS)
+        with self._lock:
+            lengths = sorted(self._lengths.get((task, complexity), ()))
+        if len(lengths) < MAX_TOKENS_MIN_SAMPLES:
+            return ceiling
+        observed = lengths[min(len(lengths) - 1, int(MAX_TOKENS_PERCENTILE / 100 * len(lengths)))]
+        return max(floor, min(ceiling, math.ceil(observed * MAX_TOKENS_HEADROOM)))
+
+
+completion_lengths = CompletionLengths()
+
+
+def max_tokens(task, complexity):
+    """max_tokens for the next completion on this route"""
+    return completion_lengths.max_tokens(task, complexity)
+
+
+def observe_completion(task, complexity, data, max_tokens=None):
+    """Record the length of a chat completion response body"""
+    choice = (data.get("choices") or [{}])[0]
+    tokens = (data.get("usage") or {}).get("completion_tokens")
+    if tokens is None:
+        tokens = count_tokens((choice.get("message") or {}).get("content") or "")
+    completion_lengths.observe(task, complexity, tokens, max_tokens, choice.get("finish_reason") == "length")
+
+
+def observe_streamed(task, complexity, text, max_tokens=None, finish_reason=None, usage=None):
+    """Record the length of a streamed completion
+
+    Uses the final chunk's usage and finish_reason when the stream reported
+    them, else counts the streamed text.
+    """
+    tokens = (usage or {}).get("completion_tokens")
+    if tokens is None:
+        tokens = count_tokens(text)
+    completion_lengths.observe(task, complexity, tokens, max_tokens, finish_reason == "length")
+
+
+SCENARIO_SYSTEM = "You are an expert assessment designer who creates realistic professional scenarios."
+
+SCENARIO_PROMPT = """
+    You are an expert in professional skills assessment. Generate a realistic scenario for a $job_role position.
+
+    $instructions
+
+    Requirements:
+    1. Adhere strictly to the defined Complexity Level.
+    2. Include specific details relevant to the $job_role.
+    3. The scenario should be 100-200 words.
+
+    Format your response as a JSON object with these fields:
+    {
+      "scenario_title": "Brief title of the scenario",
+      "scenario_description": "Detailed scenario description",
+      "complexity_level": "Medium/High",
+      "key_challenges": ["challenge1", "challenge2", "challenge3"]
+    }
+
+    Respond ONLY with valid JSON, no additional text.
+"""
+
+SCENARIO_INSTRUCTIONS = {
+    "Low": """
+        LEVEL: LOW (Foundational Knowledge)
+        - Focus on verifying core concepts, definitions, and terminology.
+        - Scenario should be simple, direct, and low ambiguity.
+        - Example: "What is [Concept] and why is it important?" or a very basic troubleshooting step.
+        - Goal: Filter out fake credentials.
+    """,
+    "Medium": """
+        LEVEL: MEDIUM (Applied Thinking)
+        - Focus on problem-solving, process selection, and trade-offs.
+        - Scenario should be a realistic workplace situation with some ambiguity.
+        - Example: "A specific problem occurred. How do you investigate and fix it?"
+        - Goal: Measure real job readiness.
+    """,
+    "High": """
+        LEVEL: HIGH (Strategic & Executive Thinking)
+        - Focus on risk management, ethics, business impact, and multi-stakeholder decisions.
+        - Scenario should be high-stakes, ambiguous, with no single correct answer.
+        - Example: "A critical crisis with conflicting business/ethical goals. What is your strategy?"
+        - Goal: Identify leaders.
+    """,
+}
+
+EVALUATION_SYSTEM = "You are an expert professional evaluator with deep knowledge across multiple domains."
+
+EVALUATION_PROMPT = """
+    You are an expert evaluator for professional capability assessment.
+
+    JOB ROLE: $job_role
+    COMPLEXITY LEVEL: $complexity
+
+    SCENARIO:
+    $scenario_description
+
+    CANDIDATE RESPONSE:
+    $user_response
+
+    $criteria
+
+    Respond ONLY with valid JSON in this exact format. Do NOT include markdown formatting or comments.
+
+    CRITICAL: The "dimensions" field must be a JSON Object { }, NOT a list [ ].
+    Do NOT end the dimensions object with a square bracket ].
+
+    {
+      "overall_score": <number between 0-100>,
+      "dimensions": {
+    $dimensions
+      },
+      "strengths": ["Strength 1", "Strength 2", "Strength 3"],
+      "weaknesses": ["Weakness 1", "Weakness 2", "Weakness 3"],
+      "skill_readiness": "Assessment of readiness for this level",
+      "recommendations": ["Rec 1", "Rec 2", "Rec 3"],
+      "performance_level": "Entry/Mid/Senior/Expert",
+      "ideal_answer": "A concise, high-quality, model response (100-150 words) that effectively addresses the scenario at the chosen complexity level."
+    }
+"""
+
+EVALUATION_CRITERIA = {
+    "Low": ("""
+        Evaluate based on LOW Complexity (Foundational):
+        1. Accuracy: Are the definitions/concepts correct?
+        2. Clarity: Can the user explain it clearly?
+        3. Basic Understanding: Do they grasp fundamentals?
+    """, """
+        "accuracy": {"score": <0-100>, "feedback": "analysis of correctness"},
+        "clarity": {"score": <0-100>, "feedback": "analysis of explanation quality"},
+        "basic_understanding": {"score": <0-100>, "feedback": "grasp of core concepts"}
+    """),
+    "Medium": ("""
+        Evaluate based on MEDIUM Complexity (Applied):
+        1. Reasoning: Does the user follow a logical process?
+        2. Technical Correctness: Are they choosing the right methods?
+        3. Practicality: Is the solution workable?
+    """, """
+        "reasoning": {"score": <0-100>, "feedback": "logic analysis"},
+        "technical_correctness": {"score": <0-100>, "feedback": "method accuracy"},
+        "practicality": {"score": <0-100>, "feedback": "solution feasibility"}
+    """),
+    "High": ("""
+        Evaluate based on HIGH Complexity (Strategic):
+        1. Strategic Reasoning: Are long-term effects considered?
+        2. Ethical Judgment: Are risks and fairness addressed?
+        3. Decision Quality: Is the trade-off handled intelligently?
+    """, """
+        "strategic_reasoning": {"score": <0-100>, "feedback": "long-term thinking analysis"},
+        "ethical_judgment": {"score": <0-100>, "feedback": "risk/ethics analysis"},
+        "decision_quality": {"score": <0-100>, "feedback": "trade-off handling"}
+    """),
+}
+
+# Bump a task's version whenever its prompt text changes so cached results are not reused
+for _complexity, _instructions in SCENARIO_INSTRUCTIONS.items():
+    register(PromptTemplate("scenario", _complexity, "2", SCENARIO_SYSTEM, SCENARIO_PROMPT,
+                            instructions=textwrap.dedent(_instructions).strip()))
+for _complexity, (_criteria, _dimensions) in EVALUATION_CRITERIA.items():
+    register(PromptTemplate("evaluation", _complexity, "3", EVALUATION_SYSTEM, EVALUATION_PROMPT,
+                            truncate_field="user_response", shrink_fields=("scenario_description",),
+                            criteria=textwrap.dedent(_criteria).strip(),
+                            dimensions=textwrap.indent(textwrap.dedent(_dimensions).strip(), "    ")))
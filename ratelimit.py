@@ -0,0 +1,135 @@
+"""Process-wide request and token rate limits for the LLM accounts.
+
+Every upstream call (interactive, queued or batch) reserves one request and
+its estimated tokens from the limiter of the account it is billed to before
+it is sent, and the estimate is corrected from the usage the API reports.
+Buckets hand out reservations in arrival order and let the level go
+negative, so a caller learns up front how long to wait; that works for
+threads (time.sleep) and for the event loop (asyncio.sleep) alike.
+Interactive callers pass max_wait: a reservation that would wait longer is
+handed back and RateLimited raised, so a request thread is never parked
+for long and the client can retry. Limits are per process: divide the
+account limits across workers.
+"""
+import asyncio
+import os
+import threading
+import time
+
+# Groq account limits (override through the environment)
+GROQ_RPM = float(os.environ.get("GROQ_RPM", "30"))
+GROQ_TPM = float(os.environ.get("GROQ_TPM", "12000"))
+# Longest an interactive call waits for the limiter before giving up (seconds)
+MAX_WAIT = float(os.environ.get("LLM_RATE_LIMIT_MAX_WAIT", "5"))
+
+
+class RateLimited(Exception):
+    """Raised when a call would have to wait longer than allowed for its account's limits"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limited; retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Continuously refilling bucket handing out reservations in arrival order"""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Take amount now; returns the seconds to wait before using it"""
+        with self._lock:
+            self._refill()
+            self.level -= self._clamp(amount)
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def release(self, amount):
+        """Hand back a reservation that will not be used"""
+        self.adjust(-self._clamp(amount))
+
+    def _clamp(self, amount):
+        # Requests larger than the bucket still go through once it is full
+        return min(amount, self.capacity)
+
+    def acquire(self, amount):
+        delay = self.reserve(amount)
+        if delay:
+            time.sleep(delay)
+
+    def adjust(self, amount):
+        """Charge (positive) or refund (negative) tokens after the fact"""
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level - amount)
+
+
+class RateLimiter:
+    """Requests/min and tokens/min buckets matching one account's limits"""
+
+    def __init__(self, rpm=GROQ_RPM, tpm=GROQ_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def reserve(self, estimated_tokens, max_wait=None):
+        """Take one request and the estimated tokens; returns the seconds to wait
+
+        With max_wait, a reservation that would wait longer is handed back
+        and RateLimited raised instead.
+        """
+        delay = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        if max_wait is not None and delay > max_wait:
+            self.release(estimated_tokens)
+            raise RateLimited(delay)
+        return delay
+
+    def release(self, estimated_tokens):
+        """Hand back a reservation whose call is not sent"""
+        self.requests.release(1)
+        self.tokens.release(estimated_tokens)
+
+    def acquire(self, estimated_tokens, max_wait=None):
+        delay = self.reserve(estimated_tokens, max_wait)
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self, estimated_tokens, max_wait=None):
+        delay = self.reserve(estimated_tokens, max_wait)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def reconcile(self, estimated_tokens, actual_tokens):
+        """Correct a reservation: actual_tokens None keeps the estimate, 0 refunds it"""
+        if actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+
+_limits = (GROQ_RPM, GROQ_TPM)
+_limiters = {}
+_lock = threading.Lock()
+
+
+def configure(rpm, tpm):
+    """Set the per-account limits (e.g. from CLI flags); call before any LLM traffic"""
+    global _limits
+    with _lock:
+        _limits = (rpm, tpm)
+        _limiters.clear()
+
+
+def for_account(account):
+    """The shared limiter of an account (backends name theirs by API key variable)"""
+    with _lock:
+        limiter = _limiters.get(account)
+        if limiter is None:
+            limiter = _limiters[account] = RateLimiter(*_limits)
+        return limiter
@@ -0,0 +1,440 @@
+"""Routing of LLM calls to backends by task and complexity.
+
+Each route is an ordered list of backends. A call goes to the first backend
+whose circuit breaker admits it; if no valid response has arrived within
+that backend's latency budget (its observed p95, capped at its SLO), a hedged duplicate goes to the
+next backend and the first valid response wins. Failures fail over to the
+next backend immediately. Every attempt first reserves a request and its
+estimated tokens from its account's shared limiter (ratelimit.py), so
+interactive and batch traffic together stay within the account limits.
+The reservation is made before the hedge clock starts; a call waits at
+most max_wait for it (ratelimit.RateLimited beyond that), and hedges are
+only sent when the account has room right away.
+LLM_ROUTING_CONFIG may point at a JSON file:
+
+    {"backends": {"fast": {"model": "llama-3.1-8b-instant", "slo": 3}, ...},
+     "routes": {"evaluation:Low": ["fast", "large"], "*": ["large", "fast"]}}
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+import prompts
+import ratelimit
+from llm_client import GroqClient, GROQ_API_URL, DEFAULT_MODEL, LLMClientError, get_client
+
+# Tunables (override through the environment)
+FAST_MODEL = os.environ.get("LLM_FAST_MODEL", "llama-3.1-8b-instant")
+FAST_SLO = float(os.environ.get("LLM_FAST_SLO", "4"))
+LARGE_SLO = float(os.environ.get("LLM_LARGE_SLO", "15"))
+BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.environ.get("LLM_BREAKER_RESET", "30"))
+ROUTER_WORKERS = int(os.environ.get("LLM_ROUTER_WORKERS", "32"))
+ROUTING_CONFIG = os.environ.get("LLM_ROUTING_CONFIG")
+LATENCY_WINDOW = 200
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; admits one probe per reset interval while open"""
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        """Whether allow() could admit a request now (no side effects)"""
+        with self._lock:
+            return self.opened_at is None or time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def allow(self):
+        """Admit a request; while open, the first caller after each reset interval gets the probe"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                metrics.LLM_BREAKER_OPENED.inc(backend=self.name)
+
+
+class Backend:
+    """A model on an OpenAI-compatible endpoint, with its latency budget"""
+
+    def __init__(self, name, model, slo, url=GROQ_API_URL, api_key_env="GROQ_API_KEY"):
+        self.name = name
+        self.model = model
+        self.slo = slo
+        self.url = url
+        self.api_key_env = api_key_env
+        self.breaker = CircuitBreaker(name)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._client = None
+        self._client_pid = None
+
+    @property
+    def client(self):
+        # The default endpoint shares the process-wide client and its connection pool
+        if self.url == GROQ_API_URL and self.api_key_env == "GROQ_API_KEY":
+            return get_client()
+        if self._client is None or self._client_pid != os.getpid():
+            self._client = GroqClient(api_key=os.environ.get(self.api_key_env), url=self.url)
+            self._client_pid = os.getpid()
+        return self._client
+
+    def hedge_budget(self):
+        """Seconds to wait before hedging: the observed p95, capped at the SLO"""
+        values = sorted(self.latencies)
+        if len(values) < 20:
+            return self.slo
+        return min(self.slo, values[int(len(values) * 0.95)])
+
+
+_backends = {}
+_routes = {}
+
+
+def register_backend(backend):
+    _backends[backend.name] = backend
+
+
+def set_route(task, complexity, backend_names):
+    """Route (task, complexity) to backends in preference order; None matches any"""
+    _routes[(task, complexity)] = list(backend_names)
+
+
+def route(task, complexity):
+    names = _routes.get((task, complexity)) or _routes.get((task, None)) or _routes.get((None, None))
+    return [_backends[name] for name in names]
+
+
+def route_models(task, complexity):
+    """Identity of a route, for cache keys"""
+    return "+".join(backend.model for backend in route(task, complexity))
+
+
+def available(task, complexity):
+    """Backends of the route whose breakers could admit a request
+
+    Only checks state: a backend takes its breaker's probe slot (allow())
+    when a call is actually sent to it, see _admit().
+    """
+    backends = [backend for backend in route(task, complexity) if backend.breaker.available()]
+    if not backends:
+        raise _no_backend(task, complexity)
+    return backends
+
+
+def _admit(waiting, estimated, max_wait):
+    """Pop the first waiting backend whose breaker admits a call and reserve the call on its account
+
+    Returns (backend, limiter, seconds to wait before sending), or None if
+    no backend is left. Raises ratelimit.RateLimited, leaving the backend
+    waiting and its probe slot untaken, if the reservation would wait
+    longer than max_wait.
+    """
+    while waiting:
+        backend = waiting[0]
+        if not backend.breaker.available():
+            waiting.pop(0)
+            continue
+        limiter = ratelimit.for_account(backend.api_key_env)
+        delay = limiter.reserve(estimated, max_wait)
+        waiting.pop(0)
+        if backend.breaker.allow():
+            return backend, limiter, delay
+        limiter.release(estimated)
+    return None
+
+
+def _no_backend(task, complexity):
+    return LLMClientError(f"No LLM backend available for {task}/{complexity}")
+
+
+def load_config(path):
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    for name, options in config.get("backends", {}).items():
+        register_backend(Backend(name, options["model"], float(options.get("slo", LARGE_SLO)),
+                                 options.get("url", GROQ_API_URL), options.get("api_key_env", "GROQ_API_KEY")))
+    for key, names in config.get("routes", {}).items():
+        task, _, complexity = key.partition(":")
+        set_route(None if task == "*" else task, complexity or None, names)
+
+
+register_backend(Backend("fast", FAST_MODEL, FAST_SLO))
+register_backend(Backend("large", DEFAULT_MODEL, LARGE_SLO))
+set_route(None, None, ["large", "fast"])
+set_route("scenario", "Low", ["fast", "large"])
+set_route("evaluation", "Low", ["fast", "large"])
+if ROUTING_CONFIG:
+    load_config(ROUTING_CONFIG)
+
+
+def _estimate(messages, max_tokens):
+    """Tokens to reserve against the account limit before a call"""
+    return prompts.count_message_tokens(messages) + max_tokens
+
+
+def _total_tokens(usage):
+    return (usage or {}).get("total_tokens")
+
+
+def _attempt(task, complexity, backend, limiter, estimated, messages, temperature, max_tokens, parse):
+    started = time.perf_counter()
+    try:
+        data = backend.client.chat(messages, model=backend.model, temperature=temperature, max_tokens=max_tokens)
+        content = data['choices'][0]['message']['content']
+    except Exception:
+        limiter.reconcile(estimated, 0)
+        backend.breaker.record_failure()
+        raise
+    limiter.reconcile(estimated, _total_tokens(data.get('usage')))
+    backend.breaker.record_success()
+    backend.latencies.append(time.perf_counter() - started)
+    prompts.observe_completion(task, complexity, data, max_tokens)
+    # A malformed answer is not an outage, so parse errors do not trip the breaker
+    result = parse(content) if parse else content
+    return result, data
+
+
+def _reserve(task, waiting, estimated, max_wait, reason):
+    """_admit() for launching an attempt: a hedge only goes out if its account has room right now
+
+    Returns None when there is nothing to launch (no backend left, or a
+    hedge the limiter would delay); raises RateLimited for a primary or
+    failover attempt that would wait longer than max_wait.
+    """
+    try:
+        return _admit(waiting, estimated, 0 if reason == "slow" else max_wait)
+    except ratelimit.RateLimited:
+        metrics.LLM_RATE_LIMITED.inc(task=task, reason=reason)
+        if reason == "slow":
+            return None
+        raise
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _executor_lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(ROUTER_WORKERS, thread_name_prefix="llm-router")
+                _executor_pid = pid
+    return _executor
+
+
+def complete(task, complexity, messages, temperature=0.7, max_tokens=None, parse=None,
+             max_wait=ratelimit.MAX_WAIT):
+    """Run a routed, hedged completion; returns (parse(content) or content, response body)
+
+    max_tokens defaults to the route's adaptive limit (prompts.max_tokens).
+    max_wait bounds the wait for the account limits (None waits as long as
+    needed, for batch work). Raises ratelimit.RateLimited when it would be
+    exceeded, or the last attempt's error (LLMClientError, requests errors
+    or ExtractionError) if no backend produced a valid response.
+    """
+    waiting = available(task, complexity)
+    max_tokens = max_tokens or prompts.max_tokens(task, complexity)
+    estimated = _estimate(messages, max_tokens)
+    executor = _get_executor()
+    running = {}
+    last_error = None
+    hedge_at = None
+    hedging = True
+
+    def launch(reason):
+        nonlocal hedge_at, hedging
+        admitted = _reserve(task, waiting, estimated, max_wait, reason)
+        if admitted is None:
+            hedging = hedging and reason != "slow"
+            return
+        backend, limiter, delay = admitted
+        if delay:
+            time.sleep(delay)
+        if reason != "primary":
+            metrics.LLM_HEDGES.inc(task=task, backend=backend.name, reason=reason)
+        running[executor.submit(_attempt, task, complexity, backend, limiter, estimated, messages, temperature,
+                                max_tokens, parse)] = backend
+        # The hedge clock starts once the call is actually sent
+        hedge_at = time.monotonic() + backend.hedge_budget()
+
+    launch("primary")
+    if not running:
+        raise _no_backend(task, complexity)
+    while running:
+        timeout = max(0.0, hedge_at - time.monotonic()) if waiting and hedging else None
+        done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            launch("slow")
+            continue
+        for future in done:
+            backend = running.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                last_error = e
+                metrics.LLM_ROUTED.inc(task=task, complexity=complexity, backend=backend.name, outcome="failed")
+                continue
+            metrics.LLM_ROUTED.inc(task=task, complexity=complexity, backend=backend.name, outcome="won")
+            # A slower duplicate finishes in the background and is discarded
+            return result
+        while not running and waiting:
+            launch("failover")
+    raise last_error
+
+
+async def complete_async(task, complexity, messages, client_for, temperature=0.7, max_tokens=None, parse=None,
+                         max_wait=ratelimit.MAX_WAIT):
+    """complete() for the asyncio serving mode; client_for(backend) returns its AsyncGroqClient"""
+    waiting = available(task, complexity)
+    max_tokens = max_tokens or prompts.max_tokens(task, complexity)
+    estimated = _estimate(messages, max_tokens)
+    running = {}
+    last_error = None
+    hedge_at = None
+    hedging = True
+
+    async def attempt(backend, limiter):
+        started = time.perf_counter()
+        try:
+            data = await client_for(backend).chat(messages, model=backend.model, temperature=temperature,
+                                                  max_tokens=max_tokens)
+            content = data['choices'][0]['message']['content']
+        except Exception:
+            limiter.reconcile(estimated, 0)
+            backend.breaker.record_failure()
+            raise
+        limiter.reconcile(estimated, _total_tokens(data.get('usage')))
+        backend.breaker.record_success()
+        backend.latencies.append(time.perf_counter() - started)
+        prompts.observe_completion(task, complexity, data, max_tokens)
+        return (parse(content) if parse else content), data
+
+    async def launch(reason):
+        nonlocal hedge_at, hedging
+        admitted = _reserve(task, waiting, estimated, max_wait, reason)
+        if admitted is None:
+            hedging = hedging and reason != "slow"
+            return
+        backend, limiter, delay = admitted
+        if delay:
+            await asyncio.sleep(delay)
+        if reason != "primary":
+            metrics.LLM_HEDGES.inc(task=task, backend=backend.name, reason=reason)
+        running[asyncio.ensure_future(attempt(backend, limiter))] = backend
+        hedge_at = time.monotonic() + backend.hedge_budget()
+
+    await launch("primary")
+    if not running:
+        raise _no_backend(task, complexity)
+    try:
+        while running:
+            timeout = max(0.0, hedge_at - time.monotonic()) if waiting and hedging else None
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                await launch("slow")
+                continue
+            for future in done:
+                backend = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    metrics.LLM_ROUTED.inc(task=task, complexity=complexity, backend=backend.name, outcome="failed")
+                    continue
+                metrics.LLM_ROUTED.inc(task=task, complexity=complexity, backend=backend.name, outcome="won")
+                return result
+            while not running and waiting:
+                await launch("failover")
+    finally:
+        # Cancelling the slower duplicate closes its connection
+        for future in running:
+            future.cancel()
+    raise last_error
+
+
+def _recorder(finish):
+    """on_finish callback storing the stream's finish_reason and usage in a dict"""
+    def record(finish_reason, usage):
+        finish.update(finish_reason=finish_reason, usage=usage)
+    return record
+
+
+def stream(task, complexity, messages, temperature=0.7, max_tokens=None, max_wait=ratelimit.MAX_WAIT):
+    """Stream from the first available backend (a started stream is not hedged)"""
+    max_tokens = max_tokens or prompts.max_tokens(task, complexity)
+    estimated = _estimate(messages, max_tokens)
+    admitted = _reserve(task, available(task, complexity), estimated, max_wait, "primary")
+    if admitted is None:
+        raise _no_backend(task, complexity)
+    backend, limiter, delay = admitted
+    if delay:
+        time.sleep(delay)
+    deltas = []
+    finish = {}
+    try:
+        for delta in backend.client.stream_chat(messages, model=backend.model, temperature=temperature,
+                                                max_tokens=max_tokens, on_finish=_recorder(finish)):
+            deltas.append(delta)
+            yield delta
+    except Exception:
+        limiter.reconcile(estimated, 0 if not deltas else None)
+        backend.breaker.record_failure()
+        raise
+    limiter.reconcile(estimated, _total_tokens(finish.get('usage')))
+    backend.breaker.record_success()
+    prompts.observe_streamed(task, complexity, ''.join(deltas), max_tokens, **finish)
+
+
+async def stream_async(task, complexity, messages, client_for, temperature=0.7, max_tokens=None,
+                       max_wait=ratelimit.MAX_WAIT):
+    """stream() for the asyncio serving mode"""
+    max_tokens = max_tokens or prompts.max_tokens(task, complexity)
+    estimated = _estimate(messages, max_tokens)
+    admitted = _reserve(task, available(task, complexity), estimated, max_wait, "primary")
+    if admitted is None:
+        raise _no_backend(task, complexity)
+    backend, limiter, delay = admitted
+    if delay:
+        await asyncio.sleep(delay)
+    deltas = []
+    finish = {}
+    try:
+        async for delta in client_for(backend).stream_chat(messages, model=backend.model, temperature=temperature,
+                                                           max_tokens=max_tokens, on_finish=_recorder(finish)):
+            deltas.append(delta)
+            yield delta
+    except Exception:
+        limiter.reconcile(estimated, 0 if not deltas else None)
+        backend.breaker.record_failure()
+        raise
+    limiter.reconcile(estimated, _total_tokens(finish.get('usage')))
+    backend.breaker.record_success()
+    prompts.observe_streamed(task, complexity, ''.join(deltas), max_tokens, **finish)
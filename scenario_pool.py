@@ -0,0 +1,208 @@
+import json
+import math
+import os
+import threading
+import time
+
+from database import get_db_connection
+from stats import normalize_role
+
+# Tunables (override through the environment)
+POOL_ENABLED = os.environ.get("SCENARIO_POOL_ENABLED", "1") == "1"
+POOL_MAX_SIZE = int(os.environ.get("SCENARIO_POOL_MAX_SIZE", "5"))
+POOL_MAX_KEYS = int(os.environ.get("SCENARIO_POOL_MAX_KEYS", "50"))
+POOL_TTL = float(os.environ.get("SCENARIO_POOL_TTL", str(6 * 3600)))
+DEMAND_HALF_LIFE = float(os.environ.get("SCENARIO_POOL_HALF_LIFE", "3600"))
+HOT_THRESHOLD = float(os.environ.get("SCENARIO_POOL_HOT_THRESHOLD", "2"))
+SWEEP_INTERVAL = float(os.environ.get("SCENARIO_POOL_SWEEP_INTERVAL", "60"))
+# How long a worker may hold a claimed deficit before another one takes it over
+CLAIM_TTL = float(os.environ.get("SCENARIO_POOL_CLAIM_TTL", "120"))
+
+
+def target_size(demand):
+    """Number of ready scenarios to keep for a key with the given decayed demand"""
+    if demand < HOT_THRESHOLD:
+        return 0
+    return min(POOL_MAX_SIZE, max(1, math.ceil(demand / HOT_THRESHOLD)))
+
+
+class ScenarioPool:
+    """SQLite-backed warm pool of scenarios, refilled by a background thread
+
+    Every worker process runs its own refill thread, so a missing scenario
+    is claimed in scenario_claims before it is generated: claims count
+    towards the pool size, which keeps N workers from generating N copies
+    of the same deficit. A claim left behind by a crashed worker expires
+    after CLAIM_TTL.
+    """
+
+    def __init__(self, generator, enabled=POOL_ENABLED):
+        # generator(job_role, complexity) -> scenario dict or None
+        self.generator = generator
+        self.enabled = enabled
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the refill worker (once per process)"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="scenario-pool", daemon=True)
+        self._thread.start()
+
+    def take(self, job_role, complexity):
+        """Record demand and pop one fresh scenario, or None on a miss"""
+        if not self.enabled:
+            return None
+        role_key = normalize_role(job_role)
+        if not role_key:
+            return None
+
+        now = time.time()
+        conn = get_db_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._record_demand(conn, role_key, complexity, job_role, now)
+            row = conn.execute('''
+                SELECT id, scenario_data FROM scenario_pool
+                WHERE role_key = ? AND complexity = ? AND created_at > ?
+                ORDER BY created_at LIMIT 1
+            ''', (role_key, complexity, now - POOL_TTL)).fetchone()
+            if row:
+                conn.execute('DELETE FROM scenario_pool WHERE id = ?', (row['id'],))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Scenario Pool Error: {e}")
+            return None
+        finally:
+            conn.close()
+
+        # Top up in the background whether we hit or missed
+        self._wakeup.set()
+        return json.loads(row['scenario_data']) if row else None
+
+    @staticmethod
+    def _record_demand(conn, role_key, complexity, job_role, now):
+        """Exponentially decayed request counter per key"""
+        row = conn.execute('''
+            SELECT demand, last_requested_at FROM scenario_demand
+            WHERE role_key = ? AND complexity = ?
+        ''', (role_key, complexity)).fetchone()
+        if row:
+            decay = 0.5 ** ((now - row['last_requested_at']) / DEMAND_HALF_LIFE)
+            conn.execute('''
+                UPDATE scenario_demand SET demand = ?, last_requested_at = ?, role_label = ?
+                WHERE role_key = ? AND complexity = ?
+            ''', (row['demand'] * decay + 1, now, job_role, role_key, complexity))
+        else:
+            conn.execute('''
+                INSERT INTO scenario_demand (role_key, complexity, role_label, demand, last_requested_at)
+                VALUES (?, ?, ?, 1, ?)
+            ''', (role_key, complexity, job_role, now))
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(SWEEP_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self._sweep()
+                self._refill()
+            except Exception as e:
+                print(f"Scenario Pool Worker Error: {e}")
+
+    def _sweep(self):
+        """Drop expired scenarios and evict the pools of the least recently used keys"""
+        now = time.time()
+        conn = get_db_connection()
+        try:
+            conn.execute('DELETE FROM scenario_pool WHERE created_at <= ?', (now - POOL_TTL,))
+            conn.execute('DELETE FROM scenario_claims WHERE expires_at <= ?', (now,))
+            conn.execute('''
+                DELETE FROM scenario_demand WHERE rowid IN (
+                    SELECT rowid FROM scenario_demand
+                    ORDER BY last_requested_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (POOL_MAX_KEYS,))
+            conn.execute('''
+                DELETE FROM scenario_pool WHERE NOT EXISTS (
+                    SELECT 1 FROM scenario_demand d
+                    WHERE d.role_key = scenario_pool.role_key AND d.complexity = scenario_pool.complexity
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _refill(self):
+        """Generate scenarios for hot keys until each reaches its demand-driven target"""
+        while True:
+            claim = self._claim_deficit()
+            if claim is None:
+                return
+            claim_id, role_label, role_key, complexity = claim
+            scenario = None
+            try:
+                scenario = self.generator(role_label, complexity)
+            finally:
+                self._settle(claim_id, role_key, complexity, scenario)
+            if not scenario:
+                return
+
+    @staticmethod
+    def _claim_deficit():
+        """Claim one missing scenario of the hot key furthest below its target size
+
+        Returns (claim id, role label, role key, complexity), or None when
+        every key is full or already being filled by other workers.
+        """
+        now = time.time()
+        conn = get_db_connection()
+        try:
+            # The write lock makes the count and the claim one step across workers
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute('''
+                SELECT d.role_key, d.complexity, d.role_label, d.demand, d.last_requested_at,
+                       (SELECT COUNT(*) FROM scenario_pool p
+                        WHERE p.role_key = d.role_key AND p.complexity = d.complexity
+                        AND p.created_at > ?) +
+                       (SELECT COUNT(*) FROM scenario_claims c
+                        WHERE c.role_key = d.role_key AND c.complexity = d.complexity
+                        AND c.expires_at > ?) AS ready
+                FROM scenario_demand d
+            ''', (now - POOL_TTL, now)).fetchall()
+
+            best, best_gap = None, 0
+            for row in rows:
+                demand = row['demand'] * 0.5 ** ((now - row['last_requested_at']) / DEMAND_HALF_LIFE)
+                gap = target_size(demand) - row['ready']
+                if gap > best_gap:
+                    best, best_gap = row, gap
+            if best is None:
+                conn.rollback()
+                return None
+            cursor = conn.execute('''
+                INSERT INTO scenario_claims (role_key, complexity, expires_at) VALUES (?, ?, ?)
+            ''', (best['role_key'], best['complexity'], now + CLAIM_TTL))
+            conn.commit()
+            return cursor.lastrowid, best['role_label'], best['role_key'], best['complexity']
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _settle(claim_id, role_key, complexity, scenario):
+        """Release a claim, storing the scenario it produced (if any) in the same transaction"""
+        conn = get_db_connection()
+        try:
+            if scenario:
+                conn.execute('''
+                    INSERT INTO scenario_pool (role_key, complexity, scenario_data, created_at)
+                    VALUES (?, ?, ?, ?)
+                ''', (role_key, complexity, json.dumps(scenario), time.time()))
+            conn.execute('DELETE FROM scenario_claims WHERE id = ?', (claim_id,))
+            conn.commit()
+        finally:
+            conn.close()
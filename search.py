@@ -0,0 +1,138 @@
+"""Full-text search over stored assessments (SQLite FTS5).
+
+assessment_search holds one row per assessment (rowid = assessments.id)
+with the role, scenario and the evaluation's strengths, weaknesses and
+recommendations. The evaluation is stored compressed, so SQL triggers
+cannot read it: insert_assessment indexes each row in the transaction
+that inserts it, and a trigger removes the entry when an assessment is
+deleted. The owner and complexity are stored UNINDEXED next to the text,
+so the per-user filter needs no join and never shows up in rankings or
+snippets.
+"""
+import html
+import re
+
+from evaluation_store import load_evaluation
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_QUERY_TERMS = 16
+
+# Columns a query may be restricted to
+SEARCH_FIELDS = ('job_role', 'scenario_title', 'scenario_description', 'strengths', 'weaknesses', 'recommendations')
+# Their column numbers in assessment_search, after owner and complexity
+SNIPPET_COLUMNS = {name: index for index, name in enumerate(SEARCH_FIELDS, 2)}
+
+# bm25 weights in column order: owner, complexity (both unindexed), then SEARCH_FIELDS
+RANK_WEIGHTS = 'bm25(0, 0, 2.0, 3.0, 1.0, 1.5, 1.5, 1.0)'
+
+_MARK_START, _MARK_END = '\x02', '\x03'
+_TERMS = re.compile(r'"([^"]*)"|(\S+)')
+
+
+class SearchError(ValueError):
+    """Raised for a query that cannot be searched"""
+
+
+def _text(value):
+    if isinstance(value, list):
+        return '\n'.join(str(item) for item in value)
+    return str(value or '')
+
+
+def index_assessment(conn, assessment_id, user_id, job_role, complexity, evaluation_data, scenario=None):
+    """Add an assessment to the search index (the caller commits)"""
+    scenario = scenario or {}
+    conn.execute('''
+        INSERT OR REPLACE INTO assessment_search (rowid, owner, complexity, job_role, scenario_title,
+                                                  scenario_description, strengths, weaknesses, recommendations)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (assessment_id, int(user_id), complexity, job_role, _text(scenario.get('scenario_title')),
+          _text(scenario.get('scenario_description')), _text(evaluation_data.get('strengths')),
+          _text(evaluation_data.get('weaknesses')), _text(evaluation_data.get('recommendations'))))
+
+
+def backfill_index(conn, after_id, through_id, batch_size=500):
+    """Backfill step: index one batch of existing assessments (their scenarios were never stored)
+
+    Returns the last id of the batch, or None when done.
+    """
+    rows = conn.execute('''
+        SELECT id, user_id, job_role, complexity, evaluation_data FROM assessments
+        WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+    ''', (after_id, through_id, batch_size)).fetchall()
+    if not rows:
+        return None
+    for row in rows:
+        try:
+            evaluation_data = load_evaluation(conn, row['id'], row['evaluation_data'])
+        except (ValueError, LookupError):
+            evaluation_data = {}
+        index_assessment(conn, row['id'], row['user_id'], row['job_role'], row['complexity'],
+                         evaluation_data if isinstance(evaluation_data, dict) else {})
+    return rows[-1]['id']
+
+
+def _phrase(text):
+    # Inside an FTS5 string a double quote is escaped by doubling it
+    return '"' + text.replace('"', '""') + '"'
+
+
+def build_query(text, field=None):
+    """FTS5 MATCH expression for free text: every word or "quoted phrase" must match
+
+    A trailing * on a word makes it a prefix search. Operators typed by the
+    user are searched for as words, so no input can produce a syntax error.
+    """
+    if field is not None and field not in SEARCH_FIELDS:
+        raise SearchError(f'Unknown search field: {field}')
+    terms = []
+    for phrase, word in _TERMS.findall(text or ''):
+        if phrase.strip():
+            terms.append(_phrase(phrase.strip()))
+        elif word:
+            prefix = word.endswith('*') and len(word.rstrip('*')) > 0
+            word = word.rstrip('*').replace('"', '')
+            if word:
+                terms.append(_phrase(word) + ('*' if prefix else ''))
+    if not terms:
+        raise SearchError('Search query is empty')
+    if len(terms) > MAX_QUERY_TERMS:
+        raise SearchError(f'Search query has more than {MAX_QUERY_TERMS} terms')
+    query = ' AND '.join(terms)
+    return f'{field} : ({query})' if field else f'({query})'
+
+
+def _highlight(snippet):
+    """Escape a snippet for HTML and turn the match markers into <mark> tags"""
+    return html.escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def search_assessments(conn, user_id, text, job_role=None, complexity=None, field=None, offset=0,
+                       limit=PAGE_SIZE):
+    """Ranked matches among the user's assessments; returns (results, next_offset)"""
+    query = build_query(text, field)
+    if job_role and job_role.strip():
+        query += f' AND job_role : {_phrase(job_role.strip())}'
+    # The snippet comes from the searched field, or the best matching text column
+    column = SNIPPET_COLUMNS[field] if field else -1
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    offset = max(0, int(offset))
+
+    rows = conn.execute('''
+        SELECT a.id, a.job_role, a.complexity, a.overall_score, a.performance_level, a.created_at,
+               snippet(assessment_search, ?, ?, ?, '…', 16) AS snippet, rank
+        FROM assessment_search JOIN assessments a ON a.id = assessment_search.rowid
+        WHERE assessment_search MATCH ? AND assessment_search.owner = ?
+              AND (? IS NULL OR assessment_search.complexity = ?)
+        ORDER BY rank, a.id DESC LIMIT ? OFFSET ?
+    ''', (column, _MARK_START, _MARK_END, query, int(user_id), complexity or None, complexity or None,
+          limit + 1, offset)).fetchall()
+
+    results = []
+    for row in rows[:limit]:
+        item = dict(row)
+        item['snippet'] = _highlight(item['snippet'] or '')
+        item['rank'] = round(item['rank'], 4)
+        results.append(item)
+    return results, (offset + limit if len(rows) > limit else None)
@@ -0,0 +1,235 @@
+import copy
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+from werkzeug.http import dump_cookie
+
+import metrics
+from database import get_db_connection
+
+# Tunables (override through the environment)
+SESSION_IDLE_TIMEOUT = float(os.environ.get("SESSION_IDLE_TIMEOUT", str(7 * 24 * 3600)))
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "1024"))
+SESSION_SWEEP_INTERVAL = float(os.environ.get("SESSION_SWEEP_INTERVAL", "300"))
+
+_serializer = TaggedJSONSerializer()
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session whose data lives in the sessions table; the cookie holds only its id"""
+
+    def __init__(self, initial=None, sid=None, version=0, expires_at=0.0, new=False):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.version = version
+        self.expires_at = expires_at
+        self.new = new
+        self.modified = False
+        self.accessed = False
+
+
+class SQLiteSessionInterface(SessionInterface):
+    """Server-side sessions stored in SQLite behind an in-process LRU cache
+
+    The cache holds decoded session data tagged with its row version, so a
+    hit only needs a primary-key lookup of (version, expires_at) to confirm
+    that no other worker has changed the session since. Versions are
+    bumped by the database, never computed in-process, so two workers
+    saving the same session cannot both write the same version.
+    """
+
+    salt = "server-side-session"
+
+    def __init__(self, cache_size=SESSION_CACHE_SIZE, idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.cache_size = cache_size
+        self.idle_timeout = idle_timeout
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def sign_sid(self, app, sid):
+        return self._signer(app).sign(sid).decode()
+
+    def unsign_sid(self, secret_key, value):
+        """Return the session id from a cookie value, or None if it was tampered with"""
+        try:
+            return Signer(secret_key, salt=self.salt).unsign(value).decode()
+        except BadSignature:
+            return None
+
+    def open_session(self, app, request):
+        # Static files never need the session
+        if request.path.startswith(app.static_url_path + "/"):
+            return self.null_session_class()
+
+        return self.open_cookie(app, request.cookies.get(self.get_cookie_name(app)))
+
+    def open_cookie(self, app, cookie):
+        """Session for a raw cookie value (a fresh one if it is missing, forged or expired)"""
+        sid = self.unsign_sid(app.secret_key, cookie) if cookie else None
+        if sid:
+            loaded = self.load(sid)
+            if loaded is not None:
+                data, version, expires_at = loaded
+                return ServerSideSession(data, sid=sid, version=version, expires_at=expires_at)
+        return ServerSideSession(sid=secrets.token_urlsafe(24), new=True)
+
+    def load(self, sid):
+        """Return (data, version, expires_at) for a live session id, or None"""
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(sid)
+            if cached is not None:
+                self._cache.move_to_end(sid)
+
+        conn = get_db_connection()
+        try:
+            if cached is not None:
+                row = conn.execute('SELECT version, expires_at FROM sessions WHERE id = ?', (sid,)).fetchone()
+                if row and row['version'] == cached[1] and row['expires_at'] > now:
+                    return copy.deepcopy(cached[0]), cached[1], row['expires_at']
+            row = conn.execute('SELECT data, version, expires_at FROM sessions WHERE id = ?', (sid,)).fetchone()
+        finally:
+            conn.close()
+
+        if not row or row['expires_at'] <= now:
+            self._forget(sid)
+            return None
+        data = _serializer.loads(row['data'])
+        self._remember(sid, data, row['version'])
+        return copy.deepcopy(data), row['version'], row['expires_at']
+
+    def persist(self, session):
+        """Write a session to the store immediately (e.g. from a streaming response)"""
+        if not isinstance(session, ServerSideSession):
+            return
+        conn = get_db_connection()
+        try:
+            if session:
+                payload = _serializer.dumps(dict(session))
+                metrics.SESSION_SIZE_BYTES.observe(len(payload))
+                session.expires_at = time.time() + self.idle_timeout
+                session.version = conn.execute('''
+                    INSERT INTO sessions (id, data, version, expires_at) VALUES (?, ?, 1, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        data = excluded.data, version = sessions.version + 1, expires_at = excluded.expires_at
+                    RETURNING version
+                ''', (session.sid, payload, session.expires_at)).fetchone()[0]
+                self._remember(session.sid, _serializer.loads(payload), session.version)
+            else:
+                conn.execute('DELETE FROM sessions WHERE id = ?', (session.sid,))
+                self._forget(session.sid)
+            self._maybe_sweep(conn)
+            conn.commit()
+        finally:
+            conn.close()
+        session.modified = False
+
+    def regenerate(self, session):
+        """Move a session to a fresh id and delete the old row
+
+        Call it whenever the session's privilege changes (login, logout), so
+        an id planted or observed before then is worthless afterwards.
+        """
+        if not isinstance(session, ServerSideSession):
+            return
+        if not session.new:
+            conn = get_db_connection()
+            try:
+                conn.execute('DELETE FROM sessions WHERE id = ?', (session.sid,))
+                conn.commit()
+            finally:
+                conn.close()
+            self._forget(session.sid)
+        session.sid = secrets.token_urlsafe(24)
+        session.version = 0
+        session.new = True
+        session.modified = True
+
+    def touch(self, session):
+        """Push back the idle expiry of an unchanged session"""
+        session.expires_at = time.time() + self.idle_timeout
+        conn = get_db_connection()
+        try:
+            conn.execute('UPDATE sessions SET expires_at = ? WHERE id = ?', (session.expires_at, session.sid))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def save_session(self, app, session, response):
+        if not isinstance(session, ServerSideSession):
+            return
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if session.modified:
+                if not session.new:
+                    self.persist(session)
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        if session.modified:
+            self.persist(session)
+        elif session.expires_at - time.time() < self.idle_timeout / 2:
+            self.touch(session)
+        if session.new or self.should_set_cookie(app, session):
+            response.set_cookie(name, self.sign_sid(app, session.sid),
+                                expires=self.get_expiration_time(app, session),
+                                httponly=self.get_cookie_httponly(app),
+                                domain=domain, path=path,
+                                secure=self.get_cookie_secure(app),
+                                samesite=self.get_cookie_samesite(app))
+
+    def cookie_header(self, app, session):
+        """Set-Cookie value for a session, for responses built outside Flask"""
+        return dump_cookie(self.get_cookie_name(app), self.sign_sid(app, session.sid),
+                           expires=self.get_expiration_time(app, session),
+                           httponly=self.get_cookie_httponly(app),
+                           domain=self.get_cookie_domain(app), path=self.get_cookie_path(app),
+                           secure=self.get_cookie_secure(app),
+                           samesite=self.get_cookie_samesite(app))
+
+    def should_set_cookie(self, app, session):
+        # New and regenerated ids are always sent; otherwise only permanent sessions need their expiry refreshed
+        return session.permanent and app.config["SESSION_REFRESH_EACH_REQUEST"]
+
+    def _remember(self, sid, data, version):
+        with self._lock:
+            self._cache[sid] = (data, version)
+            self._cache.move_to_end(sid)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _forget(self, sid):
+        with self._lock:
+            self._cache.pop(sid, None)
+
+    def _maybe_sweep(self, conn):
+        """Delete expired sessions at most once per SESSION_SWEEP_INTERVAL"""
+        now = time.time()
+        if now - self._last_sweep < SESSION_SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (now,))
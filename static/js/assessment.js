@@ -0,0 +1,138 @@
+let scenarioData = null;
+let assessmentId = null;
+
+// Load scenario data
+async function loadScenario() {
+    try {
+        const response = await fetch('/api/get-scenario');
+        const data = await response.json();
+
+        if (data.success && data.scenario) {
+            scenarioData = data.scenario;
+            assessmentId = data.assessment_id;
+            displayScenario(data.scenario, data.job_role);
+        } else {
+            // If no scenario found, redirect back with error message
+            alert('No scenario found. Please start from the beginning.');
+            window.location.href = '/';
+        }
+    } catch (error) {
+        console.error('Error loading scenario:', error);
+        document.getElementById('loadingState').innerHTML = 
+            '<p class="error-text">Error loading scenario. <a href="/">Return home</a></p>';
+    }
+}
+
+function displayScenario(scenario, jobRole) {
+    document.getElementById('loadingState').style.display = 'none';
+    document.getElementById('scenarioContent').style.display = 'block';
+
+    document.getElementById('jobRoleBadge').textContent = jobRole || 'Professional Role';
+    document.getElementById('scenarioTitle').textContent = scenario.scenario_title;
+    document.getElementById('complexityLevel').textContent = scenario.complexity_level;
+    document.getElementById('scenarioDescription').textContent = scenario.scenario_description;
+
+    const challengesList = document.getElementById('challengesList');
+    challengesList.innerHTML = '';
+    scenario.key_challenges.forEach(challenge => {
+        const li = document.createElement('li');
+        li.textContent = challenge;
+        challengesList.appendChild(li);
+    });
+}
+
+// Character counter
+document.addEventListener('DOMContentLoaded', function() {
+    const textarea = document.getElementById('userResponse');
+    const charCount = document.getElementById('charCount');
+
+    if (textarea) {
+        textarea.addEventListener('input', function() {
+            charCount.textContent = this.value.length;
+        });
+    }
+
+    loadScenario();
+});
+
+// The assessment id makes resubmitting safe: the server evaluates each attempt once
+async function postWithRetry(url, body, attempts = 3) {
+    for (let attempt = 1; ; attempt++) {
+        try {
+            const response = await fetch(url, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(body)
+            });
+            if (![502, 503, 504].includes(response.status) || attempt >= attempts) {
+                return response;
+            }
+        } catch (error) {
+            if (attempt >= attempts) {
+                throw error;
+            }
+        }
+        await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+    }
+}
+
+async function waitForJob(statusUrl) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 1500));
+        const response = await fetch(statusUrl);
+        const data = await response.json();
+        if (!response.ok || data.status === 'done' || data.status === 'failed') {
+            return data;
+        }
+    }
+}
+
+async function submitResponse() {
+    const response = document.getElementById('userResponse').value.trim();
+
+    if (response.length < 50) {
+        alert('Please provide a more detailed response (at least 50 characters).');
+        return;
+    }
+
+    const btn = document.getElementById('submitBtn');
+    const originalContent = btn.innerHTML;
+    btn.disabled = true;
+    btn.innerHTML = '<span>Evaluating Your Response...</span>';
+
+    // Show progress
+    const steps = document.querySelectorAll('.progress-step');
+    steps[1].classList.add('active');
+
+    try {
+        // Stream the evaluation on the results page when the browser supports it,
+        // otherwise queue it as a background job and poll for the result
+        const endpoint = window.EventSource ? '/api/submit-response' : '/api/jobs';
+        const apiResponse = await postWithRetry(endpoint, { response: response, assessment_id: assessmentId });
+
+        let data = await apiResponse.json();
+        if (data.success && data.status_url) {
+            data = await waitForJob(data.status_url);
+        }
+
+        if (data.success) {
+            steps[2].classList.add('active');
+            setTimeout(() => {
+                window.location.href = data.stream_url ? '/results?stream=1' : '/results';
+            }, 500);
+        } else {
+            alert('Error: ' + (data.error || 'Failed to evaluate response'));
+            btn.disabled = false;
+            btn.innerHTML = originalContent;
+            steps[1].classList.remove('active');
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('An error occurred. Please try again.');
+        btn.disabled = false;
+        btn.innerHTML = originalContent;
+        steps[1].classList.remove('active');
+    }
+}
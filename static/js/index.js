@@ -0,0 +1,62 @@
+function scrollToAssessment() {
+    document.getElementById('assessment').scrollIntoView({ behavior: 'smooth' });
+}
+
+function scrollToFeatures() {
+    document.getElementById('features').scrollIntoView({ behavior: 'smooth' });
+}
+
+function selectRole(role) {
+    document.getElementById('jobRole').value = role;
+}
+
+async function startAssessment() {
+    const jobRole = document.getElementById('jobRole').value.trim();
+
+    if (!jobRole) {
+        alert('Please enter a job role to continue.');
+        return;
+    }
+
+    const btn = document.getElementById('startBtn');
+    const originalContent = btn.innerHTML;
+    btn.disabled = true;
+    btn.innerHTML = '<span>Generating Scenario...</span>';
+
+    try {
+        const complexity = document.getElementById('complexity').value;
+
+        const response = await fetch('/api/generate-scenario', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                job_role: jobRole,
+                complexity: complexity
+            })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            window.location.href = '/assessment';
+        } else {
+            alert('Error: ' + (data.error || 'Failed to generate scenario'));
+            btn.disabled = false;
+            btn.innerHTML = originalContent;
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('An error occurred. Please try again.');
+        btn.disabled = false;
+        btn.innerHTML = originalContent;
+    }
+}
+
+// Enter key support
+document.getElementById('jobRole').addEventListener('keypress', function (e) {
+    if (e.key === 'Enter') {
+        startAssessment();
+    }
+});
@@ -0,0 +1,190 @@
+async function loadResults() {
+    if (new URLSearchParams(window.location.search).get('stream') === '1' && window.EventSource) {
+        streamResults();
+        return;
+    }
+
+    // Past assessments from the dashboard are loaded on demand
+    const assessmentId = new URLSearchParams(window.location.search).get('assessment');
+    const resultsUrl = assessmentId ? '/api/assessments/' + encodeURIComponent(assessmentId) : '/api/get-results';
+
+    try {
+        const response = await fetch(resultsUrl);
+
+        if (!response.ok) {
+            throw new Error('No results found');
+        }
+
+        const data = await response.json();
+
+        if (data.success && data.evaluation) {
+            displayResults(data.evaluation, data.job_role);
+            showComparison(data.comparison);
+        } else {
+            throw new Error('No evaluation data');
+        }
+    } catch (error) {
+        console.error('Error loading results:', error);
+        alert('No results found. Please complete an assessment first.');
+        window.location.href = '/';
+    }
+}
+
+// Render the evaluation progressively as the server streams it
+function streamResults() {
+    const source = new EventSource('/api/evaluate-stream');
+    let jobRole = '';
+
+    source.addEventListener('meta', (event) => {
+        jobRole = JSON.parse(event.data).job_role;
+        showResultsContent(jobRole);
+        clearResults();
+    });
+
+    source.addEventListener('field', (event) => {
+        const data = JSON.parse(event.data);
+        renderField(data.key, data.value);
+    });
+
+    source.addEventListener('item', (event) => {
+        const data = JSON.parse(event.data);
+        if (data.key === 'dimensions') {
+            addDimension(data.name, data.value);
+        } else if (data.key === 'strengths') {
+            addListItem('strengthsList', data.value);
+        } else if (data.key === 'weaknesses') {
+            addListItem('weaknessesList', data.value);
+        } else if (data.key === 'recommendations') {
+            addRecommendation(data.name, data.value);
+        }
+    });
+
+    source.addEventListener('done', (event) => {
+        source.close();
+        displayResults(JSON.parse(event.data).evaluation, jobRole);
+    });
+
+    source.addEventListener('error', (event) => {
+        source.close();
+        const message = event.data ? JSON.parse(event.data).error : 'Connection lost while evaluating.';
+        alert('Error: ' + message);
+        window.location.href = '/assessment';
+    });
+}
+
+function showResultsContent(jobRole) {
+    document.getElementById('loadingState').style.display = 'none';
+    document.getElementById('resultsContent').style.display = 'block';
+    document.getElementById('jobRoleTitle').textContent = 'Assessment for: ' + jobRole;
+}
+
+function showComparison(comparison) {
+    if (!comparison || comparison.count < 2) {
+        return;
+    }
+    document.getElementById('jobRoleTitle').textContent +=
+        ` · scored higher than ${Math.round(comparison.percentile)}% of ${comparison.count} ${comparison.complexity} assessments for this role`;
+}
+
+function clearResults() {
+    document.querySelector('.dimensions-grid').innerHTML = '';
+    document.getElementById('strengthsList').innerHTML = '';
+    document.getElementById('weaknessesList').innerHTML = '';
+    document.getElementById('recommendationsList').innerHTML = '';
+}
+
+function renderField(key, value) {
+    if (key === 'performance_level' || key === 'performace_level') {
+        document.getElementById('performanceLevel').textContent = value + ' Level';
+    } else if (key === 'overall_score') {
+        renderOverallScore(value);
+    } else if (key === 'skill_readiness') {
+        document.getElementById('skillReadiness').textContent = value;
+    } else if (key === 'ideal_answer' && value) {
+        document.getElementById('modelAnswerCard').style.display = 'block';
+        document.getElementById('modelAnswerText').textContent = value;
+    }
+}
+
+function renderOverallScore(overallScore) {
+    document.getElementById('scoreText').textContent = overallScore;
+
+    // Animate score circle
+    const circle = document.getElementById('scoreCircle');
+    const circumference = 2 * Math.PI * 90;
+    const offset = circumference - (overallScore / 100) * circumference;
+
+    setTimeout(() => {
+        circle.style.strokeDashoffset = offset;
+    }, 500);
+}
+
+function addDimension(key, val) {
+    const formattedKey = key.split('_').map(word => word.charAt(0).toUpperCase() + word.slice(1)).join(' ');
+
+    const card = document.createElement('div');
+    card.className = 'dimension-card';
+    card.innerHTML = `
+        <div class="dimension-header">
+            <div class="dimension-icon">📊</div>
+            <h3 class="dimension-title">${formattedKey}</h3>
+        </div>
+        <div class="dimension-score">${val.score}</div>
+        <div class="dimension-bar">
+            <div class="dimension-progress" style="width: 0%"></div>
+        </div>
+        <p class="dimension-feedback">${val.feedback}</p>
+    `;
+    document.querySelector('.dimensions-grid').appendChild(card);
+
+    // Animate
+    setTimeout(() => {
+        card.querySelector('.dimension-progress').style.width = val.score + '%';
+    }, 300);
+}
+
+function addListItem(listId, text) {
+    const li = document.createElement('li');
+    li.textContent = text;
+    document.getElementById(listId).appendChild(li);
+}
+
+function addRecommendation(index, rec) {
+    const div = document.createElement('div');
+    div.className = 'recommendation-item';
+    div.innerHTML = `<strong>${index + 1}.</strong> ${rec}`;
+    document.getElementById('recommendationsList').appendChild(div);
+}
+
+function displayResults(evaluation, jobRole) {
+    showResultsContent(jobRole);
+    clearResults();
+
+    // Header
+    document.getElementById('performanceLevel').textContent = evaluation.performance_level + ' Level';
+
+    // Overall Score
+    renderOverallScore(evaluation.overall_score);
+    document.getElementById('skillReadiness').textContent = evaluation.skill_readiness;
+
+    // Dimensions
+    Object.entries(evaluation.dimensions).forEach(([key, val]) => addDimension(key, val));
+
+    // Strengths & Weaknesses
+    evaluation.strengths.forEach(strength => addListItem('strengthsList', strength));
+    evaluation.weaknesses.forEach(weakness => addListItem('weaknessesList', weakness));
+
+    // Recommendations
+    evaluation.recommendations.forEach((rec, index) => addRecommendation(index, rec));
+
+    // Model Answer
+    if (evaluation.ideal_answer) {
+        document.getElementById('modelAnswerCard').style.display = 'block';
+        document.getElementById('modelAnswerText').textContent = evaluation.ideal_answer;
+    } else {
+        document.getElementById('modelAnswerCard').style.display = 'none';
+    }
+}
+
+// Load results on page load
+document.addEventListener('DOMContentLoaded', loadResults);
@@ -0,0 +1,291 @@
+"""Materialized score statistics per (job role, complexity).
+
+Every stored assessment updates its role's row in role_stats and the
+user's day in user_daily_scores inside the inserting transaction, so
+percentile ranks, leaderboards and dashboard trends are single-row (or
+small, bounded) lookups instead of scans over assessments. Means and
+variances are kept with Welford's running update; the score histogram has
+one bucket per integer score, which makes percentile ranks exact for the
+integer scores the evaluator produces.
+
+    python stats.py rebuild    # recompute everything from assessments
+"""
+import json
+import math
+import os
+import sys
+import time
+
+# Tunables (override through the environment)
+LEADERBOARD_SIZE = int(os.environ.get("STATS_LEADERBOARD_SIZE", "10"))
+TREND_POINTS = int(os.environ.get("STATS_TREND_POINTS", "30"))
+REBUILD_BATCH = 1000
+
+HISTOGRAM_BUCKETS = 101  # scores 0..100
+
+
+def normalize_role(job_role):
+    """Grouping key for a free-text job role (also the scenario pool key): case and spacing are ignored"""
+    return " ".join(str(job_role or "").lower().split())
+
+
+def _score(value):
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return None
+    return score if math.isfinite(score) else None
+
+
+def _bucket(score):
+    return min(HISTOGRAM_BUCKETS - 1, max(0, int(round(score))))
+
+
+def _welford(state, value):
+    """Add one value to a [count, mean, m2] accumulator in place"""
+    state[0] += 1
+    delta = value - state[1]
+    state[1] += delta / state[0]
+    state[2] += delta * (value - state[1])
+
+
+def _stddev(count, m2):
+    return math.sqrt(m2 / count) if count else 0.0
+
+
+def _new_state(job_role):
+    return {
+        "job_role": " ".join(str(job_role).split()), "moments": [0, 0.0, 0.0], "min": None, "max": None,
+        "histogram": [0] * HISTOGRAM_BUCKETS, "dimensions": {}, "leaderboard": []
+    }
+
+
+def _apply(state, user_id, assessment_id, score, dimension_scores):
+    _welford(state["moments"], score)
+    state["min"] = score if state["min"] is None else min(state["min"], score)
+    state["max"] = score if state["max"] is None else max(state["max"], score)
+    state["histogram"][_bucket(score)] += 1
+    for name, value in (dimension_scores or {}).items():
+        value = _score(value)
+        if value is not None:
+            _welford(state["dimensions"].setdefault(name, [0, 0.0, 0.0]), value)
+
+    # Best score per user; ties keep the earlier assessment
+    board = state["leaderboard"]
+    mine = next((entry for entry in board if entry[1] == user_id), None)
+    if mine is None:
+        board.append([score, user_id, assessment_id])
+    elif score > mine[0]:
+        mine[0], mine[2] = score, assessment_id
+    board.sort(key=lambda entry: (-entry[0], entry[2]))
+    del board[LEADERBOARD_SIZE:]
+
+
+def _load(conn, role_key, complexity):
+    row = conn.execute('''
+        SELECT * FROM role_stats WHERE role_key = ? AND complexity = ?
+    ''', (role_key, complexity)).fetchone()
+    if not row:
+        return None
+    return {
+        "job_role": row["job_role"], "moments": [row["count"], row["mean"], row["m2"]],
+        "min": row["min_score"], "max": row["max_score"], "histogram": json.loads(row["histogram"]),
+        "dimensions": json.loads(row["dimensions"]), "leaderboard": json.loads(row["leaderboard"])
+    }
+
+
+def _save(conn, role_key, complexity, state):
+    count, mean, m2 = state["moments"]
+    conn.execute('''
+        INSERT OR REPLACE INTO role_stats (role_key, complexity, job_role, count, mean, m2, min_score, max_score,
+                                           histogram, dimensions, leaderboard, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (role_key, complexity, state["job_role"], count, mean, m2, state["min"], state["max"],
+          json.dumps(state["histogram"], separators=(',', ':')),
+          json.dumps(state["dimensions"], separators=(',', ':')),
+          json.dumps(state["leaderboard"], separators=(',', ':')), time.time()))
+
+
+def _add_daily(conn, user_id, day, count, score_sum):
+    conn.execute('''
+        INSERT INTO user_daily_scores (user_id, day, count, score_sum) VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_id, day) DO UPDATE SET count = count + excluded.count,
+                                                 score_sum = score_sum + excluded.score_sum
+    ''', (user_id, day, count, score_sum))
+
+
+def record_assessment(conn, user_id, assessment_id, job_role, complexity, overall_score, dimension_scores,
+                      day=None):
+    """Fold one new assessment into the statistics (the caller commits)
+
+    Call it after the assessment INSERT: that statement already holds the
+    write lock, so the read-modify-write of the stats row cannot race.
+    """
+    score = _score(overall_score)
+    if score is None:
+        return
+    role_key = normalize_role(job_role)
+    state = _load(conn, role_key, complexity) or _new_state(job_role)
+    _apply(state, user_id, assessment_id, score, dimension_scores)
+    _save(conn, role_key, complexity, state)
+    _add_daily(conn, user_id, day or time.strftime('%Y-%m-%d', time.gmtime()), 1, score)
+
+
+def rebuild(conn):
+    """Recompute all statistics from the assessments table (the caller commits)
+
+    Reads only the summary columns, never evaluation_data. Returns the
+    number of assessments replayed.
+    """
+    conn.execute('DELETE FROM role_stats')
+    conn.execute('DELETE FROM user_daily_scores')
+    states = {}
+    daily = {}
+    replayed = 0
+    last_id = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, user_id, job_role, complexity, overall_score, dimension_scores, created_at
+            FROM assessments WHERE id > ? ORDER BY id LIMIT ?
+        ''', (last_id, REBUILD_BATCH)).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            score = _score(row['overall_score'])
+            if score is None:
+                continue
+            key = (normalize_role(row['job_role']), row['complexity'])
+            state = states.get(key)
+            if state is None:
+                state = states[key] = _new_state(row['job_role'])
+            _apply(state, row['user_id'], row['id'], score, json.loads(row['dimension_scores'] or '{}'))
+            totals = daily.setdefault((row['user_id'], str(row['created_at'])[:10]), [0, 0.0])
+            totals[0] += 1
+            totals[1] += score
+            replayed += 1
+        last_id = rows[-1]['id']
+
+    for (role_key, complexity), state in states.items():
+        _save(conn, role_key, complexity, state)
+    for (user_id, day), (count, score_sum) in daily.items():
+        _add_daily(conn, user_id, day, count, score_sum)
+    return replayed
+
+
+def backfill(conn, after_id, through_id, batch_size=REBUILD_BATCH):
+    """Backfill step: fold one batch of assessments stored before the tables existed into the statistics
+
+    Assessments inserted since are recorded as they are written, so only
+    ids up to through_id are replayed. Returns the last id of the batch,
+    or None when done.
+    """
+    rows = conn.execute('''
+        SELECT id, user_id, job_role, complexity, overall_score, dimension_scores, created_at
+        FROM assessments WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+    ''', (after_id, through_id, batch_size)).fetchall()
+    if not rows:
+        return None
+    states = {}
+    daily = {}
+    for row in rows:
+        score = _score(row['overall_score'])
+        if score is None:
+            continue
+        key = (normalize_role(row['job_role']), row['complexity'])
+        state = states.get(key)
+        if state is None:
+            state = states[key] = _load(conn, *key) or _new_state(row['job_role'])
+        _apply(state, row['user_id'], row['id'], score, json.loads(row['dimension_scores'] or '{}'))
+        totals = daily.setdefault((row['user_id'], str(row['created_at'])[:10]), [0, 0.0])
+        totals[0] += 1
+        totals[1] += score
+    for (role_key, complexity), state in states.items():
+        _save(conn, role_key, complexity, state)
+    for (user_id, day), (count, score_sum) in daily.items():
+        _add_daily(conn, user_id, day, count, score_sum)
+    return rows[-1]['id']
+
+
+def percentile_rank(conn, job_role, complexity, score):
+    """Share of the role's assessments scoring below `score` (ties count half)
+
+    Returns (percentile 0-100, number of assessments), or None if the role
+    has no statistics yet.
+    """
+    score = _score(score)
+    if score is None:
+        return None
+    row = conn.execute('''
+        SELECT count, histogram FROM role_stats WHERE role_key = ? AND complexity = ?
+    ''', (normalize_role(job_role), complexity)).fetchone()
+    if not row or not row['count']:
+        return None
+    histogram = json.loads(row['histogram'])
+    bucket = _bucket(score)
+    below = sum(histogram[:bucket])
+    return round(100.0 * (below + 0.5 * histogram[bucket]) / row['count'], 1), row['count']
+
+
+def role_summary(conn, job_role, complexity, viewer_id=None):
+    """Aggregates, histogram and leaderboard for a role, or None
+
+    The leaderboard is anonymous: entries carry only rank and score, and
+    the viewer's own entry (if any) is flagged with its assessment id.
+    """
+    state = _load(conn, normalize_role(job_role), complexity)
+    if state is None:
+        return None
+    count, mean, m2 = state["moments"]
+    leaderboard = []
+    for rank, (score, user_id, assessment_id) in enumerate(state["leaderboard"], 1):
+        entry = {'rank': rank, 'score': score, 'you': user_id == viewer_id}
+        if entry['you']:
+            entry['assessment_id'] = assessment_id
+        leaderboard.append(entry)
+    return {
+        'job_role': state["job_role"],
+        'complexity': complexity,
+        'count': count,
+        'mean': round(mean, 2),
+        'stddev': round(_stddev(count, m2), 2),
+        'min': state["min"],
+        'max': state["max"],
+        'dimensions': {
+            name: {'count': n, 'mean': round(dim_mean, 2), 'stddev': round(_stddev(n, dim_m2), 2)}
+            for name, (n, dim_mean, dim_m2) in state["dimensions"].items()
+        },
+        'histogram': state["histogram"],
+        'leaderboard': leaderboard
+    }
+
+
+def user_trend(conn, user_id, limit=TREND_POINTS):
+    """Average score per active day, oldest first, over the user's last `limit` active days"""
+    rows = conn.execute('''
+        SELECT day, count, score_sum FROM user_daily_scores
+        WHERE user_id = ? ORDER BY day DESC LIMIT ?
+    ''', (user_id, limit)).fetchall()
+    return [
+        {'day': row['day'], 'count': row['count'], 'average': round(row['score_sum'] / row['count'], 1)}
+        for row in reversed(rows)
+    ]
+
+
+def main():
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python stats.py rebuild")
+    from database import init_db, get_db_connection
+
+    init_db()
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        replayed = rebuild(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"Rebuilt statistics from {replayed} assessment(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import json
+
+WHITESPACE = " \t\r\n"
+
+
+class IncrementalJSONParser:
+    """Incremental parser that reports values of a streamed JSON object as they close
+
+    feed() returns a list of (path, value) events. path is (key,) for a
+    completed top-level field and (key, name_or_index) for a completed member
+    of a top-level object or array, e.g. ("dimensions", "accuracy") or
+    ("strengths", 0). Text before the root object (such as a markdown fence)
+    is skipped, and values that do not decode on their own are not reported.
+    """
+
+    def __init__(self):
+        self.buffer = []
+        self.pos = 0
+        self.stack = []
+        self.started = False
+        self.finished = False
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.scalar_start = None
+
+    def feed(self, text):
+        """Consume a chunk of text and return the events it completed"""
+        events = []
+        if self.finished:
+            return events
+        self.buffer.append(text)
+        for ch in text:
+            self._step(ch, events)
+            self.pos += 1
+            if self.finished:
+                break
+        return events
+
+    def _text(self, start, end):
+        text = ''.join(self.buffer)
+        self.buffer = [text]
+        return text[start:end]
+
+    def _step(self, ch, events):
+        i = self.pos
+        if not self.started:
+            if ch == '{':
+                self.started = True
+                self.stack.append({'type': '{', 'key': None, 'index': 0, 'expect_key': True, 'start': None})
+            return
+
+        if self.in_string:
+            if self.escape:
+                self.escape = False
+            elif ch == '\\':
+                self.escape = True
+            elif ch == '"':
+                self.in_string = False
+                frame = self.stack[-1]
+                if frame['type'] == '{' and frame['expect_key']:
+                    try:
+                        frame['key'] = json.loads(self._text(self.string_start, i + 1))
+                    except ValueError:
+                        frame['key'] = None
+                else:
+                    self._complete(i + 1, events)
+            return
+
+        if self.scalar_start is not None and (ch in WHITESPACE or ch in ',}]'):
+            self._complete(i, events)
+            self.scalar_start = None
+
+        frame = self.stack[-1]
+        if ch in WHITESPACE:
+            return
+        if ch == '"':
+            self.in_string = True
+            self.string_start = i
+            if not (frame['type'] == '{' and frame['expect_key']):
+                frame['start'] = i
+        elif ch in '{[':
+            frame['start'] = i
+            self.stack.append({'type': ch, 'key': None, 'index': 0, 'expect_key': ch == '{', 'start': None})
+        elif ch in '}]':
+            self.stack.pop()
+            if not self.stack:
+                self.finished = True
+                return
+            self._complete(i + 1, events)
+        elif ch == ':':
+            frame['expect_key'] = False
+        elif ch == ',':
+            if frame['type'] == '{':
+                frame['expect_key'] = True
+            else:
+                frame['index'] += 1
+        elif self.scalar_start is None:
+            self.scalar_start = i
+            frame['start'] = i
+
+    def _complete(self, end, events):
+        """A value in the innermost open container ended at `end`"""
+        depth = len(self.stack)
+        if depth > 2:
+            return
+        frame = self.stack[-1]
+        if frame['start'] is None:
+            return
+        try:
+            value = json.loads(self._text(frame['start'], end))
+        except ValueError:
+            return
+        finally:
+            frame['start'] = None
+        name = frame['key'] if frame['type'] == '{' else frame['index']
+        if depth == 1:
+            events.append(((name,), value))
+        else:
+            events.append(((self.stack[0]['key'], name), value))
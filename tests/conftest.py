@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Configure before the app modules are imported: they read the environment at import time
+_tmp = tempfile.mkdtemp(prefix="profiler-tests-")
+os.environ.setdefault("DATABASE_PATH", os.path.join(_tmp, "users.db"))
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ.setdefault("SCENARIO_POOL_ENABLED", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db():
+    """A freshly migrated database on this thread's pooled connection"""
+    import database
+
+    conn = database.get_db_connection()
+    conn.close_for_real()
+    database._local.conn = None
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(database.DB_NAME + suffix):
+            os.remove(database.DB_NAME + suffix)
+    database.init_db()
+    conn = database.get_db_connection()
+    yield conn
+    conn.close()
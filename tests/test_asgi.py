@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import pytest
+
+import ratelimit
+
+SCENARIO = {"scenario_title": "Late report", "scenario_description": "The quarterly report is late.",
+            "key_challenges": ["Prioritise", "Communicate"]}
+EVALUATION = {"overall_score": 72,
+              "dimensions": {name: {"score": 7, "feedback": "ok"}
+                             for name in ("accuracy", "clarity", "basic_understanding")},
+              "strengths": ["Clear"], "weaknesses": ["Short"], "recommendations": ["Expand"],
+              "skill_readiness": "Ready", "performance_level": "Mid"}
+
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.calls = []
+
+    async def chat(self, messages, model=None, temperature=0.7, max_tokens=2000):
+        task = "scenario" if temperature == 0.8 else "evaluation"
+        self.calls.append(task)
+        content = json.dumps(SCENARIO if task == "scenario" else EVALUATION)
+        return {"choices": [{"message": {"content": content}, "finish_reason": "stop"}],
+                "usage": {"completion_tokens": 50, "total_tokens": 500}}
+
+    async def stream_chat(self, messages, model=None, temperature=0.7, max_tokens=2000, on_finish=None):
+        self.calls.append("stream")
+        text = json.dumps(EVALUATION)
+        for start in range(0, len(text), 40):
+            yield text[start:start + 40]
+        if on_finish:
+            on_finish("stop", {"completion_tokens": 50, "total_tokens": 500})
+
+
+@pytest.fixture
+def server(db, monkeypatch):
+    import asgi
+
+    ratelimit.configure(1e6, 1e9)
+    db.execute("INSERT INTO users (username, password_hash) VALUES ('alice', 'x')")
+    db.commit()
+    # A fresh app per test: its database threads must not keep connections to an earlier test's file
+    app = asgi.AsyncApp(asgi.flask_app)
+    fake = FakeAsyncClient()
+    monkeypatch.setattr(app, "client_for", lambda backend: fake)
+    yield app, fake
+    app.db_executor.shutdown(wait=True)
+    ratelimit.configure(ratelimit.GROQ_RPM, ratelimit.GROQ_TPM)
+
+
+def _login(app, **data):
+    from session_store import ServerSideSession
+
+    interface = app.flask_app.session_interface
+    session = ServerSideSession({"user": "alice", **data}, sid="asgi-test", new=True)
+    interface.persist(session)
+    return f"session={interface.sign_sid(app.flask_app, session.sid)}"
+
+
+def _call(app, method, path, cookie, payload=None):
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"",
+             "headers": [(b"cookie", cookie.encode())]}
+    body = json.dumps(payload).encode() if payload is not None else b""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages[0]["status"], b"".join(message.get("body", b"") for message in messages[1:])
+
+
+def test_generate_and_evaluate_round_trip(server):
+    app, fake = server
+    cookie = _login(app)
+    status, body = _call(app, "POST", "/api/generate-scenario", cookie, {"job_role": "Analyst", "complexity": "Low"})
+    assert status == 200 and json.loads(body)["scenario"]["scenario_title"] == "Late report"
+
+    status, body = _call(app, "POST", "/api/evaluate-response", cookie, {"response": "A detailed answer. " * 5})
+    assert status == 200 and json.loads(body)["evaluation"]["overall_score"] == 72
+    assert fake.calls == ["scenario", "evaluation"]
+
+
+def test_evaluate_stream_emits_fields_then_done(server):
+    app, fake = server
+    cookie = _login(app, job_role="Analyst", complexity="Low", scenario=SCENARIO,
+                    user_response="A streamed answer. " * 5)
+    status, body = _call(app, "GET", "/api/evaluate-stream", cookie)
+    events = [block.split("\n")[0] for block in body.decode().split("\n\n") if block]
+    assert status == 200 and fake.calls == ["stream"]
+    assert events[0] == "event: meta" and "event: field" in events and events[-1] == "event: done"
@@ -0,0 +1,52 @@
+import io
+import threading
+import time
+
+import pytest
+
+import batch
+
+
+def _items(count):
+    return [{"id": str(i), "job_role": "Nurse", "complexity": "Low", "scenario": "", "response": "x" * 60}
+            for i in range(count)]
+
+
+def test_run_batch_skips_done_items_and_yields_every_result(monkeypatch):
+    monkeypatch.setattr(batch, "evaluate_item", lambda item: {"id": item["id"], "status": "ok"})
+    results = list(batch.run_batch(_items(10), skip_ids={"3", "4"}, concurrency=3))
+    assert sorted(int(result["id"]) for result in results) == [i for i in range(10) if i not in (3, 4)]
+
+
+def test_run_batch_keeps_a_bounded_window_and_stops_on_close(monkeypatch):
+    started = []
+    lock = threading.Lock()
+
+    def evaluate(item):
+        with lock:
+            started.append(item["id"])
+        time.sleep(0.05)
+        return {"id": item["id"], "status": "ok"}
+
+    monkeypatch.setattr(batch, "evaluate_item", evaluate)
+    results = batch.run_batch(_items(100), concurrency=4)
+    next(results)
+    assert len(started) <= 5
+    began = time.monotonic()
+    results.close()
+    assert time.monotonic() - began < 0.05  # does not wait for the running calls
+    time.sleep(0.2)
+    assert len(started) <= 5  # nothing new was submitted after close
+
+
+def test_read_items_normalizes_aliases():
+    stream = io.StringIO('{"request_id": "r1", "body": "my answer", "title": "Outage"}\n\n')
+    assert list(batch.read_items(stream, "jsonl")) == [
+        {"id": "r1", "job_role": "Professional", "complexity": "Medium", "scenario": "Outage", "response": "my answer"}]
+
+
+@pytest.mark.parametrize("line", ['[1]', '"x"', '42', '{"response": '])
+def test_read_items_rejects_lines_that_are_not_objects(line):
+    stream = io.StringIO('{"response": "fine"}\n' + line + '\n')
+    with pytest.raises(ValueError, match="line 2"):
+        list(batch.read_items(stream, "jsonl"))
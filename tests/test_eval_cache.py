@@ -0,0 +1,19 @@
+import eval_cache
+import metrics
+
+
+def _events(event):
+    return metrics.EVAL_CACHE._values.get((event,), 0)
+
+
+def test_lookups_and_writes_are_exported_as_counters(db):
+    before = {event: _events(event) for event in ("hit", "miss", "store")}
+    key = eval_cache.cache_key("Scenario", "easy", "My  answer", "3", "model")
+    assert key == eval_cache.cache_key("Scenario", "easy", "My answer", "3", "model")
+
+    assert eval_cache.get(key) is None
+    eval_cache.put(key, {"overall_score": 50})
+    assert eval_cache.get(key) == {"overall_score": 50}
+
+    assert {event: _events(event) - before[event] for event in before} == {"hit": 1, "miss": 1, "store": 1}
+    assert 'evaluation_cache_events_total{event="hit"}' in metrics.render()
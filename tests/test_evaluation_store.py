@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from assessments import insert_assessment
+from evaluation_store import (ARCHIVED, FORMAT_DEFLATE_V1, archive_old, compact_rows, decode_evaluation,
+                              encode_evaluation, load_evaluation)
+
+EVALUATION = {
+    'overall_score': 72,
+    'performance_level': 'Mid Level',
+    'dimensions': {'reasoning': {'score': 70, 'feedback': 'The candidate demonstrates a strong understanding.'}},
+    'strengths': ['Clear structure', 'Émigré-friendly unicode'],
+}
+
+
+def test_encode_round_trips_and_beats_plain_json():
+    blob = encode_evaluation(EVALUATION)
+    assert blob[0] == FORMAT_DEFLATE_V1
+    assert decode_evaluation(blob) == EVALUATION
+    assert len(blob) < len(json.dumps(EVALUATION))
+
+
+def test_decode_accepts_legacy_text_and_rejects_unknown_formats():
+    assert decode_evaluation(json.dumps(EVALUATION)) == EVALUATION
+    assert decode_evaluation(memoryview(encode_evaluation(EVALUATION))) == EVALUATION
+    with pytest.raises(ValueError, match="archived"):
+        decode_evaluation(ARCHIVED)
+    with pytest.raises(ValueError, match="format 9"):
+        decode_evaluation(b'\x09abc')
+
+
+def test_compact_rows_converts_text_rows_in_committed_batches(db):
+    db.execute("INSERT INTO users (username, password_hash) VALUES ('alice', 'x')")
+    for value in (json.dumps(EVALUATION), 'not json', json.dumps({'overall_score': 10})):
+        db.execute('''
+            INSERT INTO assessments (user_id, job_role, complexity, overall_score, evaluation_data)
+            VALUES (1, 'Analyst', 'easy', 0, ?)
+        ''', (value,))
+    db.commit()
+
+    assert compact_rows(db, batch_size=1) == 2
+    assert not db.in_transaction
+    kinds = [row[0] for row in db.execute('SELECT typeof(evaluation_data) FROM assessments ORDER BY id')]
+    assert kinds == ['blob', 'text', 'blob']
+    assert decode_evaluation(db.execute('SELECT evaluation_data FROM assessments WHERE id = 1').fetchone()[0]) \
+        == EVALUATION
+
+
+def test_archived_evaluations_load_from_the_archive(db):
+    db.execute("INSERT INTO users (username, password_hash) VALUES ('alice', 'x')")
+    assessment_id = insert_assessment(db, 1, 'Analyst', 'easy', EVALUATION)
+    db.execute("UPDATE assessments SET created_at = '2000-01-01 00:00:00'")
+    db.commit()
+
+    assert archive_old(db) == 1
+    value = db.execute('SELECT evaluation_data FROM assessments WHERE id = ?', (assessment_id,)).fetchone()[0]
+    assert value == ARCHIVED
+    assert load_evaluation(db, assessment_id, value) == EVALUATION
+    with pytest.raises(LookupError):
+        load_evaluation(db, assessment_id + 1, ARCHIVED)
@@ -0,0 +1,48 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+import export
+from assessments import insert_assessment
+
+
+@pytest.fixture
+def history(db):
+    db.execute("INSERT INTO users (username, password_hash) VALUES ('alice', 'x')")
+    ids = [insert_assessment(db, 1, 'Analyst', 'Low',
+                             {'overall_score': score, 'strengths': ['Clear', 'Brief'],
+                              'dimensions': {'accuracy': {'score': score // 10}}})
+           for score in (60, 80)]
+    db.commit()
+    return ids
+
+
+def _export(db, fmt, fields=()):
+    records = export.iter_rows(db, export.high_water_mark(db), fields=fields)
+    return b''.join(export.stream_export(records, fmt, fields))
+
+
+def test_csv_rows_match_the_header_when_a_field_shares_a_column_name(db, history):
+    fields = export.parse_fields('overall_score, dimensions.accuracy.score,strengths')
+    rows = list(csv.reader(io.StringIO(_export(db, 'csv', fields).decode())))
+    assert rows[0] == list(export.COLUMNS) + ['evaluation.overall_score', 'evaluation.dimensions.accuracy.score',
+                                              'evaluation.strengths']
+    assert [len(row) for row in rows] == [len(rows[0])] * 3
+    assert rows[1][-3:] == ['60', '6', 'Clear; Brief']
+
+
+def test_jsonl_and_gzip_carry_the_same_records(db, history):
+    lines = _export(db, 'jsonl').decode().splitlines()
+    assert gzip.decompress(_export(db, 'jsonl.gz')).decode().splitlines() == lines
+    records = [json.loads(line) for line in lines]
+    assert [record['id'] for record in records] == history
+    assert records[0]['username'] == 'alice' and records[0]['dimension_scores'] == {'accuracy': 6}
+    assert 'evaluation_data' not in records[0]
+
+
+def test_after_id_exports_only_newer_rows(db, history):
+    records = list(export.iter_rows(db, export.high_water_mark(db), after_id=history[0]))
+    assert [record['id'] for record in records] == history[1:]
@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+import evaluation
+import idempotency
+from idempotency import SingleFlight
+
+
+def test_single_flight_shares_the_leaders_result():
+    flights = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(1)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do("k", work))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1] and results == ["result"] * 5
+
+
+def test_single_flight_propagates_errors_and_forgets_the_key():
+    flights = SingleFlight()
+    with pytest.raises(ZeroDivisionError):
+        flights.do("k", lambda: 1 / 0)
+    assert flights.do("k", lambda: 2) == 2
+
+
+def test_clean_key_rejects_malformed_keys():
+    assert idempotency.clean_key("abc-123_X") == "abc-123_X"
+    assert idempotency.clean_key("a b") is None
+    assert idempotency.clean_key(None) is None
+    assert idempotency.clean_key("x" * 65) is None
+
+
+def test_attempt_key_changes_with_the_answer():
+    scenario = {"scenario_description": "Outage"}
+    key = idempotency.attempt_key("attempt-1", scenario, "first answer")
+    assert key == idempotency.attempt_key("attempt-1", scenario, "first answer")
+    assert key != idempotency.attempt_key("attempt-1", scenario, "revised answer")
+    assert idempotency.attempt_key(None, scenario, "first answer") is None
+
+
+def test_revised_answer_to_the_same_attempt_is_evaluated_again(db, monkeypatch):
+    db.execute("INSERT INTO users (username, password_hash) VALUES ('alice', 'x')")
+    db.commit()
+    calls = []
+
+    def complete(task, complexity, messages, **kwargs):
+        calls.append(messages[1]["content"])
+        return {"overall_score": 50 + len(calls), "performance_level": "Mid"}, {}
+
+    monkeypatch.setattr(evaluation.routing, "complete", complete)
+    scenario = {"scenario_description": "A nightly job fails."}
+    first = evaluation.run_evaluation("alice", "SRE", "Low", scenario, "I would read the logs first." * 3, "attempt-1")
+    again = evaluation.run_evaluation("alice", "SRE", "Low", scenario, "I would read the logs first." * 3, "attempt-1")
+    revised = evaluation.run_evaluation("alice", "SRE", "Low", scenario, "I would roll back the deploy." * 3,
+                                        "attempt-1")
+    assert first == again and revised != first
+    assert len(calls) == 2
+    assert db.execute("SELECT COUNT(*) FROM assessments").fetchone()[0] == 2
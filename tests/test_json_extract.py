@@ -0,0 +1,78 @@
+import pytest
+
+from json_extract import (EVALUATION_KEYS, ExtractionError, extract_json, parse_evaluation_text,
+                          parse_scenario_text, validate_evaluation)
+
+
+def test_clean_json_is_not_marked_repaired():
+    assert extract_json('{"a": 1, "b": [true, null]}') == ({"a": 1, "b": [True, None]}, False)
+
+
+def test_fences_and_surrounding_prose_are_skipped():
+    text = 'Here is the result:\n```json\n{"a": "x"}\n```\nHope this helps {not json}'
+    assert extract_json(text)[0] == {"a": "x"}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1 "b": 2}', {"a": 1, "b": 2}),                        # missing comma
+    ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}),           # trailing commas
+    ('{"a": "line one\nline two"}', {"a": "line one\nline two"}),  # raw newline in a string
+    ('{"a": True, "b": None}', {"a": True, "b": None}),           # Python literals
+    ('{"a": [1, 2}', {"a": [1, 2]}),                              # list closed by its parent's brace
+    ('{"a": {"b": 1]}', {"a": {"b": 1}}),                         # wrong closer
+    ('{"a": {"b": "trunc', {"a": {"b": "trunc"}}),                # cut off mid-document
+    ('{"a": ["C:\\Windows\\System32"]}', {"a": ["C:\\Windows\\System32"]}),  # stray backslashes
+    ('{"C:\\dir": 1, "b": "\\u00e9\\q"}', {"C:\\dir": 1, "b": "\u00e9\\q"}),  # in a key, next to a valid escape
+])
+def test_common_model_mistakes_are_repaired(text, expected):
+    data, repaired = extract_json(text)
+    assert data == expected and repaired
+
+
+def test_top_level_key_closes_an_unterminated_nested_object():
+    text = '{"dimensions": {"accuracy": {"score": 7, "feedback": "ok"}, "overall_score": 70}'
+    data, _ = extract_json(text, EVALUATION_KEYS)
+    assert data["overall_score"] == 70 and "overall_score" not in data["dimensions"]
+
+
+def test_text_without_an_object_raises():
+    with pytest.raises(ExtractionError):
+        extract_json("no json here")
+
+
+def _evaluation(**overrides):
+    data = {
+        "overall_score": "85/100",
+        "dimensions": {"Accuracy": {"score": 9.6, "feedback": "good"}, "clarity": {"score": 80},
+                       "basic understanding": {"score": 70}},
+        "strengths": "Clear", "weaknesses": ["Short"], "recommendations": ["Expand"],
+        "skill_readiness": "Ready", "performace_level": "Mid Level",
+    }
+    data.update(overrides)
+    return data
+
+
+def test_validate_evaluation_normalizes_scores_names_and_aliases():
+    evaluation = validate_evaluation(_evaluation(), "Low")
+    assert evaluation["overall_score"] == 85
+    assert evaluation["dimensions"]["accuracy"] == {"score": 10, "feedback": "good"}
+    assert set(evaluation["dimensions"]) == {"accuracy", "clarity", "basic_understanding"}
+    assert evaluation["strengths"] == ["Clear"] and evaluation["performance_level"] == "Mid Level"
+
+
+def test_validate_evaluation_rejects_missing_dimensions():
+    with pytest.raises(ExtractionError, match="reasoning"):
+        validate_evaluation(_evaluation(), "Medium")
+
+
+def test_parse_helpers_report_repairs():
+    _, repaired = parse_evaluation_text('{"overall_score": 50, "dimensions": {"accuracy": {"score": 5}, '
+                                        '"clarity": {"score": 5}, "basic_understanding": {"score": 5}}, '
+                                        '"strengths": ["a"], "weaknesses": ["b"], "recommendations": ["c"], '
+                                        '"skill_readiness": "x", "performance_level": "Entry",}', "Low")
+    assert repaired
+    scenario, repaired = parse_scenario_text('{"scenario_title": "T", "scenario_description": "D", '
+                                             '"key_challenges": ["k"]}')
+    assert scenario["scenario_title"] == "T" and not repaired
+    with pytest.raises(ExtractionError):
+        parse_scenario_text('{"scenario_title": "T"}')
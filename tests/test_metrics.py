@@ -0,0 +1,24 @@
+from flask import Flask
+
+import metrics
+
+
+def test_profiler_lock_is_released_when_the_view_raises(monkeypatch):
+    monkeypatch.setattr(metrics, "PROFILE_SLOW_REQUESTS", 60.0)
+    monkeypatch.setattr(metrics, "PROFILE_SAMPLE_RATE", 1.0)
+    app = Flask(__name__)
+    metrics.init_app(app)
+
+    @app.route("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    @app.route("/ok")
+    def ok():
+        return "ok"
+
+    client = app.test_client()
+    assert client.get("/boom").status_code == 500
+    assert not metrics._profile_lock.locked()
+    assert client.get("/ok").status_code == 200
+    assert not metrics._profile_lock.locked()
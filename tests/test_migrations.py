@@ -0,0 +1,82 @@
+import json
+import os
+
+import pytest
+
+import database
+import search
+import stats
+from assessments import insert_assessment
+
+
+@pytest.fixture
+def legacy_db():
+    """A database at schema version 4 holding a few assessments in the original text format"""
+    conn = database.get_db_connection()
+    conn.close_for_real()
+    database._local.conn = None
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(database.DB_NAME + suffix):
+            os.remove(database.DB_NAME + suffix)
+    conn = database.get_db_connection()
+    for migration in database.MIGRATIONS[:4]:
+        for step in migration:
+            conn.execute(step)
+    conn.execute('PRAGMA user_version = 4')
+    conn.execute("INSERT INTO users (username, password_hash) VALUES ('alice', 'x')")
+    for score in (40, 60, 80):
+        evaluation_data = {'overall_score': score, 'performance_level': 'Good', 'strengths': ['tidy proofs'],
+                           'dimensions': {'reasoning': {'score': score}}}
+        conn.execute('''
+            INSERT INTO assessments (user_id, job_role, complexity, overall_score, evaluation_data)
+            VALUES (1, 'Data Analyst', 'medium', ?, ?)
+        ''', (score, json.dumps(evaluation_data)))
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_migrate_only_queues_the_backfills(legacy_db):
+    assert database.migrate(legacy_db) == len(database.MIGRATIONS) - 4
+    assert legacy_db.execute('SELECT COUNT(*) FROM assessments WHERE performance_level IS NULL').fetchone()[0] == 3
+    queued = {row['name']: row['through_id'] for row in legacy_db.execute('SELECT * FROM backfills WHERE done = 0')}
+    assert queued['summary_columns'] == queued['role_stats'] == queued['search_index'] == 3
+    assert queued['compact_evaluations'] == 3
+    assert legacy_db.execute("SELECT COUNT(*) FROM assessments WHERE typeof(evaluation_data) = 'text'").fetchone()[0] == 3
+
+
+def test_backfills_fill_existing_rows_and_skip_newer_ones(legacy_db):
+    database.migrate(legacy_db)
+    # Written after the migration, so already complete: the backfills must not count it again
+    insert_assessment(legacy_db, 1, 'Data Analyst', 'medium', {'overall_score': 100})
+    legacy_db.commit()
+
+    assert database.run_backfills(legacy_db, batch_size=2) > 0
+    row = legacy_db.execute('SELECT performance_level, dimension_scores FROM assessments WHERE id = 1').fetchone()
+    assert row['performance_level'] == 'Good' and json.loads(row['dimension_scores']) == {'reasoning': 40}
+    assert stats.percentile_rank(legacy_db, 'data analyst', 'medium', 70)[1] == 4
+    results, _ = search.search_assessments(legacy_db, 1, 'tidy')
+    assert len(results) == 3
+    assert legacy_db.execute("SELECT COUNT(*) FROM assessments WHERE typeof(evaluation_data) = 'text'").fetchone()[0] == 0
+    assert database.run_backfills(legacy_db) == 0
+
+
+def test_interrupted_backfill_resumes_after_its_last_committed_batch(legacy_db, monkeypatch):
+    database.migrate(legacy_db)
+    seen = []
+    real = database.BACKFILLS[0][1]
+
+    def flaky(conn, after_id, through_id, batch_size):
+        seen.append(after_id)
+        if len(seen) == 2:
+            raise RuntimeError("worker stopped")
+        return real(conn, after_id, through_id, batch_size)
+
+    monkeypatch.setattr(database, 'BACKFILLS', [('summary_columns', flaky)] + database.BACKFILLS[1:])
+    with pytest.raises(RuntimeError):
+        database.run_backfills(legacy_db, batch_size=1)
+    assert legacy_db.execute("SELECT after_id FROM backfills WHERE name = 'summary_columns'").fetchone()[0] == 1
+
+    database.run_backfills(legacy_db, batch_size=1)
+    assert seen[2:] == [1, 2, 3]
+    assert legacy_db.execute('SELECT COUNT(*) FROM assessments WHERE performance_level IS NULL').fetchone()[0] == 0
@@ -0,0 +1,78 @@
+import prompts
+from prompts import CompletionLengths, count_tokens, truncate
+
+
+def _sentences(prefix, count):
+    return " ".join(f"{prefix} sentence {i} adds some detail." for i in range(count))
+
+
+def test_count_tokens_is_close_to_a_quarter_of_the_characters_for_prose():
+    text = "The candidate demonstrates a strong understanding of the key concepts."
+    assert 0.7 * len(text) / 4 <= count_tokens(text) <= 1.3 * len(text) / 4
+    assert count_tokens("") == 0
+
+
+def test_truncate_leaves_short_text_alone():
+    assert truncate("A short answer.", 100) == ("A short answer.", False)
+
+
+def test_truncate_keeps_opening_and_closing_sentences():
+    text = _sentences("Answer", 300)
+    shortened, truncated = truncate(text, 200)
+    assert truncated
+    assert count_tokens(shortened) <= 200
+    assert shortened.startswith("Answer sentence 0 ")
+    assert shortened.endswith("Answer sentence 299 adds some detail.")
+    assert "words omitted" in shortened
+
+
+def test_truncate_cuts_a_single_overlong_word():
+    shortened, truncated = truncate("x" * 5000, 100)
+    assert truncated and 0 < count_tokens(shortened) <= 100
+
+
+def test_render_within_budget_is_unchanged():
+    rendered = prompts.render("evaluation", "Medium", job_role="Nurse", scenario_description="A ward is short-staffed.",
+                              user_response="I would rearrange the rota.")
+    assert not rendered.truncated
+    assert "I would rearrange the rota." in rendered.messages[1]["content"]
+    assert rendered.prompt_tokens == prompts.count_message_tokens(rendered.messages)
+
+
+def test_long_scenario_is_shortened_before_the_response():
+    rendered = prompts.render("evaluation", "High", job_role="SRE", scenario_description=_sentences("Scenario", 400),
+                              user_response="I would page the on-call engineer and open an incident.")
+    content = rendered.messages[1]["content"]
+    assert "I would page the on-call engineer and open an incident." in content
+    assert rendered.prompt_tokens <= prompts.PROMPT_INPUT_BUDGET
+
+
+def test_response_keeps_its_minimum_share_when_the_rest_is_over_budget():
+    template = prompts.get("evaluation", "High")
+    answer = _sentences("Answer", 300)
+    rendered = template.render(budget=3000, job_role="SRE " * 3000, scenario_description=_sentences("Scenario", 400),
+                               user_response=answer)
+    content = rendered.messages[1]["content"]
+    start = content.index("CANDIDATE RESPONSE:")
+    response = content[start:content.index("Evaluate based on", start)]
+    assert "Answer sentence 0 " in response
+    assert count_tokens(response) >= prompts.PROMPT_RESPONSE_MIN_TOKENS * 0.9
+
+
+def test_max_tokens_uses_the_default_until_enough_samples():
+    lengths = CompletionLengths()
+    ceiling, floor = prompts.MAX_TOKENS["evaluation"]
+    assert lengths.max_tokens("evaluation", "Low") == ceiling
+    for _ in range(prompts.MAX_TOKENS_MIN_SAMPLES):
+        lengths.observe("evaluation", "Low", 1000)
+    assert lengths.max_tokens("evaluation", "Low") == round(1000 * prompts.MAX_TOKENS_HEADROOM)
+
+
+def test_max_tokens_is_clamped_and_cut_off_completions_count_as_the_ceiling():
+    lengths = CompletionLengths()
+    ceiling, floor = prompts.MAX_TOKENS["evaluation"]
+    for _ in range(prompts.MAX_TOKENS_MIN_SAMPLES):
+        lengths.observe("evaluation", "Low", 10)
+    assert lengths.max_tokens("evaluation", "Low") == floor
+    lengths.observe("evaluation", "Low", 10, truncated=True)
+    assert lengths.max_tokens("evaluation", "Low") == ceiling
@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+
+import ratelimit
+from ratelimit import RateLimiter, TokenBucket
+
+
+def test_bucket_starts_full_then_queues_reservations_in_order():
+    bucket = TokenBucket(60)  # one per second
+    assert bucket.reserve(60) == 0
+    first = bucket.reserve(1)
+    second = bucket.reserve(1)
+    assert 0.9 < first < 1.1
+    assert 1.9 < second < 2.1
+
+
+def test_oversized_requests_wait_for_a_full_bucket_only():
+    bucket = TokenBucket(60)
+    assert bucket.reserve(1000) == 0
+    assert 59 < bucket.reserve(1000) < 61
+
+
+def test_reconcile_refunds_unused_tokens():
+    limiter = RateLimiter(rpm=1000, tpm=600)
+    assert limiter.reserve(600) == 0
+    limiter.reconcile(600, 100)
+    assert limiter.reserve(400) == 0
+    limiter.reconcile(400, None)
+    assert limiter.reserve(200) > 0
+
+
+def test_async_acquire_waits_without_blocking_the_loop():
+    limiter = RateLimiter(rpm=600, tpm=1e9)  # ten requests per second
+
+    async def main():
+        for _ in range(600):
+            limiter.reserve(0)
+        started = time.monotonic()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.ensure_future(ticker())
+        await limiter.acquire_async(0)
+        task.cancel()
+        return time.monotonic() - started, ticks
+
+    waited, ticks = asyncio.run(main())
+    assert waited >= 0.09 and ticks >= 5
+
+
+def test_accounts_share_one_limiter_per_process():
+    ratelimit.configure(30, 12000)
+    assert ratelimit.for_account("GROQ_API_KEY") is ratelimit.for_account("GROQ_API_KEY")
+    assert ratelimit.for_account("GROQ_API_KEY") is not ratelimit.for_account("OTHER_API_KEY")
+
+
+def test_a_reservation_over_max_wait_raises_and_is_handed_back():
+    limiter = RateLimiter(rpm=60, tpm=1e9)  # one request per second
+    assert limiter.reserve(0) == 0
+    for _ in range(59):
+        limiter.reserve(0)
+    with pytest.raises(ratelimit.RateLimited) as excinfo:
+        limiter.reserve(0, max_wait=0.5)
+    assert 0.9 < excinfo.value.retry_after < 1.1
+    assert 0.9 < limiter.reserve(0) < 1.1  # the refused reservation did not queue
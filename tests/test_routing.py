@@ -0,0 +1,137 @@
+import time
+
+import pytest
+
+import prompts
+import ratelimit
+import routing
+
+
+class FakeClient:
+    def __init__(self, deltas, finish_reason="stop", usage=None):
+        self.deltas = deltas
+        self.finish_reason = finish_reason
+        self.usage = usage
+
+    def stream_chat(self, messages, model=None, temperature=0.7, max_tokens=2000, on_finish=None):
+        yield from self.deltas
+        if on_finish:
+            on_finish(self.finish_reason, self.usage)
+
+
+class FakeBackend(routing.Backend):
+    def __init__(self, name, client=None):
+        super().__init__(name, f"model-{name}", slo=1)
+        self.fake_client = client
+
+    @property
+    def client(self):
+        return self.fake_client
+
+
+@pytest.fixture(autouse=True)
+def unlimited():
+    ratelimit.configure(1e6, 1e9)
+    yield
+    ratelimit.configure(ratelimit.GROQ_RPM, ratelimit.GROQ_TPM)
+
+
+@pytest.fixture
+def lengths(monkeypatch):
+    recorder = prompts.CompletionLengths()
+    monkeypatch.setattr(prompts, "completion_lengths", recorder)
+    return recorder
+
+
+def _use(monkeypatch, *backends):
+    monkeypatch.setattr(routing, "_backends", {backend.name: backend for backend in backends})
+    monkeypatch.setattr(routing, "_routes", {(None, None): [backend.name for backend in backends]})
+
+
+def test_stream_records_a_length_cut_off_as_truncated(monkeypatch, lengths):
+    # Far fewer tokens than max_tokens by any count, but the API says it was cut off
+    _use(monkeypatch, FakeBackend("a", FakeClient(["{\"overall_score\": 8"], finish_reason="length")))
+    assert "".join(routing.stream("evaluation", "Low", [], max_tokens=1000)) == "{\"overall_score\": 8"
+    assert list(lengths._lengths[("evaluation", "Low")]) == [prompts.MAX_TOKENS["evaluation"][0]]
+
+
+def test_stream_prefers_reported_usage(monkeypatch, lengths):
+    _use(monkeypatch, FakeBackend("a", FakeClient(["x"], usage={"completion_tokens": 321})))
+    list(routing.stream("evaluation", "Low", [], max_tokens=1000))
+    assert list(lengths._lengths[("evaluation", "Low")]) == [321]
+
+
+class ChatClient:
+    def __init__(self, content='ok'):
+        self.content = content
+        self.calls = 0
+
+    def chat(self, messages, model=None, temperature=0.7, max_tokens=2000):
+        self.calls += 1
+        return {"choices": [{"message": {"content": self.content}, "finish_reason": "stop"}],
+                "usage": {"completion_tokens": 1, "total_tokens": 10}}
+
+
+def _open(breaker, seconds_ago):
+    breaker.failures = breaker.failure_threshold
+    breaker.opened_at = time.monotonic() - seconds_ago
+
+
+def test_unlaunched_secondary_keeps_its_probe_slot(monkeypatch, lengths):
+    primary = FakeBackend("primary")
+    primary.fake_client = ChatClient()
+    secondary = FakeBackend("secondary")
+    secondary.fake_client = ChatClient()
+    _open(secondary.breaker, secondary.breaker.reset_timeout + 1)
+    opened_at = secondary.breaker.opened_at
+    _use(monkeypatch, primary, secondary)
+
+    assert routing.complete("evaluation", "Low", [])[0] == "ok"
+    assert secondary.breaker.opened_at == opened_at
+    assert secondary.breaker.allow()  # the probe is still there for the next failover
+
+
+def test_open_breakers_are_skipped_and_a_fully_open_route_raises(monkeypatch, lengths):
+    primary = FakeBackend("primary")
+    primary.fake_client = ChatClient()
+    secondary = FakeBackend("secondary")
+    secondary.fake_client = ChatClient("from secondary")
+    _open(primary.breaker, 0)
+    _use(monkeypatch, primary, secondary)
+    assert routing.complete("evaluation", "Low", [])[0] == "from secondary"
+    assert primary.fake_client.calls == 0
+
+    _open(secondary.breaker, 0)
+    with pytest.raises(routing.LLMClientError):
+        routing.complete("evaluation", "Low", [])
+
+
+class SlowClient(ChatClient):
+    def chat(self, messages, model=None, temperature=0.7, max_tokens=2000):
+        time.sleep(0.3)
+        return super().chat(messages, model, temperature, max_tokens)
+
+
+def test_a_call_over_max_wait_raises_without_holding_a_reservation(monkeypatch, lengths):
+    ratelimit.configure(1, 1e9)
+    backend = FakeBackend("a", ChatClient())
+    _use(monkeypatch, backend)
+    routing.complete("evaluation", "Low", [])
+    with pytest.raises(ratelimit.RateLimited):
+        routing.complete("evaluation", "Low", [], max_wait=0.1)
+    assert backend.fake_client.calls == 1
+    assert backend.breaker.allow()
+    assert 59 < ratelimit.for_account(backend.api_key_env).reserve(0) < 61
+
+
+def test_no_hedge_is_sent_while_its_account_is_limited(monkeypatch, lengths):
+    primary = FakeBackend("primary", SlowClient())
+    primary.slo = 0.05
+    secondary = FakeBackend("secondary", ChatClient("hedge"))
+    secondary.api_key_env = "OTHER_API_KEY"
+    limited = ratelimit.RateLimiter(rpm=1, tpm=1e9)
+    limited.reserve(0)
+    monkeypatch.setitem(ratelimit._limiters, secondary.api_key_env, limited)
+    _use(monkeypatch, primary, secondary)
+    assert routing.complete("evaluation", "Low", [])[0] == "ok"
+    assert secondary.fake_client.calls == 0
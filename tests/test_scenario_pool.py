@@ -0,0 +1,51 @@
+import pytest
+
+import scenario_pool
+from scenario_pool import ScenarioPool
+
+
+@pytest.fixture(autouse=True)
+def one_per_key(monkeypatch):
+    monkeypatch.setattr(scenario_pool, 'POOL_MAX_SIZE', 1)
+
+
+def _heat(pool, job_role='Data Analyst', complexity='Low'):
+    # Enough recent demand (it decays between requests) to make the key hot
+    for _ in range(int(scenario_pool.HOT_THRESHOLD) + 1):
+        assert pool.take(job_role, complexity) is None
+
+
+def _counts(db):
+    return tuple(db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                 for table in ('scenario_pool', 'scenario_claims'))
+
+
+def test_refilled_scenarios_are_served_once(db):
+    pool = ScenarioPool(lambda job_role, complexity: {'scenario_title': f'{job_role} {complexity}'}, enabled=True)
+    _heat(pool)
+    pool._refill()
+    assert _counts(db) == (1, 0)
+    assert pool.take(' data  ANALYST ', 'Low') == {'scenario_title': 'Data Analyst Low'}
+    assert pool.take('Data Analyst', 'Medium') is None
+
+
+def test_a_deficit_claimed_by_one_worker_is_not_generated_by_another(db):
+    calls = []
+    other = ScenarioPool(lambda job_role, complexity: calls.append('other') or {'scenario_title': 'B'}, enabled=True)
+
+    def generate(job_role, complexity):
+        calls.append('mine')
+        other._refill()  # another worker's refill runs while this one is generating
+        return {'scenario_title': 'A'}
+
+    mine = ScenarioPool(generate, enabled=True)
+    _heat(mine)
+    mine._refill()
+    assert calls == ['mine'] and _counts(db) == (1, 0)
+
+
+def test_a_failed_generation_releases_its_claim(db):
+    pool = ScenarioPool(lambda job_role, complexity: None, enabled=True)
+    _heat(pool)
+    pool._refill()
+    assert _counts(db) == (0, 0)
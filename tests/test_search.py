@@ -0,0 +1,57 @@
+import pytest
+
+from assessments import insert_assessment
+from search import SearchError, build_query, search_assessments
+
+
+def _add(db, user_id, strengths, complexity='Low', job_role='Data Analyst', title='Quarterly report'):
+    assessment_id = insert_assessment(db, user_id, job_role, complexity,
+                                      {'overall_score': 70, 'strengths': strengths, 'weaknesses': ['Slow']},
+                                      scenario={'scenario_title': title})
+    db.commit()
+    return assessment_id
+
+
+@pytest.fixture
+def users(db):
+    for name in ('alice', 'bob'):
+        db.execute('INSERT INTO users (username, password_hash) VALUES (?, ?)', (name, 'x'))
+    db.commit()
+    return 1, 2
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('pivot tables', '("pivot" AND "tables")'),
+    ('"pivot tables" sql*', '("pivot tables" AND "sql"*)'),
+    ('a OR NOT b', '("a" AND "OR" AND "NOT" AND "b")'),
+    ('col:umn "unclosed', '("col:umn" AND "unclosed")'),
+])
+def test_user_input_is_quoted_into_a_valid_match(text, expected):
+    assert build_query(text) == expected
+
+
+def test_unsearchable_queries_raise():
+    for text, field in (('', None), ('* "" *', None), ('x', 'owner'), (' '.join('w' * 17), None)):
+        with pytest.raises(SearchError):
+            build_query(text, field)
+
+
+def test_results_are_scoped_to_the_owner_and_filters(db, users):
+    alice, bob = users
+    mine = _add(db, alice, ['Strong pivot tables'])
+    medium = _add(db, alice, ['Pivot tables again'], complexity='Medium')
+    _add(db, bob, ['Pivot tables too'])
+
+    results, next_offset = search_assessments(db, alice, 'pivot')
+    assert {item['id'] for item in results} == {mine, medium} and next_offset is None
+    assert [item['id'] for item in search_assessments(db, alice, 'pivot', complexity='Medium')[0]] == [medium]
+    assert search_assessments(db, alice, 'u1')[0] == []  # the owner is not searchable text
+
+
+def test_snippets_come_from_the_matching_text(db, users):
+    alice, _ = users
+    _add(db, alice, ['Explained <b>pivot</b> tables clearly'])
+    [item] = search_assessments(db, alice, 'pivot')[0]
+    assert '<mark>pivot</mark>' in item['snippet'] and '&lt;b&gt;' in item['snippet']
+    [item] = search_assessments(db, alice, 'quarterly', field='scenario_title')[0]
+    assert item['snippet'] == '<mark>Quarterly</mark> report'
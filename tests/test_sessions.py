@@ -0,0 +1,80 @@
+import pytest
+
+from passwords import hash_password
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    import app
+
+    db.execute('INSERT INTO users (username, password_hash) VALUES (?, ?)', ('alice', hash_password('s3cret')))
+    db.commit()
+    monkeypatch.setattr(app, 'login_throttle', type(app.login_throttle)())
+    return app.app.test_client()
+
+
+def _sid(client):
+    cookie = client.get_cookie('session')
+    return cookie.value.rsplit('.', 1)[0] if cookie else None
+
+
+def _stored(db, sid):
+    return db.execute('SELECT COUNT(*) FROM sessions WHERE id = ?', (sid,)).fetchone()[0]
+
+
+def test_login_and_logout_issue_new_session_ids(client, db):
+    # An id the client held (or was handed) before signing in
+    with client.session_transaction() as sess:
+        sess['job_role'] = 'Analyst'
+    planted = _sid(client)
+    assert _stored(db, planted)
+
+    response = client.post('/login', data={'username': 'alice', 'password': 's3cret'})
+    assert response.status_code == 302
+    signed_in = _sid(client)
+    assert signed_in != planted
+    assert not _stored(db, planted) and _stored(db, signed_in)
+
+    client.get('/logout')
+    assert _sid(client) != signed_in
+    assert not _stored(db, signed_in)
+
+
+def test_login_asks_to_retry_when_the_hashing_pool_times_out(client, monkeypatch):
+    import app
+
+    def busy(password_hash, password):
+        raise TimeoutError
+
+    monkeypatch.setattr(app, 'verify_password', busy)
+    response = client.post('/login', data={'username': 'alice', 'password': 's3cret'})
+    assert response.status_code == 503 and response.headers['Retry-After']
+    assert b'try again' in response.data
+    assert _sid(client) is None
+
+
+def test_workers_saving_one_session_never_reuse_a_version(db):
+    from session_store import SQLiteSessionInterface, ServerSideSession
+
+    first, second = SQLiteSessionInterface(), SQLiteSessionInterface()
+    session = ServerSideSession({'step': 1}, sid='shared', new=True)
+    first.persist(session)
+    # Both workers now hold version 1 and change it independently
+    mine = ServerSideSession(first.load('shared')[0], sid='shared', version=1)
+    theirs = ServerSideSession(second.load('shared')[0], sid='shared', version=1)
+    mine['step'] = 2
+    first.persist(mine)
+    theirs['step'] = 3
+    second.persist(theirs)
+
+    assert (mine.version, theirs.version) == (2, 3)
+    assert first.load('shared')[0] == {'step': 3}  # the first worker's cached copy is stale
+
+
+def test_cached_sessions_are_not_shared_between_requests(db):
+    from session_store import SQLiteSessionInterface, ServerSideSession
+
+    store = SQLiteSessionInterface()
+    store.persist(ServerSideSession({'scenario': {'title': 'T'}}, sid='s', new=True))
+    store.load('s')[0]['scenario']['title'] = 'changed'
+    assert store.load('s')[0] == {'scenario': {'title': 'T'}}
@@ -0,0 +1,25 @@
+import scenario_pool
+import stats
+from assessments import insert_assessment
+
+
+def test_leaderboard_hides_other_users(db):
+    for name in ("alice", "bob"):
+        db.execute("INSERT INTO users (username, password_hash) VALUES (?, 'x')", (name,))
+    insert_assessment(db, 1, "Data  Analyst", "Medium", {"overall_score": 60})
+    mine = insert_assessment(db, 2, "data analyst", "Medium", {"overall_score": 80})
+    db.commit()
+
+    summary = stats.role_summary(db, "DATA ANALYST", "Medium", viewer_id=2)
+    assert summary["count"] == 2 and summary["mean"] == 70
+    assert summary["leaderboard"] == [
+        {"rank": 1, "score": 80, "you": True, "assessment_id": mine},
+        {"rank": 2, "score": 60, "you": False},
+    ]
+    assert "alice" not in str(stats.role_summary(db, "data analyst", "Medium"))
+    assert stats.percentile_rank(db, "data analyst", "Medium", 70) == (50.0, 2)
+
+
+def test_scenario_pool_groups_roles_like_the_statistics():
+    assert scenario_pool.normalize_role is stats.normalize_role
+    assert stats.normalize_role("  Senior   Engineer ") == "senior engineer"
@@ -0,0 +1,53 @@
+import json
+
+from stream_parser import IncrementalJSONParser
+
+DOCUMENT = {
+    "overall_score": 72,
+    "dimensions": {"accuracy": {"score": 7, "feedback": "a \"quoted\" word, and {braces}"}, "clarity": {"score": 8}},
+    "strengths": ["one", "two"],
+    "skill_readiness": "Ready",
+    "flag": True,
+}
+
+
+def _events(chunks):
+    parser = IncrementalJSONParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return parser, events
+
+
+def test_reports_top_level_fields_and_their_members():
+    _, events = _events([json.dumps(DOCUMENT, indent=2)])
+    assert events == [
+        (("overall_score",), 72),
+        (("dimensions", "accuracy"), DOCUMENT["dimensions"]["accuracy"]),
+        (("dimensions", "clarity"), {"score": 8}),
+        (("dimensions",), DOCUMENT["dimensions"]),
+        (("strengths", 0), "one"),
+        (("strengths", 1), "two"),
+        (("strengths",), ["one", "two"]),
+        (("skill_readiness",), "Ready"),
+        (("flag",), True),
+    ]
+
+
+def test_events_do_not_depend_on_chunk_boundaries():
+    text = "```json\n" + json.dumps(DOCUMENT) + "\n```"
+    _, whole = _events([text])
+    parser, by_char = _events(list(text))
+    assert by_char == whole and parser.finished
+
+
+def test_a_value_is_reported_only_once_it_closes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"overall_score": 7') == []
+    assert parser.feed('2, "strengths": ["on') == [(("overall_score",), 72)]
+    assert parser.feed('e"') == [(("strengths", 0), "one")]
+
+
+def test_input_after_the_root_object_is_ignored():
+    parser, events = _events(['{"a": 1} {"b": 2}'])
+    assert events == [(("a",), 1)] and parser.feed('{"c": 3}') == []